@@ -5,7 +5,7 @@ a = Analysis(
     ['C:\\Users\\higop\\OneDrive\\Python\\GitHub\\Hydraulics\\Calculation of Circular Channels\\Calculation of Circular Channels\\Calculation_of_Circular_Channels.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('assets/manning_clientside.js', 'assets')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
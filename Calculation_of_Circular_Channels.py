@@ -1,67 +1,21 @@
-from dash import Dash, dcc, html, Input, Output, State
-import math
-from scipy.optimize import fsolve
+import base64
+import io
+import os
+import sys
 
-# Function to calculate the central angle (theta)
-def calculate_theta(yD):
-    return 2 * math.acos(1 - 2 * yD)
+import pandas as pd
+from dash import Dash, dcc, html, Input, Output, State, ClientsideFunction
+from manning.batch import solve_frame
+from manning.core import VARIABLES
 
-# Function to calculate the hydraulic radius
-def calculate_hydraulic_radius(area, wetted_perimeter):
-    return area / wetted_perimeter if wetted_perimeter != 0 else None
+# Get the directory where the script is running
+if getattr(sys, 'frozen', False):
+    BASE_DIR = sys._MEIPASS
+else:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Função to calculate y/D
-def calculate_yD(diameter, flow_rate, roughness, slope):
-    def equation(yD):
-        theta = calculate_theta(yD)
-        area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-        wetted_perimeter = theta * diameter / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        calculated_flow = (1 / roughness) * area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)
-        return calculated_flow - flow_rate
-
-    initial_guess = 0.5
-    return fsolve(equation, initial_guess)[0]
-
-# Function to calculate the diameter (D)
-def calculate_diameter(yD, flow_rate, roughness, slope):
-    def equation(diameter):
-        theta = calculate_theta(yD)
-        area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-        wetted_perimeter = theta * diameter / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        calculated_flow = (1 / roughness) * area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)
-        return calculated_flow - flow_rate
-
-    initial_guess = 1.0
-    return fsolve(equation, initial_guess)[0]
-
-# Function to calculate flow rate (Q)
-def calculate_flow_rate(diameter, yD, roughness, slope):
-    theta = calculate_theta(yD)
-    area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-    wetted_perimeter = theta * diameter / 2
-    hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-    return (1 / roughness) * area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)
-
-# Funtion to calculate roughness (n)
-def calculate_roughness(diameter, yD, flow_rate, slope):
-    theta = calculate_theta(yD)
-    area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-    wetted_perimeter = theta * diameter / 2
-    hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-    return (area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)) / flow_rate
-
-# Function to calculate slope (S)
-def calculate_slope(diameter, yD, flow_rate, roughness):
-    theta = calculate_theta(yD)
-    area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-    wetted_perimeter = theta * diameter / 2
-    hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-    return ((flow_rate * roughness) / (area * (hydraulic_radius ** (2 / 3)))) ** 2
-
-# Starting app Dash
-app = Dash(__name__)
+# Starting app Dash; assets/manning_clientside.js holds the browser-side solver
+app = Dash(__name__, assets_folder=os.path.join(BASE_DIR, "assets"))
 
 # App Layout
 app.layout = html.Div([
@@ -69,7 +23,7 @@ app.layout = html.Div([
 
     html.Div([
         html.Label("Diameter (D) [m]:"),
-        dcc.Input(id='input-diameter', type='number', value=1.0, step=0.001),
+        dcc.Input(id='input-diameter', type='number', value=1.0, step=0.001, debounce=True),
         dcc.Checklist(
             options=[{'label': 'Calculate', 'value': 'diameter'}],
             id='check-diameter',
@@ -80,7 +34,7 @@ app.layout = html.Div([
 
     html.Div([
         html.Label("y/D (Water Depth / Diameter):"),
-        dcc.Input(id='input-yD', type='number', value=0.5, step=0.01),
+        dcc.Input(id='input-yD', type='number', value=0.5, step=0.01, debounce=True),
         dcc.Checklist(
             options=[{'label': 'Calculate', 'value': 'yD'}],
             id='check-yD',
@@ -91,7 +45,7 @@ app.layout = html.Div([
 
     html.Div([
         html.Label("Slope (S):"),
-        dcc.Input(id='input-slope', type='number', value=0.00450, step=0.00001),
+        dcc.Input(id='input-slope', type='number', value=0.00450, step=0.00001, debounce=True),
         dcc.Checklist(
             options=[{'label': 'Calculate', 'value': 'slope'}],
             id='check-slope',
@@ -102,7 +56,7 @@ app.layout = html.Div([
 
     html.Div([
         html.Label("Roughness (n):"),
-        dcc.Input(id='input-roughness', type='number', value=0.013, step=0.001),
+        dcc.Input(id='input-roughness', type='number', value=0.013, step=0.001, debounce=True),
         dcc.Checklist(
             options=[{'label': 'Calculate', 'value': 'roughness'}],
             id='check-roughness',
@@ -113,7 +67,7 @@ app.layout = html.Div([
 
     html.Div([
         html.Label("Flow Rate(Q):"),
-        dcc.Input(id='input-flow-rate', type='number', value=0.1, step=0.001),
+        dcc.Input(id='input-flow-rate', type='number', value=0.1, step=0.001, debounce=True),
         dcc.Checklist(
             options=[{'label': 'Calculate', 'value': 'flow_rate'}],
             id='check-flow-rate',
@@ -123,11 +77,23 @@ app.layout = html.Div([
     ], style={'margin-bottom': '20px'}),
 
     html.H2("Calculated Results", style={'margin-top': '40px'}),
-    html.Div(id='result-output', style={'margin-top': '20px', 'font-size': '20px'})
+    html.Div(id='result-output', style={'margin-top': '20px', 'font-size': '20px'}),
+
+    # Whole files of pipes are solved on the server
+    html.H2("Batch Calculation", style={'margin-top': '40px'}),
+    html.Div([
+        html.Label("Variable to calculate for every row:"),
+        dcc.RadioItems(id='batch-unknown', options=[{'label': name, 'value': name} for name in VARIABLES],
+                       value='diameter', inline=True),
+        dcc.Upload(id='upload-batch', children=html.Button("Upload CSV or Parquet file"), multiple=False),
+        html.Div(id='batch-output', style={'margin-top': '10px'}),
+        dcc.Download(id='download-batch')
+    ])
 ])
 
-# Callback to uptade the results
-@app.callback(
+# Callback to update the results, run in the browser (no server round-trip per change)
+app.clientside_callback(
+    ClientsideFunction(namespace='manning', function_name='update_results'),
     Output('result-output', 'children'),
     [
         Input('input-diameter', 'value'),
@@ -142,42 +108,27 @@ app.layout = html.Div([
         Input('check-flow-rate', 'value')
     ]
 )
-def update_results(diameter, yD, slope, roughness, flow_rate, check_diameter, check_yD, check_slope, check_roughness, check_flow_rate):
-    try:
-        highlighted = None
-
-        # Identify what item is checked
-        if 'diameter' in check_diameter:
-            diameter = calculate_diameter(yD, flow_rate, roughness, slope)
-            highlighted = 'diameter'
-        elif 'yD' in check_yD:
-            yD = calculate_yD(diameter, flow_rate, roughness, slope)
-            highlighted = 'yD'
-        elif 'slope' in check_slope:
-            slope = calculate_slope(diameter, yD, flow_rate, roughness)
-            highlighted = 'slope'
-        elif 'roughness' in check_roughness:
-            roughness = calculate_roughness(diameter, yD, flow_rate, slope)
-            highlighted = 'roughness'
-        elif 'flow_rate' in check_flow_rate:
-            flow_rate = calculate_flow_rate(diameter, yD, roughness, slope)
-            highlighted = 'flow_rate'
-        else:
-            return "Select a variable to calculate!"
-
-        # Show the results
 
-        return html.Div([
-            html.Div(f"Flow Rate (Q): {flow_rate:.4f} m³/s", style={'color': 'blue'} if highlighted == 'flow_rate' else {}),
-            html.Div(f"Diameter (D): {diameter:.4f} m", style={'color': 'blue'} if highlighted == 'diameter' else {}),
-            html.Div(f"y/D: {yD:.2f}", style={'color': 'blue'} if highlighted == 'yD' else {}),
-            html.Div(f"Slope (S): {slope:.5f} m/m", style={'color': 'blue'} if highlighted == 'slope' else {}),
-            html.Div(f"Roughness (n): {roughness:.4f}", style={'color': 'blue'} if highlighted == 'roughness' else {}),
-
-        ])
+# Callback to solve an uploaded file of pipes and send back the results
+@app.callback(
+    Output('batch-output', 'children'),
+    Output('download-batch', 'data'),
+    Input('upload-batch', 'contents'),
+    State('upload-batch', 'filename'),
+    State('batch-unknown', 'value'),
+    prevent_initial_call=True
+)
+def solve_upload(contents, filename, unknown):
+    try:
+        data = io.BytesIO(base64.b64decode(contents.split(",", 1)[1]))
+        frame = pd.read_parquet(data) if filename.endswith((".parquet", ".pq")) else pd.read_csv(data)
+        results = solve_frame(frame, unknown)
+        name = os.path.splitext(filename)[0] + f"_{unknown}.csv"
+        return f"Solved {unknown} for {len(results):,} rows of {filename}", dcc.send_data_frame(
+            results.to_csv, name, index=False)
     except Exception as e:
-        return str(e)
+        return str(e), None
 
 # Start App
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    app.run(debug=True)
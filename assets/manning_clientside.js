@@ -0,0 +1,147 @@
+// Manning equation for circular channels, evaluated in the browser by the Dash app's clientside callbacks.
+// Mirrors manning/core.py: explicit formulas for Q, S and n, closed form for D, and a bisection on
+// [0, YD_MAX_FLOW] (where Q(y/D) is monotonic) for y/D.
+
+(function () {
+    // y/D at which the channel carries its maximum flow (Q decreases above it)
+    var YD_MAX_FLOW = 0.9381812;
+
+    // Bisection steps for y/D (the bracket shrinks to 2^-60, below double precision)
+    var YD_ITERATIONS = 60;
+
+    // Variables in the order the checkboxes are checked, with the inputs each one needs
+    var VARIABLES = ["diameter", "yD", "slope", "roughness", "flow_rate"];
+
+    // Function to calculate the central angle (theta)
+    function theta(yD) {
+        return 2 * Math.acos(1 - 2 * yD);
+    }
+
+    // Function to calculate the area and hydraulic radius of the flow section
+    function section(diameter, yD) {
+        var t = theta(yD);
+        var area = (t - Math.sin(t)) * diameter * diameter / 8;
+        var wettedPerimeter = t * diameter / 2;
+        return {area: area, hydraulicRadius: wettedPerimeter !== 0 ? area / wettedPerimeter : 0};
+    }
+
+    // Function to calculate the section factor A R^(2/3) / D^(8/3), which depends on y/D only
+    function sectionFactor(yD) {
+        var t = theta(yD);
+        if (t === 0) {
+            return 0;
+        }
+        return (t - Math.sin(t)) / 8 * Math.pow((t - Math.sin(t)) / (4 * t), 2 / 3);
+    }
+
+    function flowRate(diameter, yD, roughness, slope) {
+        var s = section(diameter, yD);
+        return s.area * Math.pow(s.hydraulicRadius, 2 / 3) * Math.sqrt(slope) / roughness;
+    }
+
+    function roughness(diameter, yD, flow_rate, slope) {
+        var s = section(diameter, yD);
+        return s.area * Math.pow(s.hydraulicRadius, 2 / 3) * Math.sqrt(slope) / flow_rate;
+    }
+
+    function slope(diameter, yD, flow_rate, roughness) {
+        var s = section(diameter, yD);
+        return Math.pow(flow_rate * roughness / (s.area * Math.pow(s.hydraulicRadius, 2 / 3)), 2);
+    }
+
+    // Function to calculate the diameter in closed form, since Q scales with D^(8/3)
+    function diameter(yD, flow_rate, roughness, slope) {
+        return Math.pow(flow_rate * roughness / (sectionFactor(yD) * Math.sqrt(slope)), 3 / 8);
+    }
+
+    // Function to calculate y/D by bisection on the section factor
+    function yD(diameter, flow_rate, roughness, slope) {
+        var scale = Math.pow(diameter, 8 / 3) * Math.sqrt(slope) / roughness;
+        var capacity = sectionFactor(YD_MAX_FLOW) * scale;
+        if (flow_rate > capacity) {
+            throw new Error("Flow rate exceeds the pipe capacity (" + capacity.toFixed(4) + " m³/s at y/D = " +
+                            YD_MAX_FLOW.toFixed(3) + ")");
+        }
+        var target = flow_rate / scale;
+        var low = 0, high = YD_MAX_FLOW;
+        for (var i = 0; i < YD_ITERATIONS && high - low > 0; i++) {
+            var middle = (low + high) / 2;
+            if (sectionFactor(middle) < target) {
+                low = middle;
+            } else {
+                high = middle;
+            }
+        }
+        return (low + high) / 2;
+    }
+
+    // Function to solve one variable from the other four
+    function solve(unknown, values) {
+        var d = values.diameter, y = values.yD, s = values.slope, n = values.roughness, q = values.flow_rate;
+        var needed = VARIABLES.filter(function (name) { return name !== unknown; });
+        var missing = needed.filter(function (name) { return typeof values[name] !== "number" || isNaN(values[name]); });
+        if (missing.length) {
+            throw new Error("Enter a value for " + missing.join(", "));
+        }
+        if (unknown !== "yD" && !(y > 0 && y <= 1)) {
+            throw new Error("y/D must be greater than 0 and at most 1");
+        }
+        switch (unknown) {
+            case "diameter": return diameter(y, q, n, s);
+            case "yD": return yD(d, q, n, s);
+            case "slope": return slope(d, y, q, n);
+            case "roughness": return roughness(d, y, q, s);
+            case "flow_rate": return flowRate(d, y, n, s);
+        }
+    }
+
+    function line(text, highlighted) {
+        return {
+            type: "Div",
+            namespace: "dash_html_components",
+            props: {children: text, style: highlighted ? {color: "blue"} : {}}
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        manning: {
+            solve: solve,
+
+            // Clientside version of the update_results callback: same inputs and output
+            update_results: function (diameter, yD, slope, roughness, flow_rate, check_diameter, check_yD,
+                                      check_slope, check_roughness, check_flow_rate) {
+                var checks = [check_diameter, check_yD, check_slope, check_roughness, check_flow_rate];
+                var values = {diameter: diameter, yD: yD, slope: slope, roughness: roughness, flow_rate: flow_rate};
+                var highlighted = null;
+                for (var i = 0; i < VARIABLES.length; i++) {
+                    if ((checks[i] || []).indexOf(VARIABLES[i]) !== -1) {
+                        highlighted = VARIABLES[i];
+                        break;
+                    }
+                }
+                if (highlighted === null) {
+                    return "Select a variable to calculate!";
+                }
+
+                try {
+                    values[highlighted] = solve(highlighted, values);
+                } catch (error) {
+                    return error.message;
+                }
+                return {
+                    type: "Div",
+                    namespace: "dash_html_components",
+                    props: {
+                        children: [
+                            line("Flow Rate (Q): " + values.flow_rate.toFixed(4) + " m³/s", highlighted === "flow_rate"),
+                            line("Diameter (D): " + values.diameter.toFixed(4) + " m", highlighted === "diameter"),
+                            line("y/D: " + values.yD.toFixed(2), highlighted === "yD"),
+                            line("Slope (S): " + values.slope.toFixed(5) + " m/m", highlighted === "slope"),
+                            line("Roughness (n): " + values.roughness.toFixed(4), highlighted === "roughness")
+                        ]
+                    }
+                };
+            }
+        }
+    });
+})();
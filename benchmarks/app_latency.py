@@ -0,0 +1,68 @@
+"""Measure the per-interaction latency of the Streamlit calculator with Streamlit's AppTest harness.
+
+    python benchmarks/app_latency.py
+    git show HEAD~1:circular_channel_calculator.py > old_app.py && python benchmarks/app_latency.py --script old_app.py
+
+Every input is changed in turn and the time of the script rerun that follows is recorded. AppTest always reruns the
+whole script, so this is an upper bound: in the browser an input change only reruns the calculator fragment, whose
+time is reported as app.calculator in the diagnostics panel.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Function to time script reruns after changes of each numeric input of the calculator
+def measure(script, runs=30):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=120)
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"{script} raised: {app.exception[0].message}")
+
+    timings = []
+    inputs = app.number_input[:5]
+    for i in range(runs):
+        widget = inputs[i % len(inputs)]
+        widget.set_value(widget.value * (1.01 if i % 2 == 0 else 1 / 1.01))
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[min(int(0.95 * len(timings)), len(timings) - 1)] * 1000,
+        "runs": runs,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--script", default=os.path.join(ROOT, "circular_channel_calculator.py"),
+                        help="Streamlit script to measure (default: the calculator)")
+    parser.add_argument("--runs", type=int, default=30, help="Interactions measured")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    # The script resolves its assets and the manning package from the repository root
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    results = measure(os.path.abspath(args.script), args.runs)
+    print(f"{args.script}: median {results['median_ms']:.1f} ms, p95 {results['p95_ms']:.1f} ms "
+          f"over {results['runs']} interactions")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Compare bundle size and startup time of PyInstaller builds of the calculator.
+
+    python benchmarks/compare_builds.py dist/full/Circular_Channel_Calculator.exe dist/slim/Circular_Channel_Calculator
+
+Each build is started a few times with APP_PORT set to a free port; the startup time is the time until
+the Streamlit server accepts connections.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Function to get the size of a file or of every file inside a folder [bytes]
+def bundle_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+# Function to find the executable of a one-folder build
+def executable(path):
+    if os.path.isfile(path):
+        return path
+    for name in os.listdir(path):
+        candidate = os.path.join(path, name)
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK) and name.startswith("Circular_Channel"):
+            return candidate
+    raise FileNotFoundError(f"No executable found in {path}")
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+# Function to measure the time until a build accepts connections
+def startup_time(path, timeout=120):
+    port = _free_port()
+    environment = dict(os.environ, APP_PORT=str(port), BROWSER="none")
+    start = time.perf_counter()
+    process = subprocess.Popen([executable(path)], env=environment, stdin=subprocess.PIPE,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                if s.connect_ex(("localhost", port)) == 0:
+                    return time.perf_counter() - start
+            if process.poll() is not None:
+                raise RuntimeError(f"{path} exited with status {process.returncode}")
+            time.sleep(0.05)
+        raise TimeoutError(f"{path} did not start within {timeout} s")
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("builds", nargs="+", help="One-file executables or one-folder build directories")
+    parser.add_argument("--runs", type=int, default=3, help="Startups measured per build")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for path in args.builds:
+        timings = [startup_time(path) for _ in range(args.runs)]
+        results[path] = {"size_mb": bundle_size(path) / 2 ** 20, "startup_s": statistics.median(timings),
+                         "startup_runs_s": timings}
+        print(f"{path}: {results[path]['size_mb']:.1f} MB, startup {results[path]['startup_s']:.2f} s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
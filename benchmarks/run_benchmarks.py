@@ -0,0 +1,197 @@
+"""Benchmarks for every solver path of the manning package.
+
+Writes the measurements as JSON and compares them with a stored baseline:
+
+    python benchmarks/run_benchmarks.py --output results.json --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+
+Exits with status 1 when any metric regresses by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manning import core  # noqa: E402
+from manning.batch import batch_flow_rate, solve  # noqa: E402
+from manning.cache import CALCULATIONS  # noqa: E402
+from manning.tables import get_section_table  # noqa: E402
+from manning.yd_solver import YD_SINGLE_ROOT, YD_TWO_ROOTS, solve_yD, solve_yD_batch  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Relative change above which a metric counts as a regression
+DEFAULT_THRESHOLD = 0.30
+
+SCALAR_ROWS = 2_000
+BATCH_ROWS = 200_000
+LATENCY_CALLS = 500
+
+# Registered benchmarks: name -> function returning {metric: (value, "higher" | "lower")}
+BENCHMARKS = {}
+
+
+def benchmark(function):
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+# Function to generate random inputs covering typical sewer design values
+def _inputs(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    diameter = rng.uniform(0.2, 2.0, rows)
+    yD = rng.uniform(0.05, 0.9, rows)
+    roughness = rng.uniform(0.010, 0.015, rows)
+    slope = 10 ** rng.uniform(-3.5, -1.5, rows)
+    flow_rate = batch_flow_rate(diameter, yD, roughness, slope)
+    return {"diameter": diameter, "yD": yD, "roughness": roughness, "slope": slope, "flow_rate": flow_rate}
+
+
+# Function to time a callable, returning the best of a few repeats in seconds
+def _best_time(function, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@benchmark
+def throughput():
+    results = {}
+    scalar_inputs = _inputs(SCALAR_ROWS)
+    batch_inputs = _inputs(BATCH_ROWS)
+
+    for unknown, (function, arguments) in CALCULATIONS.items():
+        rows = [tuple(scalar_inputs[name][i] for name in arguments) for i in range(SCALAR_ROWS)]
+        elapsed = _best_time(lambda: [function(*row) for row in rows], repeats=1)
+        results[f"scalar_{unknown}_rows_per_s"] = (SCALAR_ROWS / elapsed, "higher")
+
+        known = {name: batch_inputs[name] for name in arguments}
+        elapsed = _best_time(lambda: solve(unknown, **known))
+        results[f"batch_{unknown}_rows_per_s"] = (BATCH_ROWS / elapsed, "higher")
+
+    table = get_section_table()
+    elapsed = _best_time(lambda: table.yD(batch_inputs["diameter"], batch_inputs["flow_rate"],
+                                          batch_inputs["roughness"], batch_inputs["slope"]))
+    results["table_yD_rows_per_s"] = (BATCH_ROWS / elapsed, "higher")
+    return results
+
+
+@benchmark
+def latency():
+    results = {}
+    inputs = _inputs(LATENCY_CALLS, seed=1)
+    for unknown in ("yD", "diameter"):
+        function, arguments = CALCULATIONS[unknown]
+        rows = [tuple(float(inputs[name][i]) for name in arguments) for i in range(LATENCY_CALLS)]
+        for row in rows:  # warm-up
+            function(*row)
+        timings = []
+        for row in rows:
+            start = time.perf_counter()
+            function(*row)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[f"{unknown}_median_us"] = (statistics.median(timings) * 1e6, "lower")
+        results[f"{unknown}_p95_us"] = (timings[int(0.95 * len(timings))] * 1e6, "lower")
+    return results
+
+
+@benchmark
+def convergence():
+    results = {}
+    yD = np.linspace(0.001, 0.999, 999)
+    flow_rate = batch_flow_rate(1.0, yD, 0.013, 0.005)
+    solution = solve_yD_batch(1.0, flow_rate, 0.013, 0.005)
+
+    error = np.where(solution.status == YD_TWO_ROOTS,
+                     np.minimum(np.abs(solution.yD - yD), np.abs(solution.yD_upper - yD)),
+                     np.abs(solution.yD - yD))
+    solved = (solution.status == YD_SINGLE_ROOT) | (solution.status == YD_TWO_ROOTS)
+    results["batch_yD_max_error"] = (float(np.max(error[solved])), "lower")
+    results["batch_yD_mean_iterations"] = (float(np.mean(solution.iterations[solved])), "lower")
+    results["batch_yD_max_iterations"] = (float(np.max(solution.iterations[solved])), "lower")
+    results["batch_yD_unsolved"] = (float(np.count_nonzero(~solved)), "lower")
+
+    scalar_iterations = [solve_yD(1.0, q, 0.013, 0.005).iterations for q in flow_rate[::10]]
+    results["scalar_yD_mean_iterations"] = (float(np.mean(scalar_iterations)), "lower")
+
+    table_error = np.abs(get_section_table().yD(1.0, flow_rate, 0.013, 0.005) - yD)
+    lower_branch = yD <= core.YD_MAX_FLOW
+    results["table_yD_max_error"] = (float(np.max(table_error[lower_branch])), "lower")
+    return results
+
+
+# Function to run the selected benchmarks and collect their metrics
+def run(names=None):
+    metrics = {}
+    for name in names or BENCHMARKS:
+        for metric, (value, better) in BENCHMARKS[name]().items():
+            metrics[f"{name}.{metric}"] = {"value": float(value), "better": better}
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "metrics": metrics,
+    }
+
+
+# Function to compare metrics with a baseline, returning the regressions found
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    regressions = []
+    for name, metric in results["metrics"].items():
+        reference = baseline["metrics"].get(name)
+        if reference is None or reference["value"] == 0:
+            continue
+        change = (metric["value"] - reference["value"]) / abs(reference["value"])
+        worse = -change if metric["better"] == "higher" else change
+        if worse > threshold:
+            regressions.append((name, reference["value"], metric["value"], worse))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file to compare with")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative degradation reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.only)
+    for name, metric in results["metrics"].items():
+        print(f"{name:45s} {metric['value']:>16,.6g}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    for name, before, after, worse in regressions:
+        print(f"REGRESSION {name}: {before:,.6g} -> {after:,.6g} ({worse:.0%} worse)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
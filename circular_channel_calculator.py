@@ -1,8 +1,15 @@
 import os
-import math
-from scipy.optimize import fsolve
+import time
+import logging
 import streamlit as st
 import sys
+import pandas as pd
+from manning.core import calculate_section, calculate_shear_stress, calculate_velocity
+from manning import instrument
+from manning.cache import cached_solve, default_cache
+from manning.charts import partial_flow_curves, capacity_curves
+from manning.uncertainty import Distribution, monte_carlo, sensitivities
+from manning.optimize import optimize_design
 
 # Get the directory where the script is running
 if getattr(sys, 'frozen', False):  # Executável
@@ -13,69 +20,6 @@ else:  # Desenvolvimento local
 # Caminho para a pasta assets
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 
-
-# Function to calculate the central angle (theta)
-def calculate_theta(yD):
-    return 2 * math.acos(1 - 2 * yD)
-
-# Function to calculate the hydraulic radius
-def calculate_hydraulic_radius(area, wetted_perimeter):
-    return area / wetted_perimeter if wetted_perimeter != 0 else None
-
-# Function to calculate shear stress (tension trativa)
-def calculate_shear_stress(hydraulic_radius, slope, specific_weight=9000):
-    return specific_weight * hydraulic_radius * slope
-
-# Function to calculate velocity (V)
-def calculate_velocity(flow_rate, area):
-    return flow_rate / area if area != 0 else None
-
-# Function to calculate y/D
-def calculate_yD(diameter, flow_rate, roughness, slope):
-    def equation(yD):
-        theta = calculate_theta(yD)
-        area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-        wetted_perimeter = theta * diameter / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        calculated_flow = (1 / roughness) * area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)
-        return calculated_flow - flow_rate
-    return fsolve(equation, 0.5)[0]
-
-# Function to calculate the diameter (D)
-def calculate_diameter(yD, flow_rate, roughness, slope):
-    def equation(diameter):
-        theta = calculate_theta(yD)
-        area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-        wetted_perimeter = theta * diameter / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        calculated_flow = (1 / roughness) * area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)
-        return calculated_flow - flow_rate
-    return fsolve(equation, 1.0)[0]
-
-# Function to calculate flow rate (Q)
-def calculate_flow_rate(diameter, yD, roughness, slope):
-    theta = calculate_theta(yD)
-    area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-    wetted_perimeter = theta * diameter / 2
-    hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-    return (1 / roughness) * area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)
-
-# Function to calculate roughness (n)
-def calculate_roughness(diameter, yD, flow_rate, slope):
-    theta = calculate_theta(yD)
-    area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-    wetted_perimeter = theta * diameter / 2
-    hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-    return (area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)) / flow_rate
-
-# Function to calculate slope (S)
-def calculate_slope(diameter, yD, flow_rate, roughness):
-    theta = calculate_theta(yD)
-    area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-    wetted_perimeter = theta * diameter / 2
-    hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-    return ((flow_rate * roughness) / (area * (hydraulic_radius ** (2 / 3)))) ** 2
-
 # Map variables to formula images
 formula_images = {
     "Flow Rate (Q)": os.path.join(ASSETS_DIR, "flow_rate_formula.png"),
@@ -87,6 +31,38 @@ formula_images = {
     "Velocity (V)": os.path.join(ASSETS_DIR, "velocity_formula.png"),
 }
 
+# Start of this script run, for the per-interaction latency shown in the diagnostics panel
+RUN_STARTED = time.perf_counter()
+
+# Partial reruns: st.fragment (Streamlit >= 1.37), st.experimental_fragment before it, or a full rerun
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda function: function)
+
+
+# Function to read a formula image once per server process (None if the file is missing)
+@st.cache_resource(show_spinner=False)
+def load_formula_image(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Function to solve the selected variable and the derived section properties once per set of inputs
+@st.cache_data(show_spinner=False, max_entries=1024)
+def calculate_results(unknown, flow_rate, diameter, yD, slope, roughness):
+    values = {"flow_rate": flow_rate, "diameter": diameter, "yD": yD, "slope": slope, "roughness": roughness}
+    values[unknown] = cached_solve(unknown, **{name: value for name, value in values.items() if name != unknown})
+    area, wetted_perimeter, hydraulic_radius = calculate_section(values["diameter"], values["yD"])
+    values.update({
+        "area": area,
+        "wetted_perimeter": wetted_perimeter,
+        "hydraulic_radius": hydraulic_radius,
+        "shear_stress": calculate_shear_stress(hydraulic_radius, values["slope"]),
+        "velocity": calculate_velocity(values["flow_rate"], area),
+    })
+    return values
+
+
 # Streamlit Interface
 st.title("Calculation of Circular Channels - Manning Equation")
 st.sidebar.header("Select the variable to calculate")
@@ -97,103 +73,282 @@ variable_to_calculate = st.sidebar.radio(
     options=["Flow Rate (Q)", "Diameter (D)", "y/D", "Slope (S)", "Roughness (n)"]
 )
 
-# Layout with two columns
-col1, col2 = st.columns([1, 2])
-
-with col1:
-    st.header("Input Data")
-    # Input fields for user-provided data
-    flow_rate = st.number_input("Flow Rate (Q) [m³/s]:", value=0.1, step=0.001, format="%.3f")
-    diameter = st.number_input("Diameter (D) [m]:", value=1.0, step=0.001, format="%.3f")
-    yD = st.number_input("y/D (Water Depth / Diameter):", value=0.5, step=0.01, format="%.2f")
-    slope = st.number_input("Slope (S) [m/m]:", value=0.00450, step=0.00001, format="%.5f")
-    roughness = st.number_input("Roughness (n):", value=0.013, step=0.001, format="%.3f")
-
-with col2:
-    # Display the selected formula image
-    st.subheader("Formula:")
-    # Check if the file exists before displaying
-    image_path = formula_images[variable_to_calculate]
-    if os.path.exists(image_path):
-        try:
-            st.image(image_path, use_column_width=True)
-        except Exception as e:
-            st.error(f"Error loading image: {e}")
+# Solver instrumentation is process-wide (also enabled by the MANNING_INSTRUMENT environment variable), so it is
+# only switched when a user toggles the checkbox; on other reruns the checkbox just shows or hides the panel
+def toggle_instrumentation():
+    if st.session_state.diagnostics:
+        instrument.enable()
     else:
-        st.error(f"Image not found: {image_path}")
-
-# Automatic Calculation
-try:
-    hydraulic_radius = None
-    shear_stress = None
-    velocity = None
-
-    if variable_to_calculate == "Flow Rate (Q)":
-        result = calculate_flow_rate(diameter, yD, roughness, slope)
-        theta = calculate_theta(yD)
-        area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-        wetted_perimeter = theta * diameter / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        shear_stress = calculate_shear_stress(hydraulic_radius, slope)
-        velocity = calculate_velocity(result, area)
-        st.success(f"Flow Rate (Q): {result:.4f} m³/s")
-
-    elif variable_to_calculate == "Diameter (D)":
-        result = calculate_diameter(yD, flow_rate, roughness, slope)
-        theta = calculate_theta(yD)
-        area = (theta - math.sin(theta)) * (result ** 2) / 8
-        wetted_perimeter = theta * result / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        shear_stress = calculate_shear_stress(hydraulic_radius, slope)
-        velocity = calculate_velocity(flow_rate, area)
-        st.success(f"Diameter (D): {result:.4f} m")
-
-    elif variable_to_calculate == "y/D":
-        result = calculate_yD(diameter, flow_rate, roughness, slope)
-        theta = calculate_theta(result)
-        area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-        wetted_perimeter = theta * diameter / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        shear_stress = calculate_shear_stress(hydraulic_radius, slope)
-        velocity = calculate_velocity(flow_rate, area)
-        st.success(f"y/D: {result:.4f}")
-
-    elif variable_to_calculate == "Slope (S)":
-        result = calculate_slope(diameter, yD, flow_rate, roughness)
-        theta = calculate_theta(yD)
-        area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-        wetted_perimeter = theta * diameter / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        shear_stress = calculate_shear_stress(hydraulic_radius, result)
-        velocity = calculate_velocity(flow_rate, area)
-        st.success(f"Slope (S): {result:.5f} m/m")
-
-    elif variable_to_calculate == "Roughness (n)":
-        result = calculate_roughness(diameter, yD, flow_rate, slope)
-        theta = calculate_theta(yD)
-        area = (theta - math.sin(theta)) * (diameter ** 2) / 8
-        wetted_perimeter = theta * diameter / 2
-        hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
-        shear_stress = calculate_shear_stress(hydraulic_radius, slope)
-        velocity = calculate_velocity(flow_rate, area)
-        st.success(f"Roughness (n): {result:.4f}")
-
-    # Display Shear Stress and Velocity in all cases
-    if shear_stress is not None:
-       st.success(f"Shear Stress (τ): {shear_stress:.2f} N/m²")
-
-    if velocity is not None:
-        st.success(f"Velocity (V): {velocity:.2f} m/s")
-
-    # Display all results
-    st.subheader("Results:")
-    st.markdown(f"""
-    - **Flow Rate (Q):** {flow_rate:.4f} m³/s {"(calculated)" if variable_to_calculate == "Flow Rate (Q)" else ""}
-    - **Diameter (D):** {diameter:.4f} m {"(calculated)" if variable_to_calculate == "Diameter (D)" else ""}
-    - **y/D:** {yD:.4f} {"(calculated)" if variable_to_calculate == "y/D" else ""}
-    - **Slope (S):** {slope:.5f} m/m {"(calculated)" if variable_to_calculate == "Slope (S)" else ""}
-    - **Roughness (n):** {roughness:.4f} {"(calculated)" if variable_to_calculate == "Roughness (n)" else ""}
-    """)
-
-except Exception as e:
-    st.error(f"An error occurred: {e}")
\ No newline at end of file
+        instrument.disable()
+
+st.session_state.setdefault("diagnostics", instrument.is_enabled())
+show_diagnostics = st.sidebar.checkbox("Diagnostics", key="diagnostics", on_change=toggle_instrumentation)
+
+# Variable names used by the solvers for each option of the sidebar
+UNKNOWNS = {
+    "Flow Rate (Q)": "flow_rate",
+    "Diameter (D)": "diameter",
+    "y/D": "yD",
+    "Slope (S)": "slope",
+    "Roughness (n)": "roughness",
+}
+
+# Input fields (session state keys) with their labels, default values, steps and formats
+INPUTS = {
+    "flow_rate": ("Flow Rate (Q) [m³/s]:", 0.1, 0.001, "%.3f"),
+    "diameter": ("Diameter (D) [m]:", 1.0, 0.001, "%.3f"),
+    "yD": ("y/D (Water Depth / Diameter):", 0.5, 0.01, "%.2f"),
+    "slope": ("Slope (S) [m/m]:", 0.00450, 0.00001, "%.5f"),
+    "roughness": ("Roughness (n):", 0.013, 0.001, "%.3f"),
+}
+
+
+# Function to get the current input values; the panels below read them from the session state, so that changing
+# an input only reruns the calculator fragment
+def current_inputs():
+    return {name: st.session_state.get(name, default) for name, (_, default, _, _) in INPUTS.items()}
+
+
+# Inputs and results rerun on their own when an input changes (the rest of the page is left as it is)
+@fragment
+@instrument.timed("app.calculator")
+def calculator(variable_to_calculate):
+    # Layout with two columns
+    col1, col2 = st.columns([1, 2])
+
+    with col1:
+        st.header("Input Data")
+        # Input fields for user-provided data
+        for name, (label, default, step, number_format) in INPUTS.items():
+            st.number_input(label, value=default, step=step, format=number_format, key=name)
+
+    with col2:
+        # Display the selected formula image
+        st.subheader("Formula:")
+        image = load_formula_image(formula_images[variable_to_calculate])
+        if image is not None:
+            st.image(image, use_column_width=True)
+        else:
+            st.error(f"Image not found: {formula_images[variable_to_calculate]}")
+
+    # Automatic Calculation
+    inputs = current_inputs()
+    try:
+        results = calculate_results(UNKNOWNS[variable_to_calculate], inputs["flow_rate"], inputs["diameter"],
+                                    inputs["yD"], inputs["slope"], inputs["roughness"])
+        calculated = {
+            "Flow Rate (Q)": f"Flow Rate (Q): {results['flow_rate']:.4f} m³/s",
+            "Diameter (D)": f"Diameter (D): {results['diameter']:.4f} m",
+            "y/D": f"y/D: {results['yD']:.4f}",
+            "Slope (S)": f"Slope (S): {results['slope']:.5f} m/m",
+            "Roughness (n)": f"Roughness (n): {results['roughness']:.4f}",
+        }
+        st.success(calculated[variable_to_calculate])
+
+        # Display Shear Stress and Velocity in all cases
+        if results["shear_stress"] is not None:
+           st.success(f"Shear Stress (τ): {results['shear_stress']:.2f} N/m²")
+
+        if results["velocity"] is not None:
+            st.success(f"Velocity (V): {results['velocity']:.2f} m/s")
+
+        # Display all results
+        st.subheader("Results:")
+        st.markdown(f"""
+        - **Flow Rate (Q):** {results['flow_rate']:.4f} m³/s {"(calculated)" if variable_to_calculate == "Flow Rate (Q)" else ""}
+        - **Diameter (D):** {results['diameter']:.4f} m {"(calculated)" if variable_to_calculate == "Diameter (D)" else ""}
+        - **y/D:** {results['yD']:.4f} {"(calculated)" if variable_to_calculate == "y/D" else ""}
+        - **Slope (S):** {results['slope']:.5f} m/m {"(calculated)" if variable_to_calculate == "Slope (S)" else ""}
+        - **Roughness (n):** {results['roughness']:.4f} {"(calculated)" if variable_to_calculate == "Roughness (n)" else ""}
+        """)
+
+    except Exception as e:
+        logging.exception(f"Calculation of {variable_to_calculate} failed")
+        st.error(f"An error occurred: {e}")
+
+calculator(variable_to_calculate)
+
+
+# Function to show which input values a panel used, with a button that reruns the panel with the current ones
+def panel_inputs(names, key):
+    inputs = current_inputs()
+    caption_column, button_column = st.columns([3, 1])
+    caption_column.caption("Using " + ", ".join(f"{INPUTS[name][0].split(' [')[0].rstrip(':')} = {inputs[name]:g}"
+                                                for name in names))
+    button_column.button("Use current inputs", key=key)
+    return inputs
+
+
+# Design charts, cached per parameter set so that unchanged curves are not recomputed on reruns.
+# They are drawn from fixed Vega-Lite specs: st.line_chart/st.altair_chart rebuild and validate an Altair
+# chart with every data point on each rerun, which cost more than the rest of the script together.
+@st.cache_data(show_spinner=False)
+def load_partial_flow_chart(points):
+    curves = partial_flow_curves(points)
+    frame = pd.DataFrame({"y/D": curves["yD"], "Q/Qfull": curves["flow_ratio"], "V/Vfull": curves["velocity_ratio"]})
+    return frame.melt(id_vars="y/D", var_name="Ratio", value_name="Value")
+
+@st.cache_data(show_spinner=False)
+def load_capacity_chart(roughness, yD, min_slope, max_slope, points):
+    curves = capacity_curves(roughness, yD, min_slope=min_slope, max_slope=max_slope, points=points)
+    frame = pd.DataFrame(curves["flow_rate"], columns=[f"{d:.2f}" for d in curves["diameters"]])
+    frame["Slope (S) [m/m]"] = curves["slope"]
+    return frame.melt(id_vars="Slope (S) [m/m]", var_name="Diameter (D) [m]", value_name="Flow Rate (Q) [m³/s]")
+
+PARTIAL_FLOW_SPEC = {
+    "mark": "line",
+    "encoding": {
+        "x": {"field": "y/D", "type": "quantitative"},
+        "y": {"field": "Value", "type": "quantitative", "title": "Q/Qfull, V/Vfull"},
+        "color": {"field": "Ratio", "type": "nominal"},
+    },
+}
+
+CAPACITY_SPEC = {
+    "mark": "line",
+    "encoding": {
+        "x": {"field": "Slope (S) [m/m]", "type": "quantitative", "scale": {"type": "log"}},
+        "y": {"field": "Flow Rate (Q) [m³/s]", "type": "quantitative", "scale": {"type": "log"}},
+        "color": {"field": "Diameter (D) [m]", "type": "nominal"},
+    },
+}
+
+# Panels rerun on their own when their controls change (fragments); they read the inputs when they run
+@fragment
+@instrument.timed("app.design_charts")
+def design_charts():
+    roughness = panel_inputs(["roughness"], "design_charts_inputs")["roughness"]
+    chart_points = st.select_slider("Points per curve:", options=[1000, 2000, 5000, 10000], value=10000)
+
+    st.subheader("Partial flow: Q/Qfull and V/Vfull vs y/D")
+    st.vega_lite_chart(load_partial_flow_chart(chart_points), PARTIAL_FLOW_SPEC, use_container_width=True)
+
+    st.subheader("Flow capacity vs slope")
+    chart_yD = st.slider("y/D for the capacity chart:", min_value=0.1, max_value=1.0, value=1.0, step=0.05)
+    min_slope, max_slope = st.select_slider(
+        "Slope range (S) [m/m]:", options=[0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1],
+        value=(0.0001, 0.05))
+    capacity = load_capacity_chart(roughness, chart_yD, min_slope, max_slope, chart_points)
+    st.vega_lite_chart(capacity, CAPACITY_SPEC, use_container_width=True)
+
+with st.expander("Design Charts"):
+    design_charts()
+
+
+# Uncertainty analysis: Monte Carlo percentiles and analytic sensitivities of the calculated variable
+@st.cache_data(show_spinner="Sampling...")
+def load_uncertainty(unknown, nominal, cvs, samples):
+    inputs = {name: Distribution("lognormal", mean=value, cv=cvs[name]) if cvs.get(name) else value
+              for name, value in nominal.items() if name != unknown}
+    summary = monte_carlo(unknown, inputs, samples=samples, seed=0)
+    result = cached_solve(unknown, **{name: value for name, value in nominal.items() if name != unknown})
+    derivatives = sensitivities(unknown, **{name: value for name, value in nominal.items() if name != unknown})
+    return summary, result, {name: float(value) for name, value in derivatives.items()}
+
+@fragment
+@instrument.timed("app.uncertainty")
+def uncertainty_panel(variable_to_calculate):
+    unknown = UNKNOWNS[variable_to_calculate]
+    nominal = panel_inputs([name for name in INPUTS if name != unknown], "uncertainty_inputs")
+    labels = {name: label for label, name in UNKNOWNS.items()}
+
+    st.write("Coefficient of variation of each input (lognormal, 0 = exact):")
+    cvs = {}
+    cv_columns = st.columns(4)
+    for column, name in zip(cv_columns, [name for name in nominal if name != unknown]):
+        cvs[name] = column.number_input(f"{labels[name]} CV [%]:", min_value=0.0, max_value=100.0,
+                                        value=10.0 if name in ("roughness", "slope") else 0.0, step=1.0) / 100
+    samples = st.select_slider("Samples:", options=[10_000, 100_000, 1_000_000, 5_000_000], value=100_000)
+
+    try:
+        summary, result, derivatives = load_uncertainty(unknown, nominal, cvs, samples)
+        low, median, high = (summary.percentiles[q] for q in (5, 50, 95))
+        st.success(f"{variable_to_calculate}: median {median:.5g}, 90% band [{low:.5g}, {high:.5g}] "
+                   f"(mean {summary.mean:.5g}, std {summary.std:.3g})")
+        if summary.failed:
+            st.warning(f"{summary.failed} of {samples} samples had no solution (e.g. flow above the pipe capacity)")
+
+        st.table(pd.DataFrame({
+            "Derivative": derivatives,
+            "Elasticity (%/%)": {name: value * nominal[name] / result for name, value in derivatives.items()},
+        }).rename(index=labels))
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+
+with st.expander("Uncertainty"):
+    uncertainty_panel(variable_to_calculate)
+
+
+# Minimum-cost design: commercial diameter and slope for the flow rate and roughness of the inputs
+@st.cache_data(show_spinner=False)
+def load_optimal_design(flow_rate, roughness, length, ground_slope, max_yD, min_velocity, min_cover):
+    design = optimize_design(flow_rate, length, ground_slope, material=roughness, max_yD=max_yD,
+                             min_velocity=min_velocity, min_cover=min_cover)
+    return {name: value.item() for name, value in design._asdict().items()}
+
+@fragment
+@instrument.timed("app.optimal_design")
+def optimal_design_panel():
+    inputs = panel_inputs(["flow_rate", "roughness"], "optimal_design_inputs")
+    flow_rate, roughness = inputs["flow_rate"], inputs["roughness"]
+    length_column, ground_column, cover_column = st.columns(3)
+    length = length_column.number_input("Segment length [m]:", min_value=1.0, value=100.0, step=10.0)
+    ground_slope = ground_column.number_input("Ground slope [m/m]:", value=0.0, step=0.001, format="%.4f")
+    min_cover = cover_column.number_input("Minimum cover [m]:", min_value=0.0, value=1.0, step=0.1)
+    limit_column, velocity_column = st.columns(2)
+    max_yD = limit_column.slider("Maximum y/D:", min_value=0.3, max_value=0.9, value=0.75, step=0.05)
+    min_velocity = velocity_column.number_input("Minimum velocity [m/s]:", min_value=0.0, value=0.6, step=0.1)
+
+    design = load_optimal_design(flow_rate, roughness, length, ground_slope, max_yD, min_velocity or None,
+                                 min_cover)
+    if not design["feasible"]:
+        st.error("No catalog diameter and slope meet the design limits")
+        return
+    st.success(f"Diameter (D): {design['diameter']:.2f} m, Slope (S): {design['slope']:.5f} m/m "
+               f"(y/D {design['yD']:.3f}, V {design['velocity']:.2f} m/s, τ {design['shear_stress']:.2f} N/m²)")
+    st.write(f"Invert depth {design['upstream_depth']:.2f} m → {design['downstream_depth']:.2f} m, "
+             f"cost {design['cost']:,.0f}")
+
+with st.expander("Optimal Design"):
+    optimal_design_panel()
+
+
+# Diagnostics panel: solver call timings, convergence statistics, cache hit rate and app run latency
+@fragment
+def diagnostics_panel():
+    if not instrument.is_enabled():
+        st.info("Instrumentation was switched off in another session; toggle Diagnostics to switch it back on.")
+    metrics = instrument.snapshot()
+    cache = metrics["sources"].get("solve_cache", {})
+    if cache.get("hit_rate") is not None:
+        st.write(f"Solve cache: {cache['hits']} hits, {cache['misses']} misses "
+                 f"(hit rate {cache['hit_rate']:.0%}, {cache['currsize']}/{cache['maxsize']} entries)")
+
+    if metrics["timings"]:
+        st.subheader("Timings")
+        st.dataframe(pd.DataFrame({
+            name: {"calls": t["calls"], "errors": sum(t["errors"].values()), "mean [ms]": t["mean_ms"],
+                   "p95 [ms]": t["p95_ms"], "max [ms]": t["max_ms"], "total [ms]": t["total_ms"]}
+            for name, t in metrics["timings"].items()
+        }).T)
+    if metrics["convergence"]:
+        st.subheader("Convergence")
+        st.dataframe(pd.DataFrame(metrics["convergence"]).T)
+    if metrics["counters"]:
+        st.subheader("Counters")
+        st.json(metrics["counters"])
+
+    reset_column, log_column = st.columns(2)
+    if reset_column.button("Reset statistics"):
+        # Only the statistics: the cached solves are shared with every other session
+        instrument.reset()
+        default_cache.reset_statistics()
+    if log_column.button("Write snapshot to log"):
+        instrument.log_snapshot()
+
+# Time of the full script run, shown in the diagnostics panel from the next run on
+instrument.record_timing("app.run", time.perf_counter() - RUN_STARTED)
+
+if show_diagnostics:
+    with st.expander("Diagnostics", expanded=True):
+        diagnostics_panel()
@@ -10,6 +10,7 @@ streamlit_data = collect_data_files('streamlit')
 added_files = [
     ('circular_channel_calculator.py', '.'),
     ('fix_metadata.py', '.'),
+    ('manning', 'manning'),
     ('assets', 'assets'),
 ] + streamlit_data
 
@@ -41,6 +42,18 @@ a = Analysis(
         'streamlit.web.server.server',
         'streamlit.web.server.server_util',
         'streamlit.elements.widgets',
+        'manning',
+        'manning.core',
+        'manning.cache',
+        'manning.charts',
+        'manning.batch',
+        'manning.yd_solver',
+        'manning.pressure',
+        'manning.uncertainty',
+        'manning.instrument',
+        'manning.optimize',
+        'manning.catalog',
+        'manning.tables',
     ],
     hookspath=[],
     hooksconfig={},
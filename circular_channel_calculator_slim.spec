@@ -0,0 +1,116 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Slim build profile: bundles only what the calculator imports, without UPX.
+#   pyinstaller circular_channel_calculator_slim.spec                 -> one-file EXE
+#   set SLIM_ONEDIR=1 && pyinstaller circular_channel_calculator_slim.spec  -> one-folder build (no unpacking on start)
+import os
+
+block_cipher = None
+
+onedir = os.environ.get('SLIM_ONEDIR', '') not in ('', '0')
+
+# Streamlit static files are collected by hooks/hook-streamlit.py (without source maps)
+added_files = [
+    ('circular_channel_calculator.py', '.'),
+    ('fix_metadata.py', '.'),
+    ('manning', 'manning'),
+    ('assets', 'assets'),
+]
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=[],
+    datas=added_files,
+    hiddenimports=[
+        # Imported by the Streamlit script, which PyInstaller does not analyse
+        'manning',
+        'manning.core',
+        'manning.cache',
+        'manning.charts',
+        'manning.batch',
+        # Imported by manning.batch inside functions, so the analysis misses them
+        'manning.yd_solver',
+        'manning.pressure',
+        'manning.uncertainty',
+        'manning.instrument',
+        'manning.optimize',
+        'manning.catalog',
+        'manning.tables',
+        'scipy.optimize',
+        'streamlit.web.bootstrap',
+    ],
+    hookspath=['hooks'],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[
+        'tkinter',
+        'matplotlib',
+        'plotly',
+        'dash',
+        'watchdog',
+        'IPython',
+        'ipywidgets',
+        'notebook',
+        'jupyter_client',
+        'pytest',
+        'scipy.io',
+        'scipy.ndimage',
+        'scipy.signal',
+        'scipy.datasets',
+        'scipy.odr',
+        'scipy.misc',
+    ],
+    win_no_prefer_redirects=False,
+    win_private_assemblies=False,
+    cipher=block_cipher,
+    noarchive=False
+)
+
+pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+
+if onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='Circular_Channel_Calculator',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=True,
+        disable_windowed_traceback=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        strip=False,
+        upx=False,
+        name='Circular_Channel_Calculator',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        [],
+        name='Circular_Channel_Calculator',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        runtime_tmpdir=None,
+        console=True,
+        disable_windowed_traceback=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
@@ -19,7 +19,16 @@ License: Apache 2
         base_path = os.path.dirname(os.path.abspath(__file__))
 
     metadata_dir = os.path.join(base_path, 'streamlit-1.24.0.dist-info')
+    metadata_path = os.path.join(metadata_dir, 'METADATA')
+
+    # Só escreve o metadata quando ele ainda não existe (ou está diferente)
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            if f.read() == metadata_content:
+                return False
+
     os.makedirs(metadata_dir, exist_ok=True)
 
-    with open(os.path.join(metadata_dir, 'METADATA'), 'w') as f:
-        f.write(metadata_content)
\ No newline at end of file
+    with open(metadata_path, 'w') as f:
+        f.write(metadata_content)
+    return True
@@ -1,17 +1,37 @@
 import os
 import sys
-import logging
-import fix_metadata
-import webbrowser
 import time
+import atexit
+import logging
+import logging.handlers
+import queue
 import socket
+import threading
+import webbrowser
+import fix_metadata
+
+START_TIME = time.perf_counter()
 
-# Configuração de logging
-logging.basicConfig(
-    filename='app.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Porta preferida do servidor (APP_PORT=0 escolhe qualquer porta livre)
+DEFAULT_PORT = 8501
+
+
+# Configuração de logging: os registros vão para uma fila e são gravados em app.log por outra thread
+def setup_logging():
+    log_queue = queue.Queue(-1)
+    file_handler = logging.FileHandler('app.log')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.DEBUG if os.environ.get('APP_DEBUG') else logging.INFO)
+
+
+def elapsed_ms():
+    return (time.perf_counter() - START_TIME) * 1000
 
 
 def is_port_in_use(port):
@@ -19,106 +39,109 @@ def is_port_in_use(port):
         return s.connect_ex(('localhost', port)) == 0
 
 
+# Usa a porta preferida se estiver livre, senão pede uma porta livre ao sistema
+def find_free_port(preferred=DEFAULT_PORT):
+    if preferred and not is_port_in_use(preferred):
+        return preferred
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
 def wait_for_server(port, timeout=30):
     start_time = time.time()
     while time.time() - start_time < timeout:
         if is_port_in_use(port):
             return True
-        time.sleep(0.1)
+        time.sleep(0.05)
     return False
 
 
+# Faz o Streamlit avisar quando o servidor estiver pronto, em vez de esperar e testar a porta
+def install_ready_hook(bootstrap, on_ready):
+    on_server_start = getattr(bootstrap, '_on_server_start', None)
+    if on_server_start is None:
+        return False
+
+    def _on_server_start(server):
+        on_server_start(server)
+        on_ready()
+
+    bootstrap._on_server_start = _on_server_start
+    return True
+
+
 def run_app():
     try:
+        setup_logging()
+        timings = {}
+
         # Porta do servidor
-        SERVER_PORT = 8501
-
-        # Configurações do Streamlit
-        os.environ.update({
-            'STREAMLIT_BROWSER_GATHER_USAGE_STATS': 'false',
-            'STREAMLIT_SERVER_PORT': str(SERVER_PORT),
-            'STREAMLIT_SERVER_HEADLESS': 'true',
-            'STREAMLIT_CHECK_VERSION': 'false',
-            'STREAMLIT_SERVER_ENABLEXSRFPROTECTION': 'false',
-            'STREAMLIT_SERVER_ENABLECORS': 'true',
-            'STREAMLIT_SERVER_ADDRESS': 'localhost',
-            'STREAMLIT_BROWSER_SERVER_ADDRESS': 'localhost',
-            'STREAMLIT_BROWSER_SERVER_PORT': str(SERVER_PORT),
-            'STREAMLIT_CLIENT_TOOLBAR_MODE': 'minimal',
-            'STREAMLIT_THEME_BASE': 'light',
-            'STREAMLIT_DEVELOPMENT_MODE': 'false',
-            'STREAMLIT_SERVER_RUN_ON_SAVE': 'false',
-            'STREAMLIT_SERVER_FILE_WATCHER_TYPE': 'none',
-            'STREAMLIT_BROWSER_GATHER_USAGE_STATS': 'false'
-        })
-
-        # Cria o metadata fake
-        fix_metadata.create_fake_metadata()
+        server_port = find_free_port(int(os.environ.get('APP_PORT', DEFAULT_PORT)))
+
+        # Cria o metadata fake apenas se ainda não existir
+        if fix_metadata.create_fake_metadata():
+            logging.info("Streamlit metadata written")
+        timings['metadata'] = elapsed_ms()
 
         # Determina o caminho base
         if getattr(sys, 'frozen', False):
             base_path = sys._MEIPASS
-            logging.debug(f"Running from frozen application. Base path: {base_path}")
         else:
             base_path = os.path.dirname(os.path.abspath(__file__))
-            logging.debug(f"Running from script. Base path: {base_path}")
 
         # Configura caminhos
         main_script = os.path.join(base_path, 'circular_channel_calculator.py')
         os.environ['BASE_DIR'] = base_path
         os.environ['ASSETS_DIR'] = os.path.join(base_path, 'assets')
-
         logging.debug(f"Main script path: {main_script}")
-        logging.debug(f"Assets path: {os.environ['ASSETS_DIR']}")
-
-        def open_browser():
-            time.sleep(2)
-            if wait_for_server(SERVER_PORT):
-                url = f'http://localhost:{SERVER_PORT}'
-                logging.debug(f"Opening browser at {url}")
-                webbrowser.open(url)
-            else:
-                logging.error(f"Server did not start on port {SERVER_PORT}")
-
-        # Inicia o thread do navegador
-        import threading
-        browser_thread = threading.Thread(target=open_browser, daemon=True)
-        browser_thread.start()
-
-        # Importa e configura o Streamlit
-        import streamlit.web.bootstrap as bootstrap
-        import streamlit.config as config
-
-        # Configura o Streamlit
-        config.set_option('server.port', SERVER_PORT)
-        config.set_option('server.address', 'localhost')
-        config.set_option('server.headless', True)
-        config.set_option('server.enableCORS', True)
-        config.set_option('server.enableXsrfProtection', False)
-        config.set_option('global.developmentMode', False)
-
-        # Configura argumentos do Streamlit
-        sys.argv = ["streamlit", "run", main_script,
-                    "--server.port", str(SERVER_PORT),
-                    "--server.address", "localhost",
-                    "--server.headless", "true",
-                    "--server.enableCORS", "true",
-                    "--server.enableXsrfProtection", "false"]
 
-        # Inicia o Streamlit
-        logging.debug("Starting Streamlit server...")
-        bootstrap.run(main_script, '', [], {
-            'server.port': SERVER_PORT,
+        # Importa o Streamlit
+        import streamlit.web.bootstrap as bootstrap
+        timings['streamlit_import'] = elapsed_ms()
+
+        url = f'http://localhost:{server_port}'
+
+        def on_ready():
+            timings['server_ready'] = elapsed_ms()
+            webbrowser.open(url)
+            timings['browser_opened'] = elapsed_ms()
+            report = ", ".join(f"{name} {value:.0f} ms" for name, value in timings.items())
+            logging.info(f"Startup timings: {report}")
+            print(f"Calculator running at {url} (startup: {report})")
+
+        if not install_ready_hook(bootstrap, on_ready):
+            # Versões do Streamlit sem o hook: testa a porta em segundo plano
+            def poll_and_open():
+                if wait_for_server(server_port):
+                    on_ready()
+                else:
+                    logging.error(f"Server did not start on port {server_port}")
+
+            threading.Thread(target=poll_and_open, daemon=True).start()
+
+        # Configurações do Streamlit, definidas em um único lugar
+        flag_options = {
+            'server.port': server_port,
             'server.address': 'localhost',
             'server.headless': True,
             'server.enableCORS': True,
             'server.enableXsrfProtection': False,
+            'server.runOnSave': False,
+            'server.fileWatcherType': 'none',
             'browser.serverAddress': 'localhost',
-            'browser.serverPort': SERVER_PORT,
+            'browser.serverPort': server_port,
+            'browser.gatherUsageStats': False,
+            'client.toolbarMode': 'minimal',
+            'theme.base': 'light',
             'global.developmentMode': False,
             'runner.fastReruns': False,
-            'server.runOnSave': False
-        })
+        }
+        bootstrap.load_config_options(flag_options=flag_options)
+
+        # Inicia o Streamlit
+        logging.info(f"Starting Streamlit server on port {server_port}")
+        bootstrap.run(main_script, '', [], flag_options)
 
     except Exception as e:
         logging.error(f"Error running app: {e}", exc_info=True)
@@ -127,4 +150,4 @@ def run_app():
 
 
 if __name__ == '__main__':
-    run_app()
\ No newline at end of file
+    run_app()
@@ -0,0 +1,37 @@
+# Manning equation solvers for circular channels, free of any UI code.
+# Only the scalar core (math) is imported eagerly; the NumPy/SciPy modules load on first use.
+import importlib
+
+from .core import (
+    SPECIFIC_WEIGHT,
+    VARIABLES,
+    YD_MAX_FLOW,
+    calculate_diameter,
+    calculate_flow_rate,
+    calculate_hydraulic_radius,
+    calculate_roughness,
+    calculate_section,
+    calculate_shear_stress,
+    calculate_slope,
+    calculate_theta,
+    calculate_velocity,
+    calculate_yD,
+)
+
+# Names re-exported lazily from the NumPy based modules
+_LAZY_ATTRIBUTES = {
+    "section_properties": "batch",
+    "solve": "batch",
+    "solve_frame": "batch",
+    "solve_yD": "yd_solver",
+    "solve_yD_batch": "yd_solver",
+    "get_section_table": "tables",
+    "lookup_yD": "tables",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
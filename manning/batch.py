@@ -0,0 +1,152 @@
+import numpy as np
+
+from .core import SPECIFIC_WEIGHT, VARIABLES
+from .instrument import increment, timed
+
+
+# Function to convert an input to a float array
+def _as_array(value):
+    return np.asarray(value, dtype=float)
+
+
+# Function to calculate the central angle (theta) for arrays of y/D
+def batch_theta(yD):
+    with np.errstate(invalid="ignore"):
+        return 2 * np.arccos(1 - 2 * _as_array(yD))
+
+
+# Function to calculate the hydraulic radius for arrays (NaN for an empty section)
+def batch_hydraulic_radius(area, wetted_perimeter):
+    area, wetted_perimeter = _as_array(area), _as_array(wetted_perimeter)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(wetted_perimeter != 0, area / wetted_perimeter, np.nan)
+
+
+# Function to calculate velocity for arrays (NaN for an empty section)
+def batch_velocity(flow_rate, area):
+    flow_rate, area = _as_array(flow_rate), _as_array(area)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(area != 0, flow_rate / area, np.nan)
+
+
+# Function to calculate theta, area, wetted perimeter and hydraulic radius
+def section_properties(diameter, yD):
+    diameter = _as_array(diameter)
+    theta = batch_theta(yD)
+    area = (theta - np.sin(theta)) * (diameter ** 2) / 8
+    wetted_perimeter = theta * diameter / 2
+    hydraulic_radius = batch_hydraulic_radius(area, wetted_perimeter)
+    return theta, area, wetted_perimeter, hydraulic_radius
+
+
+# Function to calculate the conveyance term A * R^(2/3)
+def _conveyance(diameter, yD):
+    _, area, _, hydraulic_radius = section_properties(diameter, yD)
+    return area * (hydraulic_radius ** (2 / 3))
+
+
+# Function to calculate flow rate (Q) for arrays
+def batch_flow_rate(diameter, yD, roughness, slope):
+    return (1 / _as_array(roughness)) * _conveyance(diameter, yD) * (_as_array(slope) ** 0.5)
+
+
+# Function to calculate roughness (n) for arrays
+def batch_roughness(diameter, yD, flow_rate, slope):
+    return (_conveyance(diameter, yD) * (_as_array(slope) ** 0.5)) / _as_array(flow_rate)
+
+
+# Function to calculate slope (S) for arrays
+def batch_slope(diameter, yD, flow_rate, roughness):
+    return ((_as_array(flow_rate) * _as_array(roughness)) / _conveyance(diameter, yD)) ** 2
+
+
+# Function to calculate y/D for arrays (lower root, NaN where the flow exceeds the pipe capacity)
+def batch_yD(diameter, flow_rate, roughness, slope):
+    from .yd_solver import solve_yD_batch
+    return solve_yD_batch(diameter, flow_rate, roughness, slope).yD
+
+
+# Function to calculate the dimensionless section factor A * R^(2/3) / D^(8/3) for arrays of y/D
+def section_factor(yD):
+    theta = batch_theta(yD)
+    area_factor = (theta - np.sin(theta)) / 8
+    with np.errstate(divide="ignore", invalid="ignore"):
+        radius_factor = np.where(theta != 0, (theta - np.sin(theta)) / (4 * theta), 0.0)
+    return area_factor * (radius_factor ** (2 / 3))
+
+
+# Function to calculate the derivative of the section factor with respect to y/D
+def section_factor_derivative(yD):
+    yD = _as_array(yD)
+    theta = batch_theta(yD)
+    area_factor = (theta - np.sin(theta)) / 8
+    with np.errstate(divide="ignore", invalid="ignore"):
+        radius_factor = (theta - np.sin(theta)) / (4 * theta)
+        d_radius_factor = ((1 - np.cos(theta)) * theta - (theta - np.sin(theta))) / (4 * theta ** 2)
+        d_section_factor = ((1 - np.cos(theta)) / 8 * (radius_factor ** (2 / 3))
+                            + area_factor * (2 / 3) * (radius_factor ** (-1 / 3)) * d_radius_factor)
+        return d_section_factor * 2 / np.sqrt(yD * (1 - yD))
+
+
+# Function to calculate the diameter (D) for arrays in closed form, since Q scales with D^(8/3)
+def batch_diameter(yD, flow_rate, roughness, slope):
+    with np.errstate(divide="ignore"):
+        return ((_as_array(flow_rate) * _as_array(roughness))
+                / (section_factor(yD) * (_as_array(slope) ** 0.5))) ** (3 / 8)
+
+
+_SOLVERS = {
+    "flow_rate": (batch_flow_rate, ("diameter", "yD", "roughness", "slope")),
+    "diameter": (batch_diameter, ("yD", "flow_rate", "roughness", "slope")),
+    "yD": (batch_yD, ("diameter", "flow_rate", "roughness", "slope")),
+    "slope": (batch_slope, ("diameter", "yD", "flow_rate", "roughness")),
+    "roughness": (batch_roughness, ("diameter", "yD", "flow_rate", "slope")),
+}
+
+
+# Function to solve one unknown for arrays of inputs, returning all variables and derived quantities.
+# With surcharge=True a y/D solve lets pipes above the gravity capacity run full under pressure (see
+# manning.pressure) and adds the friction_slope and surcharged columns; the other unknowns ignore it.
+@timed()
+def solve(unknown, diameter=None, yD=None, slope=None, roughness=None, flow_rate=None,
+          specific_weight=SPECIFIC_WEIGHT, surcharge=False, roughness_height=None):
+    if unknown not in _SOLVERS:
+        raise ValueError(f"Unknown variable to calculate: {unknown!r} (expected one of {', '.join(VARIABLES)})")
+
+    values = {"flow_rate": flow_rate, "diameter": diameter, "yD": yD, "slope": slope, "roughness": roughness}
+    function, arguments = _SOLVERS[unknown]
+    missing = [name for name in arguments if values[name] is None]
+    if missing:
+        raise ValueError(f"Missing input(s) to calculate {unknown}: {', '.join(missing)}")
+
+    inputs = np.broadcast_arrays(*(_as_array(values[name]) for name in arguments))
+    values.update(zip(arguments, inputs))
+    surcharge = surcharge and unknown == "yD"
+    if surcharge:
+        from .pressure import solve_surcharged
+        values["yD"], friction_slope, surcharged = solve_surcharged(*inputs, roughness_height=roughness_height)
+    else:
+        values[unknown] = function(*inputs)
+    increment(f"rows_solved.{unknown}", values[unknown].size)
+
+    theta, area, wetted_perimeter, hydraulic_radius = section_properties(values["diameter"], values["yD"])
+    results = {name: values[name] for name in VARIABLES}
+    results.update({
+        "theta": theta,
+        "area": area,
+        "wetted_perimeter": wetted_perimeter,
+        "hydraulic_radius": hydraulic_radius,
+        "velocity": batch_velocity(values["flow_rate"], area),
+        "shear_stress": specific_weight * hydraulic_radius * (friction_slope if surcharge else values["slope"]),
+    })
+    if surcharge:
+        results.update({"friction_slope": np.broadcast_to(friction_slope, area.shape), "surcharged": surcharged})
+    return results
+
+
+# Function to solve one unknown for every row of a DataFrame with columns named like VARIABLES
+def solve_frame(frame, unknown, specific_weight=SPECIFIC_WEIGHT, surcharge=False):
+    inputs = {name: frame[name].to_numpy(dtype=float) for name in VARIABLES
+              if name != unknown and name in frame.columns}
+    results = solve(unknown, specific_weight=specific_weight, surcharge=surcharge, **inputs)
+    return frame.assign(**results)
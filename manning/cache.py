@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from .core import (
+    VARIABLES,
+    calculate_diameter,
+    calculate_flow_rate,
+    calculate_roughness,
+    calculate_slope,
+    calculate_yD,
+)
+from .instrument import register_source
+
+# Default number of cached solves, overridable with the MANNING_CACHE_SIZE environment variable
+DEFAULT_MAXSIZE = int(os.environ.get("MANNING_CACHE_SIZE", 4096))
+
+# Significant digits kept when quantizing inputs into cache keys
+DEFAULT_DIGITS = 10
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Scalar function and argument names for each variable to calculate
+CALCULATIONS = {
+    "flow_rate": (calculate_flow_rate, ("diameter", "yD", "roughness", "slope")),
+    "diameter": (calculate_diameter, ("yD", "flow_rate", "roughness", "slope")),
+    "yD": (calculate_yD, ("diameter", "flow_rate", "roughness", "slope")),
+    "slope": (calculate_slope, ("diameter", "yD", "flow_rate", "roughness")),
+    "roughness": (calculate_roughness, ("diameter", "yD", "flow_rate", "slope")),
+}
+
+
+# Function to round a value to a number of significant digits
+def _quantize(value, digits):
+    return float(f"{float(value):.{digits}g}")
+
+
+class SolveCache:
+    # Thread-safe LRU cache of scalar solves keyed on (unknown, D, y/D, S, n, Q) rounded to `digits`
+    # significant digits, shared by every session of a server process
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, digits=DEFAULT_DIGITS):
+        self.maxsize = maxsize
+        self.digits = digits
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def solve(self, unknown, diameter=None, yD=None, slope=None, roughness=None, flow_rate=None):
+        if unknown not in CALCULATIONS:
+            raise ValueError(f"Unknown variable to calculate: {unknown!r} (expected one of {', '.join(VARIABLES)})")
+
+        function, arguments = CALCULATIONS[unknown]
+        values = {"diameter": diameter, "yD": yD, "slope": slope, "roughness": roughness, "flow_rate": flow_rate}
+        inputs = tuple(_quantize(values[name], self.digits) for name in arguments)
+        key = (unknown,) + inputs
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Solve outside the lock so that concurrent sessions are not serialized; errors are not cached
+        result = function(*inputs)
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def cache_info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def cache_clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    # Function to zero the hit/miss counters, keeping the cached entries
+    def reset_statistics(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+# Cache shared by the Streamlit and Dash apps
+default_cache = SolveCache()
+
+
+# Function to report the statistics of the shared cache in instrumentation snapshots
+def _cache_statistics():
+    info = default_cache.cache_info()
+    lookups = info.hits + info.misses
+    return dict(info._asdict(), hit_rate=info.hits / lookups if lookups else None)
+
+
+register_source("solve_cache", _cache_statistics)
+
+
+# Function to solve one unknown through the shared cache
+def cached_solve(unknown, diameter=None, yD=None, slope=None, roughness=None, flow_rate=None):
+    return default_cache.solve(unknown, diameter=diameter, yD=yD, slope=slope, roughness=roughness,
+                               flow_rate=flow_rate)
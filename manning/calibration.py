@@ -0,0 +1,176 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .batch import _as_array, section_factor
+from .instrument import increment, timed
+
+# Observations with y/D outside this range are not used: shallow depths are dominated by sensor error, and near
+# the crown the pipe may already run under pressure
+DEFAULT_MIN_YD = 0.05
+DEFAULT_MAX_YD = 0.95
+
+# Histogram of ln(n_observed / n_nominal) kept for every pipe: bins spanning a factor SPREAD either side of the
+# nominal roughness (observations beyond it land in the end bins)
+DEFAULT_BINS = 1024
+DEFAULT_SPREAD = 8.0
+
+# Huber tuning constant (95% efficiency for normal residuals) and the |z| above which observations count as outliers
+HUBER_K = 1.345
+OUTLIER_Z = 3.0
+
+# Pipes fitted together when the results are computed
+DEFAULT_BLOCK_SIZE = 1024
+
+Calibration = namedtuple("Calibration", ["pipe_id", "observations", "rejected", "roughness", "slope",
+                                         "least_squares_roughness", "least_squares_slope", "rmse", "r_squared",
+                                         "scatter", "outliers"])
+
+# With depth and flow measured, Manning's equation Q = K(y/D) D^(8/3) S^(1/2) / n only fixes S^(1/2) / n, so the
+# roughness and the slope of a pipe cannot be fitted together. fit="roughness" keeps the nominal slope and fits n;
+# fit="slope" keeps the nominal n and fits an effective slope (e.g. the hydraulic gradient under backwater).
+FITS = ("roughness", "slope")
+
+
+class RoughnessCalibrator:
+    # Fits the roughness (or an effective slope) of every pipe of a registry from paired depth and flow
+    # observations, streamed in chunks. Per pipe it only keeps the least-squares sums and a histogram of the
+    # log ratio to the nominal value (bins * 8 bytes), so the observations are never held in memory.
+    # The robust estimate is a Huber M-estimate of that log ratio, i.e. of the relative flow error.
+    def __init__(self, registry, fit="roughness", min_yD=DEFAULT_MIN_YD, max_yD=DEFAULT_MAX_YD, bins=DEFAULT_BINS,
+                 spread=DEFAULT_SPREAD):
+        if fit not in FITS:
+            raise ValueError(f"Unknown fit {fit!r} (expected one of {', '.join(FITS)})")
+        self.registry = registry
+        self.fit = fit
+        self.min_yD, self.max_yD = min_yD, max_yD
+        self.bins = bins
+        self.low = -np.log(spread)
+        self.width = 2 * np.log(spread) / bins
+
+        pipes = len(registry)
+        self.parameters = registry.parameters()
+        self.observations = np.zeros(pipes, dtype=np.int64)
+        self.rejected = np.zeros(pipes, dtype=np.int64)
+        self.unknown = 0
+        # Sums for the least-squares fit of Q = a * c, with conveyance c = K(y/D) D^(8/3) and a = S^(1/2) / n
+        self.sum_qc = np.zeros(pipes)
+        self.sum_cc = np.zeros(pipes)
+        self.sum_qq = np.zeros(pipes)
+        self.sum_q = np.zeros(pipes)
+        self.histogram = np.zeros((pipes, bins), dtype=np.int64)
+
+    # Function to add a chunk of observations (pipe ids, depths [m] and flow rates [m³/s])
+    @timed("manning.calibration.RoughnessCalibrator.update")
+    def update(self, pipe_ids, depth, flow_rate):
+        rows, known = self.registry.rows(pipe_ids)
+        depth, flow_rate = _as_array(depth), _as_array(flow_rate)
+        self.unknown += int(known.size - known.sum())
+        rows, depth, flow_rate = rows[known], depth[known], flow_rate[known]
+        diameter, slope, roughness = self.parameters[rows].T
+
+        yD = depth / diameter
+        valid = ((yD >= self.min_yD) & (yD <= self.max_yD) & (flow_rate > 0)
+                 & np.isfinite(yD) & np.isfinite(flow_rate))
+        self.rejected += np.bincount(rows[~valid], minlength=self.rejected.size)
+        rows, yD, flow_rate = rows[valid], yD[valid], flow_rate[valid]
+        diameter, slope, roughness = diameter[valid], slope[valid], roughness[valid]
+
+        pipes = self.observations.size
+        conveyance = section_factor(yD) * diameter ** (8 / 3)
+        self.observations += np.bincount(rows, minlength=pipes)
+        self.sum_qc += np.bincount(rows, flow_rate * conveyance, minlength=pipes)
+        self.sum_cc += np.bincount(rows, conveyance ** 2, minlength=pipes)
+        self.sum_qq += np.bincount(rows, flow_rate ** 2, minlength=pipes)
+        self.sum_q += np.bincount(rows, flow_rate, minlength=pipes)
+
+        # Only the (pipe, bin) cells present in the chunk are touched
+        ratio = np.log(conveyance * slope ** 0.5 / (flow_rate * roughness))
+        bin_index = np.clip(((ratio - self.low) / self.width).astype(np.int64), 0, self.bins - 1)
+        cells, counts = np.unique(rows * self.bins + bin_index, return_counts=True)
+        self.histogram.reshape(-1)[cells] += counts
+        increment("calibration.observations", int(rows.size))
+        return int(rows.size)
+
+    # Function to fit every pipe from the observations added so far
+    @timed("manning.calibration.RoughnessCalibrator.result")
+    def result(self, huber_k=HUBER_K, block_size=DEFAULT_BLOCK_SIZE):
+        pipes = self.observations.size
+        location, scale, outliers = np.full(pipes, np.nan), np.full(pipes, np.nan), np.full(pipes, np.nan)
+        for start in range(0, pipes, block_size):
+            block = slice(start, start + block_size)
+            location[block], scale[block], outliers[block] = _robust_fit(
+                self.histogram[block], self.low, self.width, huber_k)
+
+        _, slope, roughness = self.parameters.T if pipes else (np.empty(0),) * 3
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Robust fit: ln(n_observed / n_nominal) = location, or the same S^(1/2) / n with the nominal n
+            fitted = np.exp(location)
+            # Least squares in flow: a = sum(Q c) / sum(c²)
+            a = self.sum_qc / self.sum_cc
+            least_squares = slope ** 0.5 / (a * roughness)
+
+            # Flow errors of the robust fit, from the same sums
+            a_robust = slope ** 0.5 / (roughness * fitted)
+            squared_error = np.maximum(self.sum_qq - 2 * a_robust * self.sum_qc + a_robust ** 2 * self.sum_cc, 0.0)
+            total = self.sum_qq - self.sum_q ** 2 / self.observations
+            rmse = np.sqrt(squared_error / self.observations)
+            r_squared = 1 - squared_error / total
+
+        if self.fit == "roughness":
+            fitted_roughness, fitted_slope = roughness * fitted, slope
+            ls_roughness, ls_slope = roughness * least_squares, slope
+        else:
+            fitted_roughness, fitted_slope = roughness, slope / fitted ** 2
+            ls_roughness, ls_slope = roughness, slope / least_squares ** 2
+        return Calibration(self.registry.ids(), self.observations.copy(), self.rejected.copy(), fitted_roughness,
+                           fitted_slope, ls_roughness, ls_slope, rmse, r_squared, scale, outliers)
+
+
+# Function to calculate the Huber location, the robust scale (normalized MAD) and the fraction of outliers of
+# every row of a block of histograms; rows without observations give NaN
+def _robust_fit(histogram, low, width, huber_k, iterations=50):
+    histogram = histogram.astype(float)
+    centers = low + width * (np.arange(histogram.shape[1]) + 0.5)
+    total = histogram.sum(axis=1)
+    empty = total == 0
+    total = np.where(empty, 1.0, total)
+
+    median = _weighted_median(np.broadcast_to(centers, histogram.shape), histogram, total)
+    deviation = np.abs(centers[np.newaxis, :] - median[:, np.newaxis])
+    # Never below the bin width, which the histogram cannot resolve
+    scale = np.maximum(1.4826 * _weighted_median(deviation, histogram, total), width)
+
+    location = median
+    for _ in range(iterations):
+        residual = np.abs(centers[np.newaxis, :] - location[:, np.newaxis])
+        with np.errstate(divide="ignore"):
+            weight = histogram * np.minimum(1.0, huber_k * scale[:, np.newaxis] / residual)
+        weight_sum = np.where(empty, 1.0, weight.sum(axis=1))
+        updated = (weight * centers).sum(axis=1) / weight_sum
+        converged = np.all(np.abs(updated - location) < 1e-3 * width)
+        location = updated
+        if converged:
+            break
+
+    residual = np.abs(centers[np.newaxis, :] - location[:, np.newaxis])
+    outliers = (histogram * (residual > OUTLIER_Z * scale[:, np.newaxis])).sum(axis=1) / total
+    return (np.where(empty, np.nan, location), np.where(empty, np.nan, scale), np.where(empty, np.nan, outliers))
+
+
+def _weighted_median(values, weights, total):
+    order = np.argsort(values, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+    cumulative = np.cumsum(np.take_along_axis(weights, order, axis=1), axis=1)
+    index = np.minimum((cumulative < total[:, np.newaxis] / 2).sum(axis=1), values.shape[1] - 1)
+    return values[np.arange(values.shape[0]), index]
+
+
+# Function to calibrate every pipe of a registry from an iterable of observation chunks (DataFrames with the
+# id column, depth and flow_rate)
+def calibrate(chunks, registry, fit="roughness", id_column="pipe_id", **options):
+    calibrator = RoughnessCalibrator(registry, fit, **options)
+    for chunk in chunks:
+        calibrator.update(chunk[id_column].to_numpy(), chunk["depth"].to_numpy(dtype=float),
+                          chunk["flow_rate"].to_numpy(dtype=float))
+    return calibrator.result()
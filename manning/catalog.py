@@ -0,0 +1,105 @@
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from .batch import _as_array, batch_diameter, batch_velocity, section_properties
+from .core import SPECIFIC_WEIGHT, calculate_shear_stress
+from .tables import get_section_table
+
+# Commercial sewer pipe diameters [m]
+DEFAULT_DIAMETERS = (0.10, 0.15, 0.20, 0.25, 0.30, 0.35, 0.40, 0.45, 0.50, 0.60, 0.70, 0.80, 0.90, 1.00,
+                     1.10, 1.20, 1.35, 1.50, 1.80, 2.00)
+
+# Manning roughness (n) per pipe material
+DEFAULT_MATERIALS = {
+    "concrete": 0.013,
+    "vitrified_clay": 0.013,
+    "cast_iron": 0.012,
+    "hdpe": 0.011,
+    "pvc": 0.010,
+}
+
+# Default design limits
+DEFAULT_MAX_YD = 0.75
+
+Selection = namedtuple("Selection", ["diameter", "index", "yD", "velocity", "shear_stress", "feasible"])
+
+
+class PipeCatalog:
+    # Sorted series of commercial diameters and the Manning roughness of each pipe material
+    def __init__(self, diameters=DEFAULT_DIAMETERS, materials=None):
+        self.diameters = np.unique(_as_array(diameters))
+        self.materials = dict(DEFAULT_MATERIALS if materials is None else materials)
+
+    @classmethod
+    def load(cls, path):
+        # JSON file with {"diameters": [...], "materials": {"name": n, ...}}
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["diameters"], data.get("materials"))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"diameters": self.diameters.tolist(), "materials": self.materials}, f, indent=2)
+
+    # Function to get the roughness for a material name, an array of names or numeric values of n
+    def roughness(self, material):
+        if isinstance(material, str):
+            return self.materials[material]
+        material = np.asarray(material)
+        if material.dtype.kind in "US":
+            return np.array([self.materials[name] for name in material.ravel()]).reshape(material.shape)
+        return material.astype(float)
+
+    # Function to pick, for every segment, the smallest catalog diameter that meets the design limits
+    def select(self, flow_rate, slope, material="concrete", max_yD=DEFAULT_MAX_YD, min_velocity=None,
+               max_velocity=None, min_shear_stress=None, specific_weight=SPECIFIC_WEIGHT):
+        flow_rate, slope, roughness = np.broadcast_arrays(
+            _as_array(flow_rate), _as_array(slope), _as_array(self.roughness(material)))
+        shape = flow_rate.shape
+        flow_rate, slope, roughness = flow_rate.ravel(), slope.ravel(), roughness.ravel()
+
+        # Smallest diameter with y/D <= max_yD, by binary search over the sorted catalog
+        required = batch_diameter(max_yD, flow_rate, roughness, slope)
+        first = np.searchsorted(self.diameters, required * (1 - 1e-9))
+
+        # Evaluate every candidate diameter of every segment at once
+        diameters = self.diameters[np.newaxis, :]
+        q, s, n = flow_rate[:, np.newaxis], slope[:, np.newaxis], roughness[:, np.newaxis]
+        yD = get_section_table().yD(diameters, q, n, s)
+        _, area, _, hydraulic_radius = section_properties(diameters, yD)
+        velocity = batch_velocity(q, area)
+        shear_stress = calculate_shear_stress(hydraulic_radius, s, specific_weight)
+
+        # Diameters from first on meet max_yD by the closed form; comparing the table y/D with max_yD instead
+        # would reject exact catalog sizes whose y/D comes back a rounding error above the limit
+        feasible = (np.arange(self.diameters.size) >= first[:, np.newaxis]) & np.isfinite(yD)
+        if min_velocity is not None:
+            feasible &= velocity >= min_velocity
+        if max_velocity is not None:
+            feasible &= velocity <= max_velocity
+        if min_shear_stress is not None:
+            feasible &= shear_stress >= min_shear_stress
+
+        found = feasible.any(axis=1)
+        index = np.where(found, feasible.argmax(axis=1), -1)
+        rows = np.arange(index.size)
+        chosen = np.where(found, index, 0)
+
+        def pick(values):
+            return np.where(found, values[rows, chosen], np.nan).reshape(shape)
+
+        return Selection(
+            diameter=pick(np.broadcast_to(diameters, yD.shape)),
+            index=index.reshape(shape),
+            yD=pick(yD),
+            velocity=pick(velocity),
+            shear_stress=pick(shear_stress),
+            feasible=found.reshape(shape),
+        )
+
+
+# Function to select commercial diameters with the default catalog
+def select_diameter(flow_rate, slope, material="concrete", catalog=None, **limits):
+    return (catalog or PipeCatalog()).select(flow_rate, slope, material, **limits)
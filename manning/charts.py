@@ -0,0 +1,27 @@
+import numpy as np
+
+from .batch import _as_array, batch_flow_rate, section_factor, section_properties
+
+DEFAULT_POINTS = 10_000
+
+# Commercial diameters shown on the capacity chart [m]
+CHART_DIAMETERS = (0.15, 0.20, 0.30, 0.40, 0.50, 0.60, 0.80, 1.00, 1.20, 1.50)
+
+
+# Function to calculate the partial-flow curves Q/Qfull and V/Vfull against y/D (same n for all depths).
+# Both ratios are dimensionless, so one sweep serves every diameter, slope and roughness.
+def partial_flow_curves(points=DEFAULT_POINTS):
+    yD = np.linspace(0.0, 1.0, points)
+    flow_ratio = section_factor(yD) / section_factor(1.0)
+    _, _, _, hydraulic_radius = section_properties(1.0, yD)
+    velocity_ratio = (np.nan_to_num(hydraulic_radius) / 0.25) ** (2 / 3)
+    return {"yD": yD, "flow_ratio": flow_ratio, "velocity_ratio": velocity_ratio}
+
+
+# Function to calculate the flow capacity of each diameter over a range of slopes, at a given y/D
+def capacity_curves(roughness, yD=1.0, diameters=CHART_DIAMETERS, min_slope=1e-4, max_slope=0.05,
+                    points=DEFAULT_POINTS):
+    slope = np.geomspace(min_slope, max_slope, points)
+    diameters = _as_array(diameters)
+    flow_rate = batch_flow_rate(diameters[np.newaxis, :], yD, roughness, slope[:, np.newaxis])
+    return {"slope": slope, "diameters": diameters, "flow_rate": flow_rate}
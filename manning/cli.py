@@ -0,0 +1,214 @@
+import argparse
+import sys
+import time
+
+from .core import SPECIFIC_WEIGHT, VARIABLES
+from .io import DEFAULT_CHUNK_SIZE, ChunkWriter, iter_chunks
+
+
+# Function to parse "name=column,name=column" into a rename mapping from file columns to variables
+def _parse_columns(value):
+    mapping = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, column = item.partition("=")
+        if name not in VARIABLES or not column:
+            raise argparse.ArgumentTypeError(f"Invalid column mapping {item!r} (expected <variable>=<column>)")
+        mapping[column] = name
+    return mapping
+
+
+class InputColumnsError(ValueError):
+    # Raised when an input file lacks the columns needed for the requested calculation
+    pass
+
+
+# Function to size every row of a file in fixed-size chunks, writing results as they are produced
+def size_file(input_path, output_path, unknown, chunk_size=DEFAULT_CHUNK_SIZE, columns=None,
+              specific_weight=SPECIFIC_WEIGHT, input_format=None, output_format=None, progress=None,
+              surcharge=False):
+    from .batch import _SOLVERS, solve_frame
+
+    rows = 0
+    start = time.perf_counter()
+    with ChunkWriter(output_path, output_format) as writer:
+        for chunk in iter_chunks(input_path, chunk_size, input_format):
+            if columns:
+                chunk = chunk.rename(columns=columns)
+            if rows == 0:
+                # Checked on the first chunk, before anything is written
+                missing = [name for name in _SOLVERS[unknown][1] if name not in chunk.columns]
+                if missing:
+                    raise InputColumnsError(
+                        f"{input_path} has no column for {', '.join(missing)}, needed to calculate {unknown} "
+                        f"(found {', '.join(map(str, chunk.columns))}; map columns with --columns "
+                        f"<variable>=<column>)")
+            writer.write(solve_frame(chunk, unknown, specific_weight=specific_weight, surcharge=surcharge))
+            rows += len(chunk)
+            if progress:
+                progress(rows, time.perf_counter() - start)
+    return rows, time.perf_counter() - start
+
+
+# Function to build a rating-curve store from a CSV or Parquet file with one pipe per row
+def build_ratings(input_path, output_path, id_column=None, columns=None, points=None, input_format=None):
+    import pandas as pd
+    from .ratings import DEFAULT_POINTS, write_rating_store
+
+    frame = pd.concat(list(iter_chunks(input_path, file_format=input_format)), ignore_index=True)
+    if columns:
+        frame = frame.rename(columns=columns)
+    ids = frame[id_column].tolist() if id_column else None
+    return write_rating_store(output_path, frame["diameter"].to_numpy(dtype=float),
+                              frame["slope"].to_numpy(dtype=float), frame["roughness"].to_numpy(dtype=float),
+                              ids=ids, points=points or DEFAULT_POINTS)
+
+
+# Function to convert a file of timestamped depth readings to flow estimates, batch by batch
+def estimate_file(sensors_path, input_path, output_path, batch_size=DEFAULT_CHUNK_SIZE, speed=None,
+                  input_format=None, output_format=None, progress=None):
+    from .streaming import SensorRegistry, estimate_flows, replay_file, write_flows
+
+    registry = SensorRegistry.load(sensors_path)
+    start = time.perf_counter()
+    flows = estimate_flows(replay_file(input_path, batch_size, speed, file_format=input_format), registry)
+    if progress:
+        flows = _report(flows, start, progress, rows=lambda batch: len(batch.depth))
+    return write_flows(flows, output_path, output_format), time.perf_counter() - start
+
+
+# Function to calibrate the roughness (or effective slope) of every pipe from a file of depth/flow observations
+def calibrate_file(pipes_path, input_path, output_path, fit="roughness", id_column="pipe_id",
+                   chunk_size=DEFAULT_CHUNK_SIZE, input_format=None, output_format=None, progress=None):
+    import pandas as pd
+    from .calibration import calibrate
+    from .streaming import SensorRegistry
+
+    registry = SensorRegistry.load(pipes_path, id_column)
+    start = time.perf_counter()
+    chunks = iter_chunks(input_path, chunk_size, input_format)
+    if progress:
+        chunks = _report(chunks, start, progress)
+    result = calibrate(chunks, registry, fit, id_column)
+    with ChunkWriter(output_path, output_format) as writer:
+        writer.write(pd.DataFrame(result._asdict()).rename(columns={"pipe_id": id_column}))
+    return len(registry), time.perf_counter() - start
+
+
+# Function to pass batches through while reporting progress; rows gives the rows of one batch (DataFrame chunks
+# by default, whose len is their row count)
+def _report(batches, start, progress, rows=len):
+    total = 0
+    for batch in batches:
+        yield batch
+        total += rows(batch)
+        progress(total, time.perf_counter() - start)
+
+
+# Function to report progress and throughput on stderr
+def _print_progress(rows, elapsed):
+    rate = rows / elapsed if elapsed > 0 else float("inf")
+    print(f"{rows:,} rows in {elapsed:.1f} s ({rate:,.0f} rows/s)", file=sys.stderr, flush=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m manning",
+                                     description="Headless Manning equation calculations for circular channels")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    size = commands.add_parser("size", help="Solve one variable for every pipe segment of a CSV or Parquet file")
+    size.add_argument("input", help="Input CSV or Parquet file")
+    size.add_argument("output", help="Output CSV or Parquet file (input columns plus results)")
+    size.add_argument("--solve", choices=VARIABLES, required=True, help="Variable to calculate")
+    size.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows processed per chunk")
+    size.add_argument("--columns", type=_parse_columns, default=None,
+                      help="Column names in the file, e.g. diameter=D,flow_rate=Q")
+    size.add_argument("--specific-weight", type=float, default=SPECIFIC_WEIGHT,
+                      help="Specific weight of water for the shear stress [N/m³]")
+    size.add_argument("--input-format", choices=("csv", "parquet"), help="Defaults to the input file extension")
+    size.add_argument("--output-format", choices=("csv", "parquet"), help="Defaults to the output file extension")
+    size.add_argument("--surcharge", action="store_true",
+                      help="With --solve yD, run pipes above full-pipe capacity full under pressure")
+    size.add_argument("--quiet", action="store_true", help="Do not report progress")
+
+    ratings = commands.add_parser("ratings", help="Precompute the rating curves of a pipe table into one binary file")
+    ratings.add_argument("input", help="CSV or Parquet file with diameter, slope and roughness columns")
+    ratings.add_argument("output", help="Rating-curve store to write")
+    ratings.add_argument("--id-column", help="Column with the pipe ids (rows are numbered otherwise)")
+    ratings.add_argument("--columns", type=_parse_columns, default=None,
+                         help="Column names in the file, e.g. diameter=D,slope=S")
+    ratings.add_argument("--points", type=int, default=None, help="Points per curve (default 384)")
+    ratings.add_argument("--input-format", choices=("csv", "parquet"), help="Defaults to the input file extension")
+
+    flows = commands.add_parser("flows", help="Estimate flow rates from a file of depth-sensor readings")
+    flows.add_argument("sensors", help="CSV or Parquet file with sensor_id, diameter, slope and roughness columns")
+    flows.add_argument("input", help="CSV or Parquet file with timestamp, sensor_id and depth [m] columns")
+    flows.add_argument("output", help="Output CSV or Parquet file with the flow estimates")
+    flows.add_argument("--batch-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Readings converted per batch")
+    flows.add_argument("--speed", type=float, default=None,
+                       help="Replay following the timestamps, this many times faster than real time")
+    flows.add_argument("--input-format", choices=("csv", "parquet"), help="Defaults to the input file extension")
+    flows.add_argument("--output-format", choices=("csv", "parquet"), help="Defaults to the output file extension")
+    flows.add_argument("--quiet", action="store_true", help="Do not report progress")
+
+    calibrate = commands.add_parser("calibrate",
+                                    help="Fit the roughness of every pipe from observed depths and flow rates")
+    calibrate.add_argument("pipes", help="CSV or Parquet file with pipe id, diameter, slope and nominal roughness")
+    calibrate.add_argument("input", help="CSV or Parquet file with pipe id, depth [m] and flow_rate [m³/s] columns")
+    calibrate.add_argument("output", help="Output CSV or Parquet file with one fitted row per pipe")
+    calibrate.add_argument("--fit", choices=("roughness", "slope"), default="roughness",
+                           help="Fit n with the nominal slope, or an effective slope with the nominal n")
+    calibrate.add_argument("--id-column", default="pipe_id", help="Pipe id column of both files")
+    calibrate.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Observations read per chunk")
+    calibrate.add_argument("--input-format", choices=("csv", "parquet"), help="Defaults to the input file extension")
+    calibrate.add_argument("--output-format", choices=("csv", "parquet"),
+                           help="Defaults to the output file extension")
+    calibrate.add_argument("--quiet", action="store_true", help="Do not report progress")
+
+    serve = commands.add_parser("serve", help="Run the JSON calculation service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--workers", type=int, default=None,
+                       help="Worker processes for the solves (0 solves in a thread of the server process)")
+    serve.add_argument("--max-batch", type=int, default=4096, help="Largest number of requests solved together")
+    serve.add_argument("--max-delay", type=float, default=0.005,
+                       help="Longest wait for more requests before solving a batch [s]")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "size":
+        try:
+            rows, elapsed = size_file(
+                args.input, args.output, args.solve, chunk_size=args.chunk_size, columns=args.columns,
+                specific_weight=args.specific_weight, input_format=args.input_format,
+                output_format=args.output_format, progress=None if args.quiet else _print_progress,
+                surcharge=args.surcharge)
+        except InputColumnsError as e:
+            parser.error(str(e))
+        if not args.quiet:
+            print(f"Done: {rows:,} rows written to {args.output}", file=sys.stderr)
+    elif args.command == "ratings":
+        pipes = build_ratings(args.input, args.output, args.id_column, args.columns, args.points, args.input_format)
+        print(f"Wrote the rating curves of {pipes:,} pipes to {args.output}", file=sys.stderr)
+    elif args.command == "flows":
+        rows, elapsed = estimate_file(
+            args.sensors, args.input, args.output, batch_size=args.batch_size, speed=args.speed,
+            input_format=args.input_format, output_format=args.output_format,
+            progress=None if args.quiet else _print_progress)
+        if not args.quiet:
+            print(f"Done: {rows:,} readings written to {args.output}", file=sys.stderr)
+    elif args.command == "calibrate":
+        pipes, elapsed = calibrate_file(
+            args.pipes, args.input, args.output, fit=args.fit, id_column=args.id_column, chunk_size=args.chunk_size,
+            input_format=args.input_format, output_format=args.output_format,
+            progress=None if args.quiet else _print_progress)
+        if not args.quiet:
+            print(f"Done: {pipes:,} pipes calibrated in {elapsed:.1f} s, written to {args.output}", file=sys.stderr)
+    elif args.command == "serve":
+        from .service import serve
+        print(f"Serving on http://{args.host}:{args.port}", file=sys.stderr)
+        serve(args.host, args.port, args.workers, args.max_batch, args.max_delay)
+    return 0
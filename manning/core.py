@@ -0,0 +1,84 @@
+import math
+
+from .instrument import record_convergence, timed
+
+# Names of the variables of the Manning equation, in the order used by the UI
+VARIABLES = ("flow_rate", "diameter", "yD", "slope", "roughness")
+
+# Default specific weight of water used for the shear stress [N/m³]
+SPECIFIC_WEIGHT = 9000
+
+# y/D at which the channel carries its maximum flow (Q decreases above it)
+YD_MAX_FLOW = 0.9381812
+
+
+# Function to calculate the central angle (theta)
+def calculate_theta(yD):
+    return 2 * math.acos(1 - 2 * yD)
+
+# Function to calculate the hydraulic radius
+def calculate_hydraulic_radius(area, wetted_perimeter):
+    return area / wetted_perimeter if wetted_perimeter != 0 else None
+
+# Function to calculate shear stress (tension trativa)
+def calculate_shear_stress(hydraulic_radius, slope, specific_weight=SPECIFIC_WEIGHT):
+    return specific_weight * hydraulic_radius * slope
+
+# Function to calculate velocity (V)
+def calculate_velocity(flow_rate, area):
+    return flow_rate / area if area != 0 else None
+
+# Function to calculate the area, wetted perimeter and hydraulic radius of the flow section
+def calculate_section(diameter, yD):
+    theta = calculate_theta(yD)
+    area = (theta - math.sin(theta)) * (diameter ** 2) / 8
+    wetted_perimeter = theta * diameter / 2
+    hydraulic_radius = calculate_hydraulic_radius(area, wetted_perimeter)
+    return area, wetted_perimeter, hydraulic_radius
+
+# Function to calculate y/D, bracketed on [0, YD_MAX_FLOW] where Q(y/D) is monotonic
+@timed()
+def calculate_yD(diameter, flow_rate, roughness, slope):
+    from scipy.optimize import brentq
+
+    if not (diameter > 0 and roughness > 0 and slope > 0):
+        raise ValueError(f"Diameter, roughness and slope must be greater than 0 "
+                         f"(got D = {diameter} m, n = {roughness}, S = {slope} m/m)")
+    if not flow_rate >= 0:
+        raise ValueError(f"Flow rate must not be negative (got {flow_rate} m³/s)")
+    if flow_rate == 0:
+        return 0.0
+
+    def equation(yD):
+        if yD == 0:
+            return -flow_rate
+        return calculate_flow_rate(diameter, yD, roughness, slope) - flow_rate
+
+    capacity = equation(YD_MAX_FLOW) + flow_rate
+    if flow_rate > capacity:
+        raise ValueError(f"Flow rate exceeds the pipe capacity ({capacity:.4f} m³/s at y/D = {YD_MAX_FLOW:.3f})")
+    yD, result = brentq(equation, 0.0, YD_MAX_FLOW, full_output=True)
+    record_convergence("calculate_yD", result.iterations, result.converged, result.function_calls)
+    return yD
+
+# Function to calculate the diameter (D) in closed form, since Q scales with D^(8/3)
+def calculate_diameter(yD, flow_rate, roughness, slope):
+    theta = calculate_theta(yD)
+    area_factor = (theta - math.sin(theta)) / 8
+    radius_factor = (theta - math.sin(theta)) / (4 * theta)
+    return ((flow_rate * roughness) / (area_factor * (radius_factor ** (2 / 3)) * (slope ** 0.5))) ** (3 / 8)
+
+# Function to calculate flow rate (Q)
+def calculate_flow_rate(diameter, yD, roughness, slope):
+    area, _, hydraulic_radius = calculate_section(diameter, yD)
+    return (1 / roughness) * area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)
+
+# Function to calculate roughness (n)
+def calculate_roughness(diameter, yD, flow_rate, slope):
+    area, _, hydraulic_radius = calculate_section(diameter, yD)
+    return (area * (hydraulic_radius ** (2 / 3)) * (slope ** 0.5)) / flow_rate
+
+# Function to calculate slope (S)
+def calculate_slope(diameter, yD, flow_rate, roughness):
+    area, _, hydraulic_radius = calculate_section(diameter, yD)
+    return ((flow_rate * roughness) / (area * (hydraulic_radius ** (2 / 3)))) ** 2
@@ -0,0 +1,190 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+# Instrumentation is off unless MANNING_INSTRUMENT is set (to anything but 0) or enable() is called
+ENV_VARIABLE = "MANNING_INSTRUMENT"
+
+# Upper bounds of the timing histogram buckets [s]: 1 µs to 10 s, four buckets per decade
+TIMING_BUCKETS = tuple(10 ** (exponent / 4) for exponent in range(-24, 5))
+
+_enabled = os.environ.get(ENV_VARIABLE, "") not in ("", "0")
+_lock = threading.Lock()
+_timings = {}
+_convergence = {}
+_counters = {}
+_sources = {}
+
+logger = logging.getLogger(__name__)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+# Function to clear every recorded statistic (registered sources are kept)
+def reset():
+    with _lock:
+        _timings.clear()
+        _convergence.clear()
+        _counters.clear()
+
+
+class _Timing:
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(TIMING_BUCKETS) + 1)
+        self.errors = {}
+
+    def add(self, elapsed, error=None):
+        self.calls += 1
+        self.total += elapsed
+        self.min = min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+        self.buckets[bisect.bisect_left(TIMING_BUCKETS, elapsed)] += 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    # Upper bound of the bucket holding the given fraction of the calls [s]
+    def percentile(self, fraction):
+        seen = 0
+        for bound, count in zip(TIMING_BUCKETS + (self.max,), self.buckets):
+            seen += count
+            if seen >= fraction * self.calls:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.calls * 1000,
+            "min_ms": self.min * 1000,
+            "max_ms": self.max * 1000,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "histogram": {f"<={bound * 1000:.3g}ms": count
+                          for bound, count in zip(TIMING_BUCKETS, self.buckets) if count},
+        }
+
+
+class _Convergence:
+    def __init__(self):
+        self.solves = 0
+        self.iterations = 0
+        self.max_iterations = 0
+        self.function_calls = 0
+        self.unconverged = 0
+
+    def snapshot(self):
+        return {
+            "solves": self.solves,
+            "mean_iterations": self.iterations / self.solves if self.solves else None,
+            "max_iterations": self.max_iterations,
+            "function_calls": self.function_calls,
+            "unconverged": self.unconverged,
+        }
+
+
+# Function to record the duration of one call, and the exception type if it failed
+def record_timing(name, elapsed, error=None):
+    if not _enabled:
+        return
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = _Timing()
+        timing.add(elapsed, error)
+
+
+# Function to record the iterations of one solve, or of many when iterations is an array
+def record_convergence(name, iterations, converged=True, function_calls=0):
+    if not _enabled:
+        return
+    if hasattr(iterations, "size"):
+        solves, total, largest = int(iterations.size), int(iterations.sum()), int(iterations.max(initial=0))
+        unconverged = int(solves - converged.sum()) if hasattr(converged, "sum") else (0 if converged else solves)
+    else:
+        solves, total, largest, unconverged = 1, int(iterations), int(iterations), 0 if converged else 1
+    with _lock:
+        stats = _convergence.get(name)
+        if stats is None:
+            stats = _convergence[name] = _Convergence()
+        stats.solves += solves
+        stats.iterations += total
+        stats.max_iterations = max(stats.max_iterations, largest)
+        stats.function_calls += int(function_calls)
+        stats.unconverged += unconverged
+
+
+# Function to add to a named counter (e.g. rows solved)
+def increment(name, value=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+# Function to register a callable whose dict result is included in every snapshot (e.g. cache statistics)
+def register_source(name, function):
+    _sources[name] = function
+
+
+# Decorator timing every call of a function while instrumentation is enabled; when disabled it only
+# adds one flag check per call
+def timed(name=None):
+    def decorator(function):
+        key = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                record_timing(key, time.perf_counter() - start, type(e).__name__)
+                raise
+            record_timing(key, time.perf_counter() - start)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# Function to get every recorded statistic as a JSON-serializable dict
+def snapshot():
+    with _lock:
+        result = {
+            "enabled": _enabled,
+            "timings": {name: timing.snapshot() for name, timing in sorted(_timings.items())},
+            "convergence": {name: stats.snapshot() for name, stats in sorted(_convergence.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+    result["sources"] = {name: function() for name, function in _sources.items()}
+    return result
+
+
+# Function to write the snapshot as one structured (JSON) log record
+def log_snapshot(level=logging.INFO, target=None):
+    (target or logger).log(level, "manning metrics %s", json.dumps(snapshot(), default=str))
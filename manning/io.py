@@ -0,0 +1,55 @@
+import os
+
+# Rows read per chunk
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+# Function to guess the file format from its extension
+def _file_format(path, requested=None):
+    if requested:
+        return requested
+    extension = os.path.splitext(path)[1].lower()
+    return "parquet" if extension in (".parquet", ".pq") else "csv"
+
+
+# Function to read a CSV or Parquet file as DataFrames of at most chunk_size rows
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, file_format=None):
+    if _file_format(path, file_format) == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        with pd.read_csv(path, chunksize=chunk_size) as reader:
+            yield from reader
+
+
+class ChunkWriter:
+    # Appends DataFrames to a CSV or Parquet file, writing the header/schema with the first chunk
+    def __init__(self, path, file_format=None):
+        self.path = path
+        self.file_format = _file_format(path, file_format)
+        self._parquet_writer = None
+        self._started = False
+
+    def write(self, frame):
+        if self.file_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,181 @@
+from collections import defaultdict, deque
+
+import numpy as np
+
+from .batch import batch_diameter, batch_velocity, section_properties
+from .catalog import PipeCatalog
+from .core import SPECIFIC_WEIGHT, calculate_shear_stress
+from .pressure import solve_surcharged
+from .yd_solver import solve_yD_batch
+
+# Default design y/D used when sizing reaches with continuous diameters
+DEFAULT_DESIGN_YD = 0.75
+
+# Results stored for every reach
+RESULTS = ("flow_rate", "diameter", "yD", "velocity", "shear_stress", "friction_slope", "surcharged")
+
+
+class Network:
+    # Directed tree or DAG of reaches (pipes) between nodes. Each reach carries its own local inflow plus
+    # the flow arriving at its upstream node, split evenly between the reaches leaving that node.
+    # With a catalog and surcharge=True, reaches no catalog diameter can carry get the largest diameter,
+    # running full under pressure, instead of NaN results. Reaches added without a roughness get the
+    # roughness of `material` (a material of the catalog, or of the default catalog, or a Manning n).
+    def __init__(self, design_yD=DEFAULT_DESIGN_YD, catalog=None, material="concrete",
+                 specific_weight=SPECIFIC_WEIGHT, surcharge=False, **limits):
+        self.design_yD = design_yD
+        self.catalog = catalog
+        self.surcharge = surcharge
+        self.material = material
+        self.roughness = float((catalog or PipeCatalog()).roughness(material))
+        self.specific_weight = specific_weight
+        self.limits = limits
+        self.reaches = {}
+        self.results = {}
+        self._order = None
+        self._dirty = set()
+
+    @classmethod
+    def from_records(cls, records, **options):
+        # records: iterables of dicts with id, upstream, downstream, slope and optional roughness/inflow
+        network = cls(**options)
+        for record in records:
+            record = dict(record)
+            network.add_reach(record.pop("id"), record.pop("upstream"), record.pop("downstream"), **record)
+        return network
+
+    def add_reach(self, reach_id, upstream, downstream, slope, roughness=None, inflow=0.0):
+        if reach_id in self.reaches:
+            raise ValueError(f"Reach {reach_id!r} already exists")
+        self.reaches[reach_id] = {"upstream": upstream, "downstream": downstream, "slope": slope,
+                                  "roughness": self.roughness if roughness is None else roughness,
+                                  "inflow": inflow}
+        self._topology_changed()
+
+    def remove_reach(self, reach_id):
+        del self.reaches[reach_id]
+        self.results.pop(reach_id, None)
+        self._topology_changed()
+
+    # Function to change slope, roughness or inflow of a reach; only it and the reaches downstream are
+    # recomputed by the next solve()
+    def update_reach(self, reach_id, **changes):
+        reach = self.reaches[reach_id]
+        unknown = set(changes) - {"slope", "roughness", "inflow"}
+        if unknown:
+            raise ValueError(f"Cannot update {', '.join(sorted(unknown))} of a reach; remove and add it instead")
+        reach.update(changes)
+        if "inflow" in changes:
+            self._dirty.update(self.downstream_of(reach_id))
+        self._dirty.add(reach_id)
+
+    def _topology_changed(self):
+        self._order = None
+        self._dirty = set(self.reaches)
+
+    def _leaving(self):
+        leaving = defaultdict(list)
+        for reach_id, reach in self.reaches.items():
+            leaving[reach["upstream"]].append(reach_id)
+        return leaving
+
+    # Function to order the reaches so that every reach comes after all reaches upstream of it
+    def topological_order(self):
+        if self._order is not None:
+            return self._order
+
+        leaving = self._leaving()
+        pending = {reach_id: 0 for reach_id in self.reaches}
+        for reach in self.reaches.values():
+            for next_id in leaving.get(reach["downstream"], ()):
+                pending[next_id] += 1
+
+        queue = deque(reach_id for reach_id, count in pending.items() if count == 0)
+        order = []
+        while queue:
+            reach_id = queue.popleft()
+            order.append(reach_id)
+            for next_id in leaving.get(self.reaches[reach_id]["downstream"], ()):
+                pending[next_id] -= 1
+                if pending[next_id] == 0:
+                    queue.append(next_id)
+
+        if len(order) != len(self.reaches):
+            raise ValueError("The network contains a cycle")
+        self._order = order
+        return order
+
+    # Function to list a reach and every reach downstream of it
+    def downstream_of(self, reach_id):
+        leaving = self._leaving()
+        found = {reach_id}
+        queue = deque([reach_id])
+        while queue:
+            for next_id in leaving.get(self.reaches[queue.popleft()]["downstream"], ()):
+                if next_id not in found:
+                    found.add(next_id)
+                    queue.append(next_id)
+        return found
+
+    # Function to accumulate flows and size the reaches changed since the last solve, in batched passes
+    def solve(self):
+        order = self.topological_order()
+        if not self._dirty:
+            return self.results
+
+        leaving = self._leaving()
+        arriving = defaultdict(float)
+        affected = []
+        for reach_id in order:
+            reach = self.reaches[reach_id]
+            if reach_id in self._dirty:
+                flow_rate = reach["inflow"] + arriving[reach["upstream"]] / len(leaving[reach["upstream"]])
+                self.results[reach_id] = {"flow_rate": flow_rate}
+                affected.append(reach_id)
+            arriving[reach["downstream"]] += self.results[reach_id]["flow_rate"]
+
+        self._size(affected)
+        self._dirty.clear()
+        return self.results
+
+    def _size(self, reach_ids):
+        if not reach_ids:
+            return
+        flow_rate = np.array([self.results[reach_id]["flow_rate"] for reach_id in reach_ids])
+        slope = np.array([self.reaches[reach_id]["slope"] for reach_id in reach_ids])
+        roughness = np.array([self.reaches[reach_id]["roughness"] for reach_id in reach_ids])
+
+        friction_slope, surcharged = slope, np.zeros(slope.shape, dtype=bool)
+        if self.catalog is not None:
+            selection = self.catalog.select(flow_rate, slope, roughness, max_yD=self.design_yD,
+                                            specific_weight=self.specific_weight, **self.limits)
+            diameter, yD = selection.diameter, selection.yD
+            if self.surcharge and not selection.feasible.all():
+                solution = solve_surcharged(self.catalog.diameters[-1], flow_rate, roughness, slope)
+                surcharged = ~selection.feasible & solution.surcharged
+                diameter = np.where(surcharged, self.catalog.diameters[-1], diameter)
+                yD = np.where(surcharged, 1.0, yD)
+                friction_slope = np.where(surcharged, solution.friction_slope, slope)
+        else:
+            diameter = batch_diameter(self.design_yD, flow_rate, roughness, slope)
+            yD = solve_yD_batch(diameter, flow_rate, roughness, slope).yD
+
+        _, area, _, hydraulic_radius = section_properties(diameter, yD)
+        sized = {
+            "diameter": diameter,
+            "yD": yD,
+            "velocity": batch_velocity(flow_rate, area),
+            "shear_stress": calculate_shear_stress(hydraulic_radius, friction_slope, self.specific_weight),
+            "friction_slope": friction_slope,
+        }
+        for index, reach_id in enumerate(reach_ids):
+            self.results[reach_id].update({name: float(values[index]) for name, values in sized.items()})
+            self.results[reach_id]["surcharged"] = bool(surcharged[index])
+
+    # Function to get the results as arrays in topological order
+    def result_arrays(self):
+        order = self.topological_order()
+        self.solve()
+        arrays = {"id": np.array(order, dtype=object)}
+        arrays.update({name: np.array([self.results[reach_id][name] for reach_id in order]) for name in RESULTS})
+        return arrays
@@ -0,0 +1,135 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .batch import _as_array, batch_velocity, section_factor, section_properties
+from .catalog import DEFAULT_MAX_YD, PipeCatalog
+from .core import SPECIFIC_WEIGHT, calculate_shear_stress
+from .instrument import increment, timed
+from .tables import get_section_table
+
+# Slope range searched, as a geometric grid [m/m]
+DEFAULT_MIN_SLOPE = 0.0005
+DEFAULT_MAX_SLOPE = 0.05
+DEFAULT_SLOPE_POINTS = 48
+
+# Minimum cover over the pipe crown [m]
+DEFAULT_MIN_COVER = 1.0
+
+# Segments evaluated together (the candidate grid of a chunk is segments x diameters x slopes)
+DEFAULT_CHUNK_SIZE = 1024
+
+Design = namedtuple("Design", ["diameter", "slope", "yD", "velocity", "shear_stress", "upstream_depth",
+                               "downstream_depth", "cost", "feasible"])
+
+
+class TrenchCost:
+    # Cost of a segment: pipe supply and laying (unit_cost * D^exponent per metre) plus excavation of a
+    # vertical-walled trench of width D + 2 * clearance down to the invert. Any callable with the same
+    # arguments, working on arrays, can be used as the cost model instead.
+    def __init__(self, unit_cost=600.0, exponent=1.4, excavation_cost=25.0, clearance=0.3):
+        self.unit_cost = unit_cost
+        self.exponent = exponent
+        self.excavation_cost = excavation_cost
+        self.clearance = clearance
+
+    def __call__(self, diameter, slope, length, upstream_depth, downstream_depth):
+        pipe = self.unit_cost * diameter ** self.exponent * length
+        volume = (diameter + 2 * self.clearance) * length * (upstream_depth + downstream_depth) / 2
+        return pipe + self.excavation_cost * volume
+
+
+# Function to find, for every segment, the catalog diameter and slope of minimum cost that meet the design limits.
+# Depths are invert depths below ground; the upstream end sits at minimum cover unless upstream_depth is given.
+@timed()
+def optimize_design(flow_rate, length, ground_slope=0.0, material="concrete", catalog=None, cost_model=None,
+                    max_yD=DEFAULT_MAX_YD, min_velocity=None, max_velocity=None, min_shear_stress=None,
+                    min_slope=DEFAULT_MIN_SLOPE, max_slope=DEFAULT_MAX_SLOPE, slope_points=DEFAULT_SLOPE_POINTS,
+                    min_cover=DEFAULT_MIN_COVER, upstream_depth=None, max_depth=None,
+                    specific_weight=SPECIFIC_WEIGHT, chunk_size=DEFAULT_CHUNK_SIZE):
+    catalog = catalog or PipeCatalog()
+    cost_model = cost_model or TrenchCost()
+    flow_rate, length, ground_slope, roughness, upstream_depth = np.broadcast_arrays(
+        _as_array(flow_rate), _as_array(length), _as_array(ground_slope), _as_array(catalog.roughness(material)),
+        _as_array(np.nan if upstream_depth is None else upstream_depth))
+    shape = flow_rate.shape
+
+    limits = {"max_yD": max_yD, "min_velocity": min_velocity, "max_velocity": max_velocity,
+              "min_shear_stress": min_shear_stress, "min_slope": min_slope, "max_slope": max_slope,
+              "min_cover": min_cover, "max_depth": max_depth, "specific_weight": specific_weight}
+    slopes = np.geomspace(min_slope, max_slope, slope_points)
+    columns = [flow_rate.ravel(), length.ravel(), ground_slope.ravel(), roughness.ravel(), upstream_depth.ravel()]
+
+    parts = [_optimize_chunk(*(column[start:start + chunk_size] for column in columns), catalog.diameters, slopes,
+                             cost_model, limits)
+             for start in range(0, flow_rate.size, chunk_size)]
+    if not parts:
+        return Design(*(np.empty(shape) for _ in Design._fields))
+    return Design(*(np.concatenate(values).reshape(shape) for values in zip(*parts)))
+
+
+def _optimize_chunk(flow_rate, length, ground_slope, roughness, upstream_depth, diameters, slopes, cost_model,
+                    limits):
+    # Candidate grid: segments x diameters x slopes
+    flow_rate, length, ground_slope, roughness, upstream_depth = (
+        values[:, np.newaxis, np.newaxis] for values in (flow_rate, length, ground_slope, roughness, upstream_depth))
+    diameters = diameters[np.newaxis, :, np.newaxis]
+
+    # Smallest slope at which each diameter carries the flow at max_yD (closed form). It is added as a candidate,
+    # with the ground slope, since the optimum usually sits on one of them.
+    with np.errstate(divide="ignore"):
+        capacity_slope = (flow_rate * roughness / (section_factor(limits["max_yD"]) * diameters ** (8 / 3))) ** 2
+    segments = flow_rate.shape[0]
+    candidates = np.concatenate([
+        np.broadcast_to(slopes, (segments, diameters.shape[1], slopes.size)),
+        np.broadcast_to(capacity_slope, (segments, diameters.shape[1], 1)),
+        np.broadcast_to(ground_slope, (segments, diameters.shape[1], 1)),
+    ], axis=2)
+    diameters = np.broadcast_to(diameters, candidates.shape)
+
+    # Prune with the closed-form constraints first: capacity, slope range and cover depth
+    upstream_depth = np.where(np.isnan(upstream_depth), limits["min_cover"] + diameters, upstream_depth)
+    downstream_depth = upstream_depth + (candidates - ground_slope) * length
+    feasible = ((candidates >= capacity_slope * (1 - 1e-9)) & (candidates >= limits["min_slope"])
+                & (candidates <= limits["max_slope"]) & (downstream_depth >= limits["min_cover"] + diameters))
+    if limits["max_depth"] is not None:
+        feasible &= np.maximum(upstream_depth, downstream_depth) <= limits["max_depth"]
+
+    # y/D, velocity and shear stress only for the surviving candidates
+    index = np.nonzero(feasible)
+    segment = index[0]
+    increment("optimize_design.candidates", candidates.size)
+    increment("optimize_design.evaluated", segment.size)
+    yD = np.full(candidates.shape, np.nan)
+    velocity = np.full(candidates.shape, np.nan)
+    shear_stress = np.full(candidates.shape, np.nan)
+    yD[index] = get_section_table().yD(diameters[index], flow_rate[segment, 0, 0], roughness[segment, 0, 0],
+                                       candidates[index])
+    _, area, _, hydraulic_radius = section_properties(diameters[index], yD[index])
+    velocity[index] = batch_velocity(flow_rate[segment, 0, 0], area)
+    shear_stress[index] = calculate_shear_stress(hydraulic_radius, candidates[index], limits["specific_weight"])
+
+    with np.errstate(invalid="ignore"):
+        if limits["min_velocity"] is not None:
+            feasible &= velocity >= limits["min_velocity"]
+        if limits["max_velocity"] is not None:
+            feasible &= velocity <= limits["max_velocity"]
+        if limits["min_shear_stress"] is not None:
+            feasible &= shear_stress >= limits["min_shear_stress"]
+
+    cost = np.full(candidates.shape, np.inf)
+    index = np.nonzero(feasible)
+    cost[index] = cost_model(diameters[index], candidates[index], length[index[0], 0, 0],
+                             upstream_depth[index], downstream_depth[index])
+
+    # Cheapest candidate of every segment
+    flat = cost.reshape(segments, -1)
+    best = flat.argmin(axis=1)
+    found = np.isfinite(flat[np.arange(best.size), best])
+    rows = np.arange(best.size)
+
+    def pick(values):
+        return np.where(found, np.broadcast_to(values, cost.shape).reshape(segments, -1)[rows, best], np.nan)
+
+    return (pick(diameters), pick(candidates), pick(yD), pick(velocity), pick(shear_stress), pick(upstream_depth),
+            pick(downstream_depth), pick(cost), found)
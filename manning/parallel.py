@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .batch import _SOLVERS, solve
+from .core import SPECIFIC_WEIGHT, VARIABLES
+
+# Quantities returned by solve(), stored as the columns of the shared output array
+OUTPUTS = VARIABLES + ("theta", "area", "wetted_perimeter", "hydraulic_radius", "velocity", "shear_stress")
+
+DEFAULT_CHUNK_SIZE = 65_536
+
+# Shared arrays attached by each worker process
+_worker = {}
+
+
+# Function to attach a worker process to the shared input and output arrays
+def _init_worker(input_name, output_name, rows, arguments):
+    input_memory = shared_memory.SharedMemory(name=input_name)
+    output_memory = shared_memory.SharedMemory(name=output_name)
+    _worker.update(
+        input_memory=input_memory,
+        output_memory=output_memory,
+        inputs=np.ndarray((len(arguments), rows), dtype=float, buffer=input_memory.buf),
+        outputs=np.ndarray((len(OUTPUTS), rows), dtype=float, buffer=output_memory.buf),
+        arguments=arguments,
+    )
+
+
+# Function to solve rows [start, stop) in a worker, writing the results in place
+def _solve_range(unknown, start, stop, specific_weight):
+    inputs = {name: _worker["inputs"][index, start:stop] for index, name in enumerate(_worker["arguments"])}
+    results = solve(unknown, specific_weight=specific_weight, **inputs)
+    outputs = _worker["outputs"]
+    for index, name in enumerate(OUTPUTS):
+        outputs[index, start:stop] = results[name]
+    return stop - start
+
+
+# Function to solve one unknown for large arrays of inputs on a pool of processes.
+# Inputs and results live in shared memory, so only row ranges are sent to the workers.
+def parallel_solve(unknown, diameter=None, yD=None, slope=None, roughness=None, flow_rate=None,
+                   specific_weight=SPECIFIC_WEIGHT, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    if unknown not in _SOLVERS:
+        raise ValueError(f"Unknown variable to calculate: {unknown!r} (expected one of {', '.join(VARIABLES)})")
+
+    values = {"flow_rate": flow_rate, "diameter": diameter, "yD": yD, "slope": slope, "roughness": roughness}
+    arguments = _SOLVERS[unknown][1]
+    missing = [name for name in arguments if values[name] is None]
+    if missing:
+        raise ValueError(f"Missing input(s) to calculate {unknown}: {', '.join(missing)}")
+
+    inputs = np.broadcast_arrays(*(np.asarray(values[name], dtype=float) for name in arguments))
+    shape = inputs[0].shape
+    rows = inputs[0].size
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or rows <= chunk_size:
+        return solve(unknown, specific_weight=specific_weight, **dict(zip(arguments, inputs)))
+
+    input_memory = shared_memory.SharedMemory(create=True, size=max(len(arguments) * rows * 8, 1))
+    output_memory = shared_memory.SharedMemory(create=True, size=max(len(OUTPUTS) * rows * 8, 1))
+    shared_inputs = shared_outputs = None
+    try:
+        shared_inputs = np.ndarray((len(arguments), rows), dtype=float, buffer=input_memory.buf)
+        for index, array in enumerate(inputs):
+            shared_inputs[index] = array.ravel()
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(input_memory.name, output_memory.name, rows, arguments)) as executor:
+            futures = [executor.submit(_solve_range, unknown, start, min(start + chunk_size, rows), specific_weight)
+                       for start in range(0, rows, chunk_size)]
+            for future in futures:
+                future.result()
+
+        shared_outputs = np.ndarray((len(OUTPUTS), rows), dtype=float, buffer=output_memory.buf)
+        return {name: shared_outputs[index].reshape(shape).copy() for index, name in enumerate(OUTPUTS)}
+    finally:
+        # The array views must be released before the shared memory can be closed
+        shared_inputs = shared_outputs = None
+        input_memory.close()
+        input_memory.unlink()
+        output_memory.close()
+        output_memory.unlink()
@@ -0,0 +1,103 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .batch import _as_array, section_factor
+from .instrument import timed
+from .yd_solver import YD_OVER_CAPACITY, solve_yD_batch
+
+GRAVITY = 9.81
+
+# Kinematic viscosity of water at 20 °C [m²/s]
+KINEMATIC_VISCOSITY = 1.0e-6
+
+# Section factor A * R^(2/3) / D^(8/3) of the full pipe
+SECTION_FACTOR_FULL = float(section_factor(1.0))
+
+SurchargeSolution = namedtuple("SurchargeSolution", ["yD", "friction_slope", "surcharged"])
+
+# Pressurized (full pipe) flow. Friction follows Darcy-Weisbach, hf / L = f V² / (2 g D), with the friction
+# factor equivalent to Manning's n by default, so a full pipe carries the same flow under either law. Giving
+# roughness_height (absolute roughness ε [m]) uses the explicit Swamee-Jain approximations of Colebrook-White
+# instead. Either way a pipe only switches to pressure flow where the gravity solve has no solution.
+
+
+# Function to calculate the Darcy friction factor equivalent to Manning's n in a full pipe: 8 g n² / R^(1/3)
+def manning_friction_factor(diameter, roughness, gravity=GRAVITY):
+    return 8 * gravity * _as_array(roughness) ** 2 / (_as_array(diameter) / 4) ** (1 / 3)
+
+
+# Function to calculate the Reynolds number of a full pipe
+def reynolds_number(diameter, flow_rate, viscosity=KINEMATIC_VISCOSITY):
+    return 4 * np.abs(_as_array(flow_rate)) / (np.pi * _as_array(diameter) * viscosity)
+
+
+# Function to calculate the Darcy friction factor with the Swamee-Jain approximation of Colebrook-White
+def swamee_jain_friction_factor(diameter, reynolds, roughness_height):
+    diameter, reynolds = _as_array(diameter), _as_array(reynolds)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 0.25 / np.log10(_as_array(roughness_height) / (3.7 * diameter) + 5.74 / reynolds ** 0.9) ** 2
+
+
+# Function to calculate the friction slope (hydraulic gradient) of a full pipe carrying flow_rate
+@timed()
+def pressure_friction_slope(diameter, flow_rate, roughness, roughness_height=None, viscosity=KINEMATIC_VISCOSITY,
+                            gravity=GRAVITY):
+    diameter, flow_rate = _as_array(diameter), _as_array(flow_rate)
+    if roughness_height is None:
+        friction_factor = manning_friction_factor(diameter, roughness, gravity)
+    else:
+        friction_factor = swamee_jain_friction_factor(diameter, reynolds_number(diameter, flow_rate, viscosity),
+                                                      roughness_height)
+    velocity = flow_rate / (np.pi * diameter ** 2 / 4)
+    return friction_factor * velocity ** 2 / (2 * gravity * diameter)
+
+
+# Function to calculate the flow rate of a full pipe under a friction slope
+@timed()
+def pressure_flow_rate(diameter, roughness, friction_slope, roughness_height=None, viscosity=KINEMATIC_VISCOSITY,
+                       gravity=GRAVITY):
+    diameter, friction_slope = _as_array(diameter), _as_array(friction_slope)
+    if roughness_height is None:
+        return SECTION_FACTOR_FULL * diameter ** (8 / 3) * friction_slope ** 0.5 / _as_array(roughness)
+    shear_velocity = np.sqrt(gravity * diameter * friction_slope)
+    return -0.965 * diameter ** 2 * shear_velocity * np.log(
+        _as_array(roughness_height) / (3.7 * diameter) + 1.784 * viscosity / (diameter * shear_velocity))
+
+
+# Function to calculate the diameter of a full pipe carrying flow_rate under a friction slope
+@timed()
+def pressure_diameter(flow_rate, roughness, friction_slope, roughness_height=None, viscosity=KINEMATIC_VISCOSITY,
+                      gravity=GRAVITY):
+    flow_rate, friction_slope = _as_array(flow_rate), _as_array(friction_slope)
+    if roughness_height is None:
+        return (flow_rate * _as_array(roughness) / (SECTION_FACTOR_FULL * friction_slope ** 0.5)) ** (3 / 8)
+    return 0.66 * (_as_array(roughness_height) ** 1.25 * (flow_rate ** 2 / (gravity * friction_slope)) ** 4.75
+                   + viscosity * flow_rate ** 9.4 * (1 / (gravity * friction_slope)) ** 5.2) ** 0.04
+
+
+# Function to solve y/D where the pipe can surcharge: rows the gravity solve cannot carry (over capacity, or
+# y/D >= 1) run full under pressure, with y/D = 1 and their Darcy friction slope reported; the other rows keep
+# their gravity y/D and the bed slope
+@timed()
+def solve_surcharged(diameter, flow_rate, roughness, slope, roughness_height=None, viscosity=KINEMATIC_VISCOSITY,
+                     gravity=GRAVITY):
+    diameter, flow_rate, roughness, slope = np.broadcast_arrays(
+        _as_array(diameter), _as_array(flow_rate), _as_array(roughness), _as_array(slope))
+    gravity_flow = solve_yD_batch(diameter, flow_rate, roughness, slope)
+    with np.errstate(invalid="ignore"):
+        surcharged = (gravity_flow.status == YD_OVER_CAPACITY) | (gravity_flow.yD >= 1)
+
+    yD = np.where(surcharged, 1.0, gravity_flow.yD)
+    friction_slope = slope.astype(float)
+    if surcharged.any():
+        pressure_slope = pressure_friction_slope(diameter[surcharged], flow_rate[surcharged], roughness[surcharged],
+                                                 _surcharged_rows(roughness_height, surcharged), viscosity, gravity)
+        friction_slope[surcharged] = np.maximum(pressure_slope, slope[surcharged])
+    return SurchargeSolution(yD, friction_slope, surcharged)
+
+
+def _surcharged_rows(value, surcharged):
+    if value is None:
+        return None
+    return np.broadcast_to(_as_array(value), surcharged.shape)[surcharged]
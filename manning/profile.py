@@ -0,0 +1,194 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .batch import _as_array, batch_slope, batch_theta, section_properties
+from .yd_solver import solve_yD_batch
+
+# Acceleration of gravity [m/s²]
+GRAVITY = 9.81
+
+# Depths are kept this far (relative) from critical depth, where the profile equation is singular
+CRITICAL_MARGIN = 1e-3
+
+# Largest y/D reached by a gravity profile; deeper water surcharges the pipe
+YD_FULL = 0.999
+
+# Absolute error allowed on y/D in every adaptive integration step
+TOLERANCE = 1e-8
+
+# Smallest adaptive step as a fraction of the pipe length; a profile that needs shorter steps has run into
+# critical depth (or the crown) and is held there
+MIN_STEP = 1e-9
+
+# Within this fraction of critical depth, a profile heading for it is also integrated in depth (standard
+# step method): dx/dy = D (1 - Fr²) / (S0 - Sf) stays finite, giving the distance left to critical depth
+CRITICAL_ZONE = 0.05
+
+# Gauss-Legendre nodes and weights on [0, 1] for that distance
+_GAUSS_NODES, _GAUSS_WEIGHTS = np.polynomial.legendre.leggauss(8)
+_GAUSS_NODES, _GAUSS_WEIGHTS = (_GAUSS_NODES + 1) / 2, _GAUSS_WEIGHTS / 2
+
+# Dormand-Prince 5(4) coefficients: stages, 5th order weights and the difference to the embedded 4th order
+_DP_STAGES = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+_DP_WEIGHTS = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84)
+_DP_ERROR = (71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+Profile = namedtuple("Profile", ["x", "yD", "normal_yD", "critical_yD", "subcritical", "limited"])
+
+
+# Function to calculate the top width of the water surface
+def top_width(diameter, yD):
+    return _as_array(diameter) * np.sin(batch_theta(yD) / 2)
+
+
+# Function to calculate the Froude number of the flow
+def froude_number(diameter, yD, flow_rate, gravity=GRAVITY):
+    _, area, _, _ = section_properties(diameter, yD)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hydraulic_depth = area / top_width(diameter, yD)
+        return _as_array(flow_rate) / (area * np.sqrt(gravity * hydraulic_depth))
+
+
+# Function to calculate the critical y/D (Froude number = 1) for arrays by vectorized bisection
+def critical_yD(diameter, flow_rate, gravity=GRAVITY, iterations=60):
+    diameter, flow_rate = np.broadcast_arrays(_as_array(diameter), _as_array(flow_rate))
+    lo = np.zeros(diameter.shape)
+    hi = np.ones(diameter.shape)
+    target = flow_rate ** 2 / gravity
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        _, area, _, _ = section_properties(diameter, mid)
+        above = area ** 3 / top_width(diameter, mid) > target
+        hi = np.where(above, mid, hi)
+        lo = np.where(above, lo, mid)
+    return 0.5 * (lo + hi)
+
+
+# Function to calculate the slope of the water depth dy/dx = (S0 - Sf) / (1 - Fr²)
+def _depth_gradient(diameter, yD, flow_rate, roughness, slope, gravity):
+    friction_slope = batch_slope(diameter, yD, flow_rate, roughness)
+    froude = froude_number(diameter, yD, flow_rate, gravity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (slope - friction_slope) / (1 - froude ** 2)
+
+
+# Function to keep y/D between the limits of each pipe (NaN goes to the limit away from critical depth)
+def _clip(yD, lower, upper, subcritical):
+    clipped = np.clip(yD, lower, upper)
+    return np.where(np.isfinite(clipped), clipped, np.where(subcritical, lower, upper))
+
+
+# Function to calculate the distance along the integration direction from y/D to the limit, integrating
+# dx/dy over depth; infinite when the profile moves away from the limit
+def _distance_to(gradient, y, limit, direction):
+    nodes = y + (limit - y) * _GAUSS_NODES[:, np.newaxis]
+    inverse = 1 / (direction * gradient(nodes))
+    distance = (limit - y) * (_GAUSS_WEIGHTS[:, np.newaxis] * inverse).sum(axis=0)
+    heading = (direction * gradient(y) * (limit - y) > 0) & np.all(inverse * (limit - y) >= 0, axis=0)
+    return np.where(heading & np.isfinite(distance), distance, np.inf)
+
+
+# Function to take one Dormand-Prince step of size dx (an array) from y, returning the new y and its error estimate
+def _dormand_prince_step(gradient, clip, y, dx):
+    stages = []
+    for coefficients in _DP_STAGES:
+        stages.append(gradient(clip(y + dx * sum(a * k for a, k in zip(coefficients, stages))) if coefficients
+                               else y))
+    new = y + dx * sum(b * k for b, k in zip(_DP_WEIGHTS, stages))
+    stages.append(gradient(clip(new)))
+    error = np.abs(dx * sum(e * k for e, k in zip(_DP_ERROR, stages)))
+    return new, error
+
+
+# Function to integrate gradually varied flow profiles along many circular pipes at once.
+# x runs downstream from the upstream end of each pipe. Subcritical profiles are integrated upstream
+# from boundary_yD at the downstream end, supercritical profiles downstream from boundary_yD at the
+# upstream end. Results are reported at `steps` equal intervals; within each interval every pipe takes
+# adaptive Dormand-Prince steps, which shrink near critical depth where the profile equation is singular.
+def water_surface_profile(diameter, slope, roughness, flow_rate, length, boundary_yD, steps=100,
+                          gravity=GRAVITY):
+    diameter, slope, roughness, flow_rate, length, boundary_yD = np.broadcast_arrays(
+        _as_array(diameter), _as_array(slope), _as_array(roughness), _as_array(flow_rate),
+        _as_array(length), _as_array(boundary_yD))
+
+    normal = solve_yD_batch(diameter, flow_rate, roughness, slope).yD
+    critical = critical_yD(diameter, flow_rate, gravity)
+    # On mild slopes a boundary at critical depth (a free outfall) controls a subcritical profile
+    mild = normal > critical
+    subcritical = np.where(mild, boundary_yD >= critical * (1 - CRITICAL_MARGIN), boundary_yD > critical)
+
+    # Keep each profile on the side of critical depth where it starts and inside the pipe
+    lower = np.where(subcritical, critical * (1 + CRITICAL_MARGIN), 1e-6)
+    upper = np.where(subcritical, YD_FULL, critical * (1 - CRITICAL_MARGIN))
+
+    # The adaptive steps work on flat arrays, restricted to the pipes still integrating an interval
+    pipes = [values.ravel() for values in (diameter, flow_rate, roughness, slope, lower, upper, subcritical)]
+    direction = np.where(subcritical, -1.0, 1.0).ravel()
+    interval = (length / steps).ravel()
+    min_step = MIN_STEP * length.ravel()
+    step_size = interval.copy()
+    rejected = np.zeros(interval.shape, dtype=bool)
+    limited = np.zeros(interval.shape, dtype=bool)
+    yD = np.empty((steps + 1,) + interval.shape)
+    yD[0] = y = _clip(boundary_yD.ravel(), *pipes[4:])
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for step in range(steps):
+            # Pipes held at a limit are not integrated further
+            remaining = np.where(limited, 0.0, interval)
+            while True:
+                index = np.flatnonzero(remaining > 0)
+                if not index.size:
+                    break
+                d, q, n, s, low, high, sub = (values[index] for values in pipes)
+                dx = np.minimum(step_size[index], remaining[index])
+
+                def gradient(value):
+                    return _depth_gradient(d, value, q, n, s, gravity) / d
+
+                # Profiles that reach critical depth within this interval are held there
+                limit = np.where(sub, low, high)
+                distance = _distance_to(gradient, y[index], limit, direction[index])
+                reached = ((np.abs(y[index] - limit) < CRITICAL_ZONE * np.where(sub, low, high))
+                           & (distance <= remaining[index]))
+                if reached.any():
+                    y[index[reached]] = limit[reached]
+                    limited[index[reached]] = True
+                    remaining[index[reached]] = 0.0
+                    continue
+
+                new, error = _dormand_prince_step(gradient, lambda value: _clip(value, low, high, sub), y[index],
+                                                  direction[index] * dx)
+
+                converged = np.isfinite(error) & (error <= TOLERANCE)
+                # A step that cannot be made accurate even at the minimum size means a singular gradient
+                forced = ~converged & (dx <= min_step[index])
+                accepted = converged | forced
+                hit = accepted & (~np.isfinite(new) | (new < low) | (new > high) | forced)
+                y[index] = np.where(accepted, _clip(new, low, high, sub), y[index])
+                limited[index] |= hit
+                remaining[index] = np.where(hit, 0.0, np.where(accepted, remaining[index] - dx, remaining[index]))
+
+                factor = np.where(error > 0, np.clip(0.9 * (TOLERANCE / error) ** 0.2, 0.2, 5.0), 5.0)
+                factor = np.where(np.isfinite(error), factor, 0.2)
+                # No growth right after a rejected step, which would only be rejected again
+                factor = np.where(rejected[index] & accepted, np.minimum(factor, 1.0), factor)
+                rejected[index] = ~accepted
+                step_size[index] = np.clip(dx * factor, min_step[index], interval[index])
+            yD[step + 1] = y
+
+    yD = yD.reshape((steps + 1,) + diameter.shape)
+    limited = limited.reshape(diameter.shape)
+
+    # Reorder the integration steps so that x runs downstream for every pipe
+    fraction = np.linspace(0.0, 1.0, steps + 1).reshape((-1,) + (1,) * diameter.ndim)
+    x = fraction * length
+    yD = np.where(subcritical, yD[::-1], yD)
+    return Profile(x, yD, normal, critical, subcritical, limited)
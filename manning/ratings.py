@@ -0,0 +1,189 @@
+import struct
+
+import numpy as np
+
+from .batch import _as_array, section_factor
+from .core import YD_MAX_FLOW
+from .instrument import timed
+
+# Points of every rating curve (about 1.5 KB per pipe)
+DEFAULT_POINTS = 384
+
+# Pipes written per chunk, so that building a store never holds all curves in memory
+DEFAULT_CHUNK_SIZE = 65536
+
+MAGIC = b"MANNRC01"
+
+# Header: magic, number of pipes, points per curve, bytes per pipe id (0 without ids)
+HEADER = struct.Struct("<8sQII")
+
+# Curves are interpolated linearly in Q^(6/13): near the invert Q grows like (y/D)^(13/6), so the transformed
+# curve is close to a straight line
+INTERPOLATION_EXPONENT = 6 / 13
+
+# Error targets the default grid is built for: Q within RELATIVE_FLOW_TOLERANCE (relative) at every depth, and
+# y/D within YD_TOLERANCE up to y/D = YD_TOLERANCE_LIMIT (above it the y/D error grows to ~3e-5 at y/D = 0.93 and
+# ~4e-4 at the capacity peak). The measured errors are about 2/3 of the targets.
+RELATIVE_FLOW_TOLERANCE = 2e-5
+YD_TOLERANCE = 1e-5
+YD_TOLERANCE_LIMIT = 0.9
+
+# Every section starts on a multiple of ALIGNMENT bytes
+ALIGNMENT = 64
+
+# Per-pipe index record; peak is the grid position of the largest flow (the curve rises up to it)
+INDEX_DTYPE = np.dtype([("diameter", "<f8"), ("slope", "<f8"), ("roughness", "<f8"), ("peak", "<i8")])
+
+# File layout (all sections little endian, aligned):
+#   header | y/D grid float32[points] | index INDEX_DTYPE[pipes] | curves float32[pipes, points] | ids S{n}[pipes]
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _layout(pipes, points, id_size):
+    grid = _aligned(HEADER.size)
+    index = _aligned(grid + 4 * points)
+    curves = _aligned(index + INDEX_DTYPE.itemsize * pipes)
+    ids = _aligned(curves + 4 * pipes * points)
+    return {"grid": grid, "index": index, "curves": curves, "ids": ids, "end": ids + id_size * pipes}
+
+
+# Function to build the y/D grid shared by all curves. The points equidistribute the error of the linear
+# interpolation of t = Q^(6/13) (h² |t''| / 8 on a step h), against a tolerance that is the smaller of
+# RELATIVE_FLOW_TOLERANCE of Q and YD_TOLERANCE of y/D. The y/D tolerance is held at its y/D = YD_TOLERANCE_LIMIT
+# value above that depth, since dQ/dy -> 0 at the capacity peak. The maximum-flow depth is an exact point.
+def rating_grid(points=DEFAULT_POINTS, fine_points=100001):
+    fine = np.linspace(0.0, 1.0, fine_points)
+    t = section_factor(fine) ** INTERPOLATION_EXPONENT
+    slope = np.abs(np.gradient(t, fine))
+    curvature = np.abs(np.gradient(np.gradient(t, fine), fine))
+    tolerance = np.minimum(RELATIVE_FLOW_TOLERANCE * INTERPOLATION_EXPONENT * t,
+                           YD_TOLERANCE * np.maximum(slope, np.interp(YD_TOLERANCE_LIMIT, fine, slope)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        density = np.nan_to_num(np.sqrt(curvature / tolerance), nan=0.0, posinf=0.0)
+    cumulative = np.concatenate(([0.0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(fine))))
+    grid = np.interp(np.linspace(0.0, cumulative[-1], points), cumulative, fine)
+    grid[np.argmin(np.abs(grid - YD_MAX_FLOW))] = YD_MAX_FLOW
+    return grid
+
+
+# Function to precompute the Manning rating curve of every pipe and write them all to one binary file
+@timed()
+def write_rating_store(path, diameter, slope, roughness, ids=None, points=DEFAULT_POINTS,
+                       chunk_size=DEFAULT_CHUNK_SIZE):
+    diameter, slope, roughness = np.broadcast_arrays(_as_array(diameter), _as_array(slope), _as_array(roughness))
+    diameter, slope, roughness = diameter.ravel(), slope.ravel(), roughness.ravel()
+    pipes = diameter.size
+    grid = rating_grid(points)
+    shape_curve = section_factor(grid)
+
+    encoded = None
+    if ids is not None:
+        encoded = np.array([str(pipe_id).encode("utf-8") for pipe_id in ids])
+        if encoded.size != pipes:
+            raise ValueError(f"Got {encoded.size} ids for {pipes} pipes")
+    id_size = encoded.dtype.itemsize if encoded is not None else 0
+    layout = _layout(pipes, points, id_size)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, pipes, points, id_size))
+        f.truncate(layout["end"])
+    with open(path, "r+b") as f:
+        f.seek(layout["grid"])
+        f.write(grid.astype("<f4").tobytes())
+        if encoded is not None:
+            f.seek(layout["ids"])
+            f.write(encoded.tobytes())
+
+    index = np.memmap(path, INDEX_DTYPE, "r+", layout["index"], (pipes,))
+    curves = np.memmap(path, "<f4", "r+", layout["curves"], (pipes, points))
+    for start in range(0, pipes, chunk_size):
+        stop = min(start + chunk_size, pipes)
+        # Every Manning curve is the dimensionless curve K(y/D) scaled by D^(8/3) S^(1/2) / n
+        scale = diameter[start:stop] ** (8 / 3) * slope[start:stop] ** 0.5 / roughness[start:stop]
+        chunk = (scale[:, np.newaxis] * shape_curve[np.newaxis, :]).astype("<f4")
+        curves[start:stop] = chunk
+        index["diameter"][start:stop] = diameter[start:stop]
+        index["slope"][start:stop] = slope[start:stop]
+        index["roughness"][start:stop] = roughness[start:stop]
+        index["peak"][start:stop] = chunk.argmax(axis=1)
+    curves.flush()
+    index.flush()
+    del curves, index
+    return pipes
+
+
+class RatingStore:
+    # Read-only, memory-mapped view of a rating-curve file. Nothing is loaded up front: lookups read only the
+    # curve points they touch, and the pages are shared by every process that opens the same file.
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, self.pipes, self.points, self.id_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a rating-curve store")
+        layout = _layout(self.pipes, self.points, self.id_size)
+        self.grid = np.memmap(path, "<f4", "r", layout["grid"], (self.points,))
+        self.index = np.memmap(path, INDEX_DTYPE, "r", layout["index"], (self.pipes,))
+        self.curves = np.memmap(path, "<f4", "r", layout["curves"], (self.pipes, self.points))
+        self.ids = (np.memmap(path, f"S{self.id_size}", "r", layout["ids"], (self.pipes,))
+                    if self.id_size else None)
+        self._rows = None
+
+    def __len__(self):
+        return self.pipes
+
+    # Function to map pipe ids to row numbers (the id table is read once, on first use)
+    def rows(self, ids):
+        if self.ids is None:
+            raise ValueError("The store was written without pipe ids; use row numbers")
+        if self._rows is None:
+            self._rows = {pipe_id.decode("utf-8"): row for row, pipe_id in enumerate(self.ids.tolist())}
+        return np.array([self._rows[str(pipe_id)] for pipe_id in np.atleast_1d(ids)]).reshape(np.shape(ids))
+
+    # Function to get the grid and the flow rates of one curve
+    def curve(self, row):
+        return np.asarray(self.grid, dtype=float), np.asarray(self.curves[row], dtype=float)
+
+    # Function to calculate the flow rate at y/D for arrays of rows, by interpolation on the curves
+    @timed("manning.ratings.RatingStore.flow_rate")
+    def flow_rate(self, rows, yD):
+        rows, yD = np.broadcast_arrays(np.asarray(rows, dtype=np.int64), _as_array(yD))
+        left = np.clip(np.searchsorted(self.grid, yD, side="right") - 1, 0, self.points - 2)
+        x0, x1 = self.grid[left], self.grid[left + 1]
+        t0 = self.curves[rows, left].astype(float) ** INTERPOLATION_EXPONENT
+        t1 = self.curves[rows, left + 1].astype(float) ** INTERPOLATION_EXPONENT
+        with np.errstate(invalid="ignore"):
+            result = (t0 + (t1 - t0) * (yD - x0) / (x1 - x0)) ** (1 / INTERPOLATION_EXPONENT)
+        return np.where((yD >= 0) & (yD <= 1), result, np.nan)
+
+    # Function to calculate y/D (lower root) from flow rates for arrays of rows: a binary search on the rising
+    # part of each curve, run for all rows at once, then interpolation. NaN above the pipe capacity.
+    @timed("manning.ratings.RatingStore.yD")
+    def yD(self, rows, flow_rate):
+        rows, flow_rate = np.broadcast_arrays(np.asarray(rows, dtype=np.int64), _as_array(flow_rate))
+        shape = rows.shape
+        rows, flow_rate = rows.ravel(), flow_rate.ravel()
+        peak = self.index["peak"][rows]
+
+        lo = np.zeros(rows.size, dtype=np.int64)
+        hi = peak.copy()
+        while True:
+            searching = hi - lo > 1
+            if not searching.any():
+                break
+            mid = (lo + hi) // 2
+            below = self.curves[rows, mid] <= flow_rate
+            lo = np.where(searching & below, mid, lo)
+            hi = np.where(searching & ~below, mid, hi)
+
+        x0, x1 = self.grid[lo], self.grid[hi]
+        t0 = self.curves[rows, lo].astype(float) ** INTERPOLATION_EXPONENT
+        t1 = self.curves[rows, hi].astype(float) ** INTERPOLATION_EXPONENT
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.abs(flow_rate) ** INTERPOLATION_EXPONENT
+            result = np.clip(x0 + (x1 - x0) * (t - t0) / (t1 - t0), x0, x1)
+        valid = (flow_rate >= 0) & (flow_rate <= self.curves[rows, peak])
+        return np.where(valid, result, np.nan).reshape(shape)
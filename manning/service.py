@@ -0,0 +1,253 @@
+import asyncio
+import json
+import math
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from . import instrument
+from .core import VARIABLES
+
+# Micro-batching defaults: largest batch and longest wait for more requests before solving
+DEFAULT_MAX_BATCH = 4096
+DEFAULT_MAX_DELAY = 0.005
+
+# Number of recent request latencies kept for the percentiles reported by /metrics
+LATENCY_WINDOW = 10_000
+
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+# Function to solve a batch of requests for one unknown (runs in the worker pool)
+def _solve_batch(unknown, columns):
+    from .batch import solve
+    results = solve(unknown, **columns)
+    return {name: values.tolist() for name, values in results.items()}
+
+
+# Function to replace NaN/inf by None so that results are valid JSON
+def _json_value(value):
+    return value if math.isfinite(value) else None
+
+
+# Function to check that an input value is a number and convert it to float
+def _input_value(name, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Invalid value for {name}: {value!r} (expected a number)")
+    return float(value)
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        uptime = time.monotonic() - self.started
+
+        def percentile(fraction):
+            return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000 if latencies else None
+
+        return {
+            "uptime_s": uptime,
+            "requests": self.requests,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_rows / self.batches if self.batches else None,
+            "throughput_rps": self.requests / uptime if uptime > 0 else None,
+            "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+            "solvers": instrument.snapshot() if instrument.is_enabled() else None,
+        }
+
+
+class MicroBatcher:
+    # Collects concurrent solve requests and solves them together, one vectorized call per unknown
+    def __init__(self, executor=None, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY, metrics=None):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.metrics = metrics or Metrics()
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        # Also restarts the task if it ever stopped, so that queued requests are not left waiting
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, unknown, inputs):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((unknown, inputs, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._solve(batch)
+
+    async def _solve(self, batch):
+        loop = asyncio.get_running_loop()
+        groups = defaultdict(list)
+        for unknown, inputs, future in batch:
+            groups[(unknown, tuple(sorted(inputs)))].append((inputs, future))
+
+        for (unknown, names), items in groups.items():
+            try:
+                columns = {name: [float(inputs[name]) for inputs, _ in items] for name in names}
+                results = await loop.run_in_executor(self.executor, _solve_batch, unknown, columns)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.metrics.batches += 1
+            self.metrics.batched_rows += len(items)
+            for index, (_, future) in enumerate(items):
+                if not future.done():
+                    future.set_result({name: _json_value(values[index]) for name, values in results.items()})
+
+
+class CalculationService:
+    # JSON API for the five Manning calculations:
+    #   POST /solve/<variable>  body {"diameter": ..., "yD": ..., ...} or a list of such objects
+    #   GET  /metrics           latency, throughput and batching statistics
+    #   GET  /health
+    def __init__(self, workers=None, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY):
+        # workers=0 solves in the event loop's default thread pool instead of a process pool
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+        self.metrics = Metrics()
+        self.batcher = MicroBatcher(self.executor, max_batch, max_delay, self.metrics)
+
+    async def handle(self, method, path, body=b""):
+        # Returns (status, payload) for one request
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return HTTPStatus.OK, self.metrics.snapshot()
+        if not path.startswith("/solve/"):
+            return HTTPStatus.NOT_FOUND, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST to solve"}
+
+        start = time.perf_counter()
+        self.metrics.requests += 1
+        try:
+            unknown = path[len("/solve/"):]
+            if unknown not in VARIABLES:
+                raise ValueError(f"Unknown variable to calculate: {unknown!r} (expected one of {', '.join(VARIABLES)})")
+            data = json.loads(body or b"{}")
+            rows = data if isinstance(data, list) else [data]
+            inputs = []
+            for row in rows:
+                if not isinstance(row, dict):
+                    raise ValueError("Each request must be a JSON object of input values")
+                inputs.append({name: _input_value(name, row[name]) for name in VARIABLES
+                               if name in row and name != unknown})
+            results = await asyncio.gather(*(self.batcher.submit(unknown, row) for row in inputs))
+            payload = results if isinstance(data, list) else results[0]
+            return HTTPStatus.OK, payload
+        except Exception as e:
+            self.metrics.errors += 1
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        finally:
+            self.metrics.latencies.append(time.perf_counter() - start)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle(method, path.split("?", 1)[0], body)
+
+                content = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def close(self):
+        await self.batcher.stop()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+class LocalClient:
+    # Stand-in client that calls the service in-process, without sockets, for local tests
+    def __init__(self, service):
+        self.service = service
+
+    async def solve(self, unknown, **inputs):
+        status, payload = await self.service.handle("POST", f"/solve/{unknown}", json.dumps(inputs).encode())
+        if status != HTTPStatus.OK:
+            raise ValueError(payload["error"])
+        return payload
+
+    async def metrics(self):
+        return (await self.service.handle("GET", "/metrics"))[1]
+
+
+# Function to run the service until interrupted
+def serve(host="127.0.0.1", port=8080, workers=None, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY):
+    service = CalculationService(workers, max_batch, max_delay)
+
+    async def main():
+        try:
+            await service.serve(host, port)
+        finally:
+            await service.close()
+
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .batch import _as_array, batch_flow_rate, batch_velocity, section_properties
+from .instrument import increment, timed
+from .io import ChunkWriter, iter_chunks
+
+# Readings converted together
+DEFAULT_BATCH_SIZE = 65536
+
+ReadingBatch = namedtuple("ReadingBatch", ["timestamp", "sensor_id", "depth"])
+FlowBatch = namedtuple("FlowBatch", ["timestamp", "sensor_id", "depth", "yD", "flow_rate", "velocity",
+                                     "surcharged", "known"])
+
+
+class SensorRegistry:
+    # Pipe parameters (diameter, slope, roughness) of every depth sensor. Sensor ids are compared as strings
+    # and looked up for whole batches at once through a sorted copy of the ids.
+    def __init__(self):
+        self._rows = {}
+        self._parameters = []
+        self._sorted = None
+
+    @classmethod
+    def from_frame(cls, frame, id_column="sensor_id"):
+        registry = cls()
+        for sensor_id, diameter, slope, roughness in zip(frame[id_column], frame["diameter"], frame["slope"],
+                                                         frame["roughness"]):
+            registry.register(sensor_id, diameter, slope, roughness)
+        return registry
+
+    @classmethod
+    def load(cls, path, id_column="sensor_id"):
+        # CSV or Parquet file with sensor_id, diameter, slope and roughness columns
+        import pandas as pd
+        frame = pd.read_parquet(path) if path.endswith((".parquet", ".pq")) else pd.read_csv(path)
+        return cls.from_frame(frame, id_column)
+
+    def __len__(self):
+        return len(self._rows)
+
+    # Function to add a sensor, or move an existing one to another pipe
+    def register(self, sensor_id, diameter, slope, roughness):
+        key = str(sensor_id)
+        if key in self._rows:
+            self._parameters[self._rows[key]] = (float(diameter), float(slope), float(roughness))
+        else:
+            self._rows[key] = len(self._parameters)
+            self._parameters.append((float(diameter), float(slope), float(roughness)))
+        self._sorted = None
+
+    # Function to get the registry rows (registration order) of arrays of sensor ids, and which ids are known
+    def rows(self, sensor_ids):
+        if self._sorted is None:
+            keys = np.array(list(self._rows), dtype=str)
+            order = np.argsort(keys)
+            self._sorted = (keys[order], np.array(list(self._rows.values()), dtype=np.int64)[order])
+        keys, rows = self._sorted
+
+        sensor_ids = np.asarray(sensor_ids).astype(str)
+        if not keys.size:
+            return np.zeros(sensor_ids.shape, dtype=np.int64), np.zeros(sensor_ids.shape, dtype=bool)
+        position = np.clip(np.searchsorted(keys, sensor_ids), 0, keys.size - 1)
+        return rows[position], keys[position] == sensor_ids
+
+    # Function to get the diameter, slope and roughness of every registered sensor, in registration order
+    def parameters(self):
+        return np.array(self._parameters, dtype=float).reshape(-1, 3)
+
+    # Function to get the diameter, slope and roughness for arrays of sensor ids (NaN for unknown sensors)
+    def lookup(self, sensor_ids):
+        rows, known = self.rows(sensor_ids)
+        parameters = self.parameters()
+        values = (np.where(known[:, np.newaxis], parameters[rows], np.nan) if parameters.size
+                  else np.full(known.shape + (3,), np.nan))
+        return values[:, 0], values[:, 1], values[:, 2], known
+
+    # Function to list the sensor ids in registration order
+    def ids(self):
+        return list(self._rows)
+
+
+# Function to group a live feed of single (timestamp, sensor_id, depth) readings into batches. A partial batch is
+# emitted when max_delay seconds have passed since its first reading (checked as readings arrive) and at the end.
+def batch_readings(readings, batch_size=DEFAULT_BATCH_SIZE, max_delay=None):
+    buffer = []
+    started = None
+    for reading in readings:
+        if not buffer:
+            started = time.monotonic()
+        buffer.append(reading)
+        if len(buffer) >= batch_size or (max_delay is not None and time.monotonic() - started >= max_delay):
+            yield _to_batch(buffer)
+            buffer = []
+    if buffer:
+        yield _to_batch(buffer)
+
+
+def _to_batch(readings):
+    timestamp, sensor_id, depth = zip(*readings)
+    return ReadingBatch(np.array(timestamp), np.array(sensor_id), np.array(depth, dtype=float))
+
+
+# Function to replay a CSV or Parquet file of readings as batches, in place of the live feed. With speed set, batches
+# are released following the recorded timestamps (speed=10 replays ten times faster than real time).
+def replay_file(path, batch_size=DEFAULT_BATCH_SIZE, speed=None, columns=None, file_format=None):
+    import pandas as pd
+
+    names = {"timestamp": "timestamp", "sensor_id": "sensor_id", "depth": "depth"}
+    names.update(columns or {})
+    first_time = started = None
+    for chunk in iter_chunks(path, batch_size, file_format):
+        batch = ReadingBatch(chunk[names["timestamp"]].to_numpy(), chunk[names["sensor_id"]].to_numpy(),
+                             chunk[names["depth"]].to_numpy(dtype=float))
+        if speed and len(batch.timestamp):
+            # Wait until the last reading of the batch is due
+            moments = pd.to_datetime(batch.timestamp)
+            if first_time is None:
+                first_time, started = moments[0], time.monotonic()
+            delay = (moments[-1] - first_time).total_seconds() / speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+        yield batch
+
+
+# Function to convert one batch of depth readings to flow estimates. Depths above the crown are reported at the
+# full-pipe flow and flagged as surcharged; readings of unknown sensors get NaN results.
+@timed()
+def estimate_batch(batch, registry):
+    diameter, slope, roughness, known = registry.lookup(batch.sensor_id)
+    depth = _as_array(batch.depth)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yD = np.clip(depth / diameter, 0.0, 1.0)
+        flow_rate = np.where(yD == 0, 0.0, batch_flow_rate(diameter, yD, roughness, slope))
+        _, area, _, _ = section_properties(diameter, yD)
+        velocity = np.where(yD == 0, 0.0, batch_velocity(flow_rate, area))
+    surcharged = known & (depth > diameter)
+    increment("streaming.readings", depth.size)
+    increment("streaming.unknown_sensors", int(depth.size - known.sum()))
+    return FlowBatch(batch.timestamp, batch.sensor_id, depth, yD, flow_rate, velocity, surcharged, known)
+
+
+# Function to turn a stream of reading batches into a stream of flow batches; only one batch is held at a time
+def estimate_flows(batches, registry):
+    for batch in batches:
+        yield estimate_batch(batch, registry)
+
+
+# Function to write a stream of flow batches to a CSV or Parquet file, returning the number of readings written
+def write_flows(flow_batches, path, file_format=None):
+    import pandas as pd
+
+    rows = 0
+    with ChunkWriter(path, file_format) as writer:
+        for batch in flow_batches:
+            writer.write(pd.DataFrame(batch._asdict()))
+            rows += len(batch.depth)
+    return rows
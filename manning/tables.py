@@ -0,0 +1,183 @@
+import functools
+import os
+
+import numpy as np
+
+from .batch import _as_array
+from .core import YD_MAX_FLOW
+from .instrument import timed
+
+# Columns of the dimensionless section table (area / D², wetted perimeter / D, hydraulic radius / D,
+# section factor A * R^(2/3) / D^(8/3))
+COLUMNS = ("yD", "theta", "area", "wetted_perimeter", "hydraulic_radius", "section_factor")
+
+# Default accuracy target, as absolute y/D error and error relative to the largest value of each column
+DEFAULT_TOLERANCE = 1e-6
+
+# Smallest tolerance that can be met: near the maximum flow capacity y/D is only determined by the
+# section factor to about the square root of the machine precision
+MIN_TOLERANCE = 1e-7
+
+# Limits on the number of points per table segment
+MIN_POINTS = 256
+MAX_POINTS = 2 ** 16
+
+# Environment variable pointing to a directory where built tables are cached as .npy files
+CACHE_DIR_ENV = "MANNING_TABLE_CACHE"
+
+_YD, _THETA, _AREA, _WETTED_PERIMETER, _HYDRAULIC_RADIUS, _SECTION_FACTOR = range(len(COLUMNS))
+
+
+# Function to calculate the exact dimensionless properties for an array of central angles
+def _exact_columns(theta):
+    yD = (1 - np.cos(theta / 2)) / 2
+    area = (theta - np.sin(theta)) / 8
+    wetted_perimeter = theta / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hydraulic_radius = np.where(theta > 0, area / wetted_perimeter, 0.0)
+    return np.stack([yD, theta, area, wetted_perimeter, hydraulic_radius, area * hydraulic_radius ** (2 / 3)])
+
+
+# Functions to calculate theta from the variable each segment is sampled in
+def _theta_from_sqrt_yD(s):
+    return 4 * np.arcsin(s)
+
+
+def _theta_from_sqrt_one_minus_yD(s):
+    return 2 * np.pi - 4 * np.arcsin(s)
+
+
+THETA_HALF = np.pi
+THETA_MAX_FLOW = float(2 * np.arccos(1 - 2 * YD_MAX_FLOW))
+
+
+# Function to sample the three monotone segments of the table with n points each:
+# y/D in [0, 0.5] uniform in sqrt(y/D), [0.5, 0.938] uniform in theta and [0.938, 1] uniform in sqrt(1 - y/D)
+def _sample_segments(points):
+    half = np.sqrt(0.5)
+    return (
+        _theta_from_sqrt_yD(np.linspace(0, half, points)),
+        np.linspace(THETA_HALF, THETA_MAX_FLOW, points),
+        _theta_from_sqrt_one_minus_yD(np.linspace(0, np.sqrt(1 - YD_MAX_FLOW), points)),
+    )
+
+
+class SectionTable:
+    # data has shape (3 segments, len(COLUMNS), points)
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=float)
+        self.points = self.data.shape[2]
+        self.section_factor_half = self.data[0, _SECTION_FACTOR, -1]
+        self.section_factor_max = self.data[1, _SECTION_FACTOR, -1]
+        self.section_factor_full = self.data[2, _SECTION_FACTOR, 0]
+
+        low, mid, high = self.data
+        # Forward lookup abscissas
+        self._forward_x = (np.sqrt(low[_YD]), mid[_YD], np.sqrt(1 - high[_YD]))
+        # Inverse lookup abscissas, transformed so that y/D is a smooth function of them
+        self._inverse_low = (low[_SECTION_FACTOR] ** 0.6, low[_YD])
+        self._inverse_mid = (self._distance_to_max(mid[_SECTION_FACTOR])[::-1], mid[_YD][::-1])
+        self._inverse_high = (self._distance_to_max(high[_SECTION_FACTOR])[::-1], high[_YD][::-1])
+
+    @classmethod
+    def build(cls, points):
+        return cls(np.stack([_exact_columns(theta) for theta in _sample_segments(points)]))
+
+    def _distance_to_max(self, section_factor):
+        return np.sqrt(np.maximum(self.section_factor_max - section_factor, 0.0))
+
+    # Function to interpolate one column of the table at arrays of y/D
+    def lookup(self, column, yD):
+        index = COLUMNS.index(column)
+        yD = _as_array(yD)
+        low, mid, high = self.data
+        result = np.full(yD.shape, np.nan)
+
+        in_low = (yD >= 0) & (yD <= 0.5)
+        in_mid = (yD > 0.5) & (yD <= YD_MAX_FLOW)
+        in_high = (yD > YD_MAX_FLOW) & (yD <= 1)
+        result[in_low] = np.interp(np.sqrt(yD[in_low]), self._forward_x[0], low[index])
+        result[in_mid] = np.interp(yD[in_mid], self._forward_x[1], mid[index])
+        result[in_high] = np.interp(np.sqrt(1 - yD[in_high]), self._forward_x[2], high[index])
+        return result
+
+    # Function to find y/D from the section factor (lower root, or the root above 0.938 when upper is set)
+    def yD_from_section_factor(self, section_factor, upper=False):
+        section_factor = _as_array(section_factor)
+        result = np.full(section_factor.shape, np.nan)
+        if upper:
+            in_high = (section_factor >= self.section_factor_full) & (section_factor <= self.section_factor_max)
+            result[in_high] = np.interp(self._distance_to_max(section_factor[in_high]), *self._inverse_high)
+            return result
+
+        in_low = (section_factor >= 0) & (section_factor <= self.section_factor_half)
+        in_mid = (section_factor > self.section_factor_half) & (section_factor <= self.section_factor_max)
+        result[in_low] = np.interp(section_factor[in_low] ** 0.6, *self._inverse_low)
+        result[in_mid] = np.interp(self._distance_to_max(section_factor[in_mid]), *self._inverse_mid)
+        return result
+
+    # Function to calculate y/D for arrays of Manning inputs (NaN where the flow exceeds the pipe capacity)
+    def yD(self, diameter, flow_rate, roughness, slope):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            target = (_as_array(flow_rate) * _as_array(roughness)) / ((_as_array(slope) ** 0.5)
+                                                                      * (_as_array(diameter) ** (8 / 3)))
+        return self.yD_from_section_factor(target)
+
+    # Function to measure the largest interpolation errors against the exact formulas
+    def max_errors(self):
+        errors = {}
+        samples = np.stack([_exact_columns(theta) for theta in _sample_segments(4 * self.points - 3)])
+        exact = samples.transpose(1, 0, 2).reshape(len(COLUMNS), -1)
+        for index, column in enumerate(COLUMNS[1:], start=1):
+            interpolated = self.lookup(column, exact[_YD])
+            errors[column] = float(np.max(np.abs(interpolated - exact[index])) / np.max(np.abs(exact[index])))
+
+        lower = samples[:2].transpose(1, 0, 2).reshape(len(COLUMNS), -1)
+        errors["yD"] = float(np.max(np.abs(self.yD_from_section_factor(lower[_SECTION_FACTOR]) - lower[_YD])))
+        upper = samples[2]
+        errors["yD_upper"] = float(np.max(np.abs(
+            self.yD_from_section_factor(upper[_SECTION_FACTOR], upper=True) - upper[_YD])))
+        return errors
+
+    # Function to get the largest error over all columns and both inverse lookups
+    def max_error(self):
+        return max(self.max_errors().values())
+
+
+# Function to build a table refined until every interpolation error is within the tolerance
+def build_section_table(tolerance=DEFAULT_TOLERANCE):
+    if tolerance < MIN_TOLERANCE:
+        raise ValueError(f"Tolerance {tolerance:g} is below the achievable accuracy of {MIN_TOLERANCE:g}")
+
+    points = MIN_POINTS
+    table = SectionTable.build(points)
+    while table.max_error() > tolerance and points < MAX_POINTS:
+        points *= 2
+        table = SectionTable.build(points)
+    if table.max_error() > tolerance:
+        raise ValueError(f"Tolerance {tolerance:g} not reached with {MAX_POINTS} points per segment "
+                         f"(largest error {table.max_error():.3g})")
+    return table
+
+
+# Function to get the section table for a tolerance, built once per process or loaded from the .npy cache
+@functools.lru_cache(maxsize=None)
+def get_section_table(tolerance=DEFAULT_TOLERANCE, cache_dir=None):
+    cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV)
+    # The exact tolerance is part of the file name, so a table is never reused for a stricter tolerance
+    cache_path = os.path.join(cache_dir, f"section_table_{float(tolerance)!r}.npy") if cache_dir else None
+
+    if cache_path and os.path.exists(cache_path):
+        return SectionTable(np.load(cache_path))
+
+    table = build_section_table(tolerance)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache_path, table.data)
+    return table
+
+
+# Function to calculate y/D for arrays by table lookup instead of a root-find
+@timed()
+def lookup_yD(diameter, flow_rate, roughness, slope, tolerance=DEFAULT_TOLERANCE):
+    return get_section_table(tolerance).yD(diameter, flow_rate, roughness, slope)
@@ -0,0 +1,141 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .batch import _SOLVERS, _as_array, section_factor, section_factor_derivative, solve
+from .core import VARIABLES
+
+DEFAULT_SAMPLES = 1_000_000
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+# Number of logarithmic histogram bins used for the streaming percentile estimates
+HISTOGRAM_BINS = 4096
+
+Summary = namedtuple("Summary", ["mean", "std", "percentiles", "samples", "failed"])
+
+
+class Distribution:
+    # Input distribution sampled with a NumPy generator. kind is one of "fixed", "normal", "lognormal",
+    # "uniform" or "triangular"; normal/lognormal use a mean and a coefficient of variation.
+    def __init__(self, kind, mean=None, cv=None, low=None, high=None, mode=None):
+        self.kind = kind
+        self.mean, self.cv = mean, cv
+        self.low, self.high, self.mode = low, high, mode
+
+    @classmethod
+    def fixed(cls, value):
+        return cls("fixed", mean=value)
+
+    def sample(self, rng, size):
+        if self.kind == "fixed":
+            return np.full(size, float(self.mean))
+        if self.kind == "normal":
+            return rng.normal(self.mean, self.cv * self.mean, size)
+        if self.kind == "lognormal":
+            sigma = np.sqrt(np.log1p(self.cv ** 2))
+            return rng.lognormal(np.log(self.mean) - sigma ** 2 / 2, sigma, size)
+        if self.kind == "uniform":
+            return rng.uniform(self.low, self.high, size)
+        if self.kind == "triangular":
+            return rng.triangular(self.low, self.mode, self.high, size)
+        raise ValueError(f"Unknown distribution {self.kind!r}")
+
+
+class StreamingStats:
+    # Mean, standard deviation and percentiles of a stream of positive values in bounded memory:
+    # running sums plus a histogram with logarithmic bins spanning `decades` around the first chunk
+    def __init__(self, bins=HISTOGRAM_BINS, decades=6):
+        self.bins = bins
+        self.decades = decades
+        self.edges = None
+        self.counts = np.zeros(bins + 2, dtype=np.int64)  # underflow and overflow at both ends
+        self.count = 0
+        self.failed = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def update(self, values):
+        values = _as_array(values).ravel()
+        valid = values[np.isfinite(values) & (values > 0)]
+        self.failed += values.size - valid.size
+        if valid.size == 0:
+            return
+
+        if self.edges is None:
+            center = np.log10(np.median(valid))
+            self.edges = np.logspace(center - self.decades / 2, center + self.decades / 2, self.bins + 1)
+        self.counts += np.bincount(np.searchsorted(self.edges, valid, side="right"), minlength=self.bins + 2)
+        self.count += valid.size
+        self.total += valid.sum()
+        self.total_squares += np.square(valid).sum()
+
+    def percentile(self, q):
+        if self.count == 0:
+            return float("nan")
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, q / 100 * self.count))
+        if index == 0:
+            return float(self.edges[0])
+        if index > self.bins:
+            return float(self.edges[-1])
+        # Geometric interpolation inside the bin
+        below = cumulative[index - 1]
+        fraction = (q / 100 * self.count - below) / max(self.counts[index], 1)
+        return float(self.edges[index - 1] * (self.edges[index] / self.edges[index - 1]) ** fraction)
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        mean = self.total / self.count if self.count else float("nan")
+        variance = self.total_squares / self.count - mean ** 2 if self.count else float("nan")
+        return Summary(float(mean), float(np.sqrt(max(variance, 0.0))), {q: self.percentile(q) for q in percentiles},
+                       self.count, self.failed)
+
+
+# Function to propagate input distributions through the Manning equation by Monte Carlo, in chunks so
+# that memory stays bounded for millions of samples. inputs maps variable names to a Distribution or a value.
+def monte_carlo(unknown, inputs, samples=DEFAULT_SAMPLES, chunk_size=DEFAULT_CHUNK_SIZE,
+                percentiles=DEFAULT_PERCENTILES, seed=None):
+    if unknown not in _SOLVERS:
+        raise ValueError(f"Unknown variable to calculate: {unknown!r} (expected one of {', '.join(VARIABLES)})")
+
+    distributions = {name: value if isinstance(value, Distribution) else Distribution.fixed(value)
+                     for name, value in inputs.items() if name != unknown}
+    rng = np.random.default_rng(seed)
+    stats = StreamingStats()
+    for start in range(0, samples, chunk_size):
+        size = min(chunk_size, samples - start)
+        drawn = {name: distribution.sample(rng, size) for name, distribution in distributions.items()}
+        stats.update(solve(unknown, **drawn)[unknown])
+    return stats.summary(percentiles)
+
+
+# Function to calculate closed-form partial derivatives of the solved variable with respect to each input,
+# from Q = K(y/D) D^(8/3) S^(1/2) / n
+def sensitivities(unknown, diameter=None, yD=None, slope=None, roughness=None, flow_rate=None):
+    values = solve(unknown, diameter=diameter, yD=yD, slope=slope, roughness=roughness, flow_rate=flow_rate)
+    q, d, y, s, n = (values[name] for name in ("flow_rate", "diameter", "yD", "slope", "roughness"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Relative derivative of Q with respect to y/D: K'(y/D) / K(y/D)
+        k_ratio = section_factor_derivative(y) / section_factor(y)
+
+        if unknown == "flow_rate":
+            return {"diameter": 8 * q / (3 * d), "yD": q * k_ratio, "slope": q / (2 * s), "roughness": -q / n}
+        if unknown == "diameter":
+            return {"flow_rate": 3 * d / (8 * q), "yD": -3 * d * k_ratio / 8, "slope": -3 * d / (16 * s),
+                    "roughness": 3 * d / (8 * n)}
+        if unknown == "yD":
+            # Implicit differentiation of Q(D, y/D, S, n) = Q at constant Q
+            return {"flow_rate": 1 / (q * k_ratio), "diameter": -8 / (3 * d * k_ratio),
+                    "slope": -1 / (2 * s * k_ratio), "roughness": 1 / (n * k_ratio)}
+        if unknown == "slope":
+            return {"flow_rate": 2 * s / q, "diameter": -16 * s / (3 * d), "yD": -2 * s * k_ratio,
+                    "roughness": 2 * s / n}
+        return {"flow_rate": -n / q, "diameter": 8 * n / (3 * d), "yD": n * k_ratio, "slope": n / (2 * s)}
+
+
+# Function to estimate the standard deviation of the solved variable from the input standard deviations
+# by first-order (delta method) propagation of the analytic derivatives
+def linearized_std(unknown, standard_deviations, **inputs):
+    derivatives = sensitivities(unknown, **inputs)
+    variance = sum((derivatives[name] * std) ** 2 for name, std in standard_deviations.items() if name in derivatives)
+    return np.sqrt(variance)
@@ -0,0 +1,124 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .instrument import record_convergence, timed
+from .batch import _as_array, section_factor, section_factor_derivative
+from .core import YD_MAX_FLOW
+
+# Status codes reported for every y/D solve
+YD_SINGLE_ROOT = 0    # one solution, below the flow of the full pipe
+YD_TWO_ROOTS = 1      # flow between the full pipe and the maximum capacity: yD and yD_upper both satisfy Manning
+YD_OVER_CAPACITY = 2  # flow above the maximum capacity of the pipe (y/D ≈ 0.938): no gravity solution
+YD_INVALID = 3        # negative or non-finite inputs
+
+# Section factor of the full pipe and at the maximum flow capacity
+SECTION_FACTOR_FULL = float(section_factor(1.0))
+SECTION_FACTOR_MAX = float(section_factor(YD_MAX_FLOW))
+
+YDSolution = namedtuple("YDSolution", ["yD", "yD_upper", "status", "iterations"])
+
+
+# Function to calculate the target section factor Q n / (S^(1/2) D^(8/3))
+def _target_section_factor(diameter, flow_rate, roughness, slope):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (flow_rate * roughness) / ((slope ** 0.5) * (diameter ** (8 / 3)))
+
+
+# Function to find section_factor(yD) = target on [lo, hi] by Newton steps safeguarded with bisection,
+# returning y/D, the iterations and which rows converged within max_iterations
+def _newton_bisect(target, lo, hi, increasing, xtol=1e-12, max_iterations=100):
+    lo, hi = lo.copy(), hi.copy()
+    sign = 1.0 if increasing else -1.0
+    yD = 0.5 * (lo + hi)
+    iterations = np.zeros(target.shape, dtype=np.int64)
+    converged = np.zeros(target.shape, dtype=bool)
+    active = np.arange(target.size)
+
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        iterations[active] += 1
+        x, a, b = yD[active], lo[active], hi[active]
+        residual = sign * (section_factor(x) - target[active])
+        a = np.where(residual < 0, x, a)
+        b = np.where(residual > 0, x, b)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = x - residual / (sign * section_factor_derivative(x))
+        inside = np.isfinite(newton) & (newton > a) & (newton < b)
+        step = np.where(inside, newton, 0.5 * (a + b))
+
+        yD[active], lo[active], hi[active] = step, a, b
+        done = (residual == 0) | (np.abs(step - x) <= xtol) | (b - a <= xtol)
+        converged[active[done]] = True
+        active = active[~done]
+
+    return yD, iterations, converged
+
+
+# Function to solve y/D for arrays with a bracketed solver, reporting the two-root and over-capacity cases
+@timed()
+def solve_yD_batch(diameter, flow_rate, roughness, slope, xtol=1e-12, max_iterations=100):
+    diameter, flow_rate, roughness, slope = np.broadcast_arrays(
+        _as_array(diameter), _as_array(flow_rate), _as_array(roughness), _as_array(slope))
+    target = _target_section_factor(diameter, flow_rate, roughness, slope)
+
+    valid = (np.isfinite(target) & (target >= 0) & np.isfinite(diameter + roughness + slope)
+             & (diameter > 0) & (roughness > 0) & (slope > 0))
+    status = np.where(valid, YD_SINGLE_ROOT, YD_INVALID)
+    status = np.where(valid & (target > SECTION_FACTOR_FULL), YD_TWO_ROOTS, status)
+    status = np.where(valid & (target > SECTION_FACTOR_MAX), YD_OVER_CAPACITY, status)
+
+    solvable = (status == YD_SINGLE_ROOT) | (status == YD_TWO_ROOTS)
+    yD = np.full(target.shape, np.nan)
+    yD_upper = np.full(target.shape, np.nan)
+    iterations = np.zeros(target.shape, dtype=np.int64)
+
+    if solvable.any():
+        lower, lower_iterations, lower_converged = _newton_bisect(
+            target[solvable], np.zeros(solvable.sum()), np.full(solvable.sum(), YD_MAX_FLOW),
+            increasing=True, xtol=xtol, max_iterations=max_iterations)
+        yD[solvable] = lower
+        iterations[solvable] = lower_iterations
+        record_convergence("solve_yD_batch", lower_iterations, lower_converged)
+
+    two_roots = status == YD_TWO_ROOTS
+    if two_roots.any():
+        upper, upper_iterations, upper_converged = _newton_bisect(
+            target[two_roots], np.full(two_roots.sum(), YD_MAX_FLOW), np.ones(two_roots.sum()),
+            increasing=False, xtol=xtol, max_iterations=max_iterations)
+        yD_upper[two_roots] = upper
+        iterations[two_roots] += upper_iterations
+        record_convergence("solve_yD_batch.upper", upper_iterations, upper_converged)
+
+    return YDSolution(yD, yD_upper, status, iterations)
+
+
+# Function to solve y/D for one set of inputs with Brent's method on the bracket [0, YD_MAX_FLOW], and on
+# [YD_MAX_FLOW, 1] for the upper root
+def solve_yD(diameter, flow_rate, roughness, slope, xtol=1e-12):
+    from scipy.optimize import brentq
+
+    diameter, flow_rate, roughness, slope = (np.float64(value) for value in (diameter, flow_rate, roughness, slope))
+    target = float(_target_section_factor(diameter, flow_rate, roughness, slope))
+    if not (np.isfinite(target) and target >= 0 and np.isfinite(diameter + roughness + slope)
+            and diameter > 0 and roughness > 0 and slope > 0):
+        return YDSolution(float("nan"), float("nan"), YD_INVALID, 0)
+    if target > SECTION_FACTOR_MAX:
+        return YDSolution(float("nan"), float("nan"), YD_OVER_CAPACITY, 0)
+    if target == 0:
+        return YDSolution(0.0, float("nan"), YD_SINGLE_ROOT, 0)
+
+    def residual(yD):
+        return float(section_factor(yD)) - target
+
+    yD, result = brentq(residual, 0.0, YD_MAX_FLOW, xtol=xtol, full_output=True)
+    record_convergence("solve_yD", result.iterations, result.converged, result.function_calls)
+    if target <= SECTION_FACTOR_FULL:
+        return YDSolution(yD, float("nan"), YD_SINGLE_ROOT, result.iterations)
+
+    yD_upper, upper_result = brentq(residual, YD_MAX_FLOW, 1.0, xtol=xtol, full_output=True)
+    record_convergence("solve_yD.upper", upper_result.iterations, upper_result.converged,
+                       upper_result.function_calls)
+    return YDSolution(yD, yD_upper, YD_TWO_ROOTS, result.iterations + upper_result.iterations)
@@ -1,14 +1,20 @@
 import os
+import fnmatch
 import streamlit
 
+# Streamlit static files not needed at runtime (source maps and license banners)
+STREAMLIT_STATIC_EXCLUDES = ('*.map', '*.LICENSE.txt')
 
-def get_streamlit_data_files():
+
+def get_streamlit_data_files(excludes=STREAMLIT_STATIC_EXCLUDES):
     streamlit_path = os.path.dirname(streamlit.__file__)
     static_path = os.path.join(streamlit_path, 'static')
 
     files = []
     for root, dirs, filenames in os.walk(static_path):
         for filename in filenames:
+            if any(fnmatch.fnmatch(filename, pattern) for pattern in excludes):
+                continue
             source_path = os.path.join(root, filename)
             dest_path = os.path.join('streamlit', 'static', os.path.relpath(source_path, static_path))
             files.append((source_path, dest_path))
@@ -27,4 +33,4 @@ def get_assets_files():
                 dest_path = os.path.join('assets', filename)
                 files.append((source_path, dest_path))
 
-    return files
\ No newline at end of file
+    return files
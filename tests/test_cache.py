@@ -0,0 +1,94 @@
+import pytest
+
+from manning.cache import SolveCache
+from manning.core import calculate_flow_rate, calculate_yD
+
+PIPE = {"diameter": 1.0, "slope": 0.001, "roughness": 0.013}
+
+
+def flow_rate(cache, yD):
+    return cache.solve("flow_rate", yD=yD, **PIPE)
+
+
+def test_hits_and_misses_are_counted():
+    cache = SolveCache()
+    assert flow_rate(cache, 0.5) == calculate_flow_rate(1.0, 0.5, 0.013, 0.001)
+    flow_rate(cache, 0.5)
+    flow_rate(cache, 0.6)
+    assert tuple(cache.cache_info()) == (1, 2, cache.maxsize, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SolveCache(maxsize=2)
+    flow_rate(cache, 0.3)
+    flow_rate(cache, 0.4)
+    flow_rate(cache, 0.3)  # 0.4 is now the least recently used
+    flow_rate(cache, 0.5)
+    assert cache.cache_info().currsize == 2
+    flow_rate(cache, 0.3)
+    flow_rate(cache, 0.5)
+    assert cache.cache_info().hits == 3
+    flow_rate(cache, 0.4)
+    assert cache.cache_info().misses == 4
+
+
+def test_resize_evicts_the_oldest_entries():
+    cache = SolveCache(maxsize=3)
+    for yD in (0.3, 0.4, 0.5):
+        flow_rate(cache, yD)
+    cache.resize(1)
+    assert cache.cache_info().currsize == 1
+    flow_rate(cache, 0.5)
+    assert cache.cache_info().hits == 1
+
+
+def test_keys_are_rounded_to_ten_significant_digits():
+    cache = SolveCache()
+    first = flow_rate(cache, 0.5)
+    # Differences below the 10th significant digit share the entry (and its result)
+    assert flow_rate(cache, 0.5 + 1e-12) == first
+    assert cache.cache_info().hits == 1
+    # A difference in the 10th digit is a new entry
+    assert flow_rate(cache, 0.5000000001) != first
+    assert cache.cache_info().misses == 2
+
+
+def test_inputs_are_rounded_before_solving():
+    cache = SolveCache(digits=3)
+    assert flow_rate(cache, 0.5004) == calculate_flow_rate(1.0, 0.5, 0.013, 0.001)
+
+
+def test_errors_are_not_cached():
+    cache = SolveCache()
+    with pytest.raises(ValueError, match="exceeds the pipe capacity"):
+        cache.solve("yD", diameter=1.0, flow_rate=100.0, roughness=0.013, slope=0.001)
+    with pytest.raises(ValueError, match="exceeds the pipe capacity"):
+        cache.solve("yD", diameter=1.0, flow_rate=100.0, roughness=0.013, slope=0.001)
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (0, 2, 0)
+
+    assert cache.solve("yD", diameter=1.0, flow_rate=0.5, roughness=0.013, slope=0.001) == \
+        calculate_yD(1.0, 0.5, 0.013, 0.001)
+
+
+def test_unknown_variable_is_rejected():
+    with pytest.raises(ValueError, match="Unknown variable"):
+        SolveCache().solve("velocity", **PIPE)
+
+
+def test_reset_statistics_keeps_the_entries():
+    cache = SolveCache()
+    flow_rate(cache, 0.5)
+    flow_rate(cache, 0.5)
+    cache.reset_statistics()
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (0, 0, 1)
+    flow_rate(cache, 0.5)
+    assert cache.cache_info().hits == 1
+
+
+def test_cache_clear_drops_entries_and_statistics():
+    cache = SolveCache()
+    flow_rate(cache, 0.5)
+    cache.cache_clear()
+    assert tuple(cache.cache_info()) == (0, 0, cache.maxsize, 0)
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from manning.batch import batch_flow_rate
+from manning.calibration import DEFAULT_BINS, DEFAULT_SPREAD, RoughnessCalibrator, calibrate
+from manning.cli import calibrate_file
+from manning.streaming import SensorRegistry
+
+PIPES = pd.DataFrame({"pipe_id": ["a", "b", "c", "idle"], "diameter": [0.4, 0.8, 1.5, 0.6],
+                      "slope": [0.005, 0.002, 0.0008, 0.003], "roughness": [0.013, 0.013, 0.014, 0.013]})
+
+# Roughness the observations are generated with
+TRUE_ROUGHNESS = {"a": 0.016, "b": 0.011, "c": 0.014}
+
+
+@pytest.fixture
+def registry():
+    return SensorRegistry.from_frame(PIPES, "pipe_id")
+
+
+@pytest.fixture
+def observations():
+    # 2% multiplicative noise on the flow, 5% gross outliers and a few depths outside the fitted range
+    rng = np.random.default_rng(24)
+    size = 30_000
+    pipe_id = rng.choice(["a", "b", "c", "unknown"], size, p=[0.33, 0.33, 0.33, 0.01])
+    pipes = PIPES.set_index("pipe_id").reindex(pipe_id)
+    yD = rng.uniform(0.0, 1.0, size)
+    roughness = pd.Series(TRUE_ROUGHNESS).reindex(pipe_id).fillna(0.013).to_numpy()
+    flow_rate = batch_flow_rate(pipes.diameter.fillna(1.0).to_numpy(), yD, roughness,
+                                pipes.slope.fillna(0.001).to_numpy())
+    flow_rate *= np.exp(rng.normal(0.0, 0.02, size))
+    outlier = rng.random(size) < 0.05
+    flow_rate[outlier] *= rng.choice([0.2, 5.0], outlier.sum())
+    return pd.DataFrame({"pipe_id": pipe_id, "depth": yD * pipes.diameter.fillna(1.0).to_numpy(),
+                         "flow_rate": flow_rate})
+
+
+def in_range(observations, pipe_id):
+    diameter = PIPES.set_index("pipe_id").diameter[pipe_id]
+    yD = observations.depth[observations.pipe_id == pipe_id] / diameter
+    return int(((yD >= 0.05) & (yD <= 0.95)).sum())
+
+
+def test_recovers_the_roughness_despite_outliers(registry, observations):
+    result = calibrate([observations], registry)
+    assert list(result.pipe_id) == ["a", "b", "c", "idle"]
+    np.testing.assert_allclose(result.roughness[:3], list(TRUE_ROUGHNESS.values()), rtol=2e-3)
+    np.testing.assert_array_equal(result.slope, PIPES.slope)
+    # Least squares is pulled away by the outliers, the robust fit is not
+    least_squares_error = np.abs(result.least_squares_roughness[:3] / list(TRUE_ROUGHNESS.values()) - 1)
+    assert (least_squares_error > 0.05).all()
+    # The scale (normalized MAD) is only resolved to the histogram bin width
+    np.testing.assert_allclose(result.scatter[:3], 0.02, atol=1.4826 * 2 * np.log(DEFAULT_SPREAD) / DEFAULT_BINS)
+    np.testing.assert_allclose(result.outliers[:3], 0.05, atol=0.01)
+
+    for index, pipe_id in enumerate("abc"):
+        assert result.observations[index] == in_range(observations, pipe_id)
+        assert result.observations[index] + result.rejected[index] == (observations.pipe_id == pipe_id).sum()
+
+
+def test_pipes_without_observations_give_nan(registry, observations):
+    result = calibrate([observations], registry)
+    assert result.observations[3] == 0
+    assert np.isnan([result.roughness[3], result.rmse[3], result.scatter[3], result.outliers[3]]).all()
+
+
+def test_slope_fit_keeps_the_nominal_roughness(registry, observations):
+    result = calibrate([observations], registry, fit="slope")
+    nominal = PIPES.set_index("pipe_id")
+    expected = [nominal.slope[pipe_id] * (nominal.roughness[pipe_id] / roughness) ** 2
+                for pipe_id, roughness in TRUE_ROUGHNESS.items()]
+    np.testing.assert_allclose(result.slope[:3], expected, rtol=4e-3)
+    np.testing.assert_array_equal(result.roughness, PIPES.roughness)
+
+
+def test_chunks_merge_into_the_same_histograms(registry, observations):
+    whole = RoughnessCalibrator(registry)
+    whole.update(observations.pipe_id.to_numpy(), observations.depth, observations.flow_rate)
+    chunked = RoughnessCalibrator(registry)
+    for start in range(0, len(observations), 7_000):
+        chunk = observations.iloc[start:start + 7_000]
+        chunked.update(chunk.pipe_id.to_numpy(), chunk.depth, chunk.flow_rate)
+
+    np.testing.assert_array_equal(chunked.histogram, whole.histogram)
+    np.testing.assert_array_equal(chunked.observations, whole.observations)
+    assert chunked.unknown == whole.unknown == (observations.pipe_id == "unknown").sum()
+    np.testing.assert_allclose(chunked.sum_qc, whole.sum_qc, rtol=1e-12)
+    chunked_result, whole_result = chunked.result(), whole.result()
+    np.testing.assert_array_equal(chunked_result.pipe_id, whole_result.pipe_id)
+    for name in whole_result._fields[1:]:
+        np.testing.assert_allclose(getattr(chunked_result, name), getattr(whole_result, name), rtol=1e-12)
+
+
+def test_calibrate_file_reports_progress_in_rows(tmp_path, observations):
+    pipes_path, input_path, output_path = (str(tmp_path / name) for name in ("pipes.csv", "obs.csv", "out.csv"))
+    PIPES.to_csv(pipes_path, index=False)
+    observations.to_csv(input_path, index=False)
+    reported = []
+    pipes, _ = calibrate_file(pipes_path, input_path, output_path, chunk_size=8_000,
+                              progress=lambda rows, elapsed: reported.append(rows))
+    assert pipes == 4
+    assert reported == [8_000, 16_000, 24_000, 30_000]
+    np.testing.assert_allclose(pd.read_csv(output_path).roughness[:3], list(TRUE_ROUGHNESS.values()), rtol=2e-3)
+
+
+def test_unknown_fit_is_rejected(registry):
+    with pytest.raises(ValueError, match="Unknown fit"):
+        RoughnessCalibrator(registry, fit="diameter")
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from manning.batch import batch_flow_rate
+from manning.catalog import DEFAULT_DIAMETERS, PipeCatalog, select_diameter
+
+DIAMETERS = np.array(DEFAULT_DIAMETERS)
+SLOPE, ROUGHNESS = 0.002, 0.013
+
+
+@pytest.mark.parametrize("max_yD", [0.3, 0.5, 0.75, 0.9])
+def test_exact_catalog_sizes_are_selected(max_yD):
+    flow_rate = batch_flow_rate(DIAMETERS, max_yD, ROUGHNESS, SLOPE)
+    selection = select_diameter(flow_rate, SLOPE, max_yD=max_yD)
+    np.testing.assert_array_equal(selection.diameter, DIAMETERS)
+    np.testing.assert_array_equal(selection.index, np.arange(DIAMETERS.size))
+    np.testing.assert_allclose(selection.yD, max_yD, atol=1e-6)
+
+
+def test_flows_just_above_a_size_get_the_next_one():
+    flow_rate = batch_flow_rate(DIAMETERS[:-1], 0.75, ROUGHNESS, SLOPE) * (1 + 1e-6)
+    selection = select_diameter(flow_rate, SLOPE)
+    np.testing.assert_array_equal(selection.diameter, DIAMETERS[1:])
+    assert (selection.yD <= 0.75).all()
+
+
+def test_flows_above_the_largest_pipe_are_infeasible():
+    largest = batch_flow_rate(DIAMETERS[-1], 0.75, ROUGHNESS, SLOPE)
+    selection = select_diameter([largest, largest * 1.01, largest * 100], SLOPE)
+    np.testing.assert_array_equal(selection.feasible, [True, False, False])
+    np.testing.assert_array_equal(selection.index, [DIAMETERS.size - 1, -1, -1])
+    assert selection.diameter[0] == DIAMETERS[-1]
+    assert np.isnan(selection.diameter[1:]).all() and np.isnan(selection.yD[1:]).all()
+    assert np.isnan(selection.velocity[1:]).all() and np.isnan(selection.shear_stress[1:]).all()
+
+
+def test_yD_limit_picks_larger_pipes():
+    flow_rate = np.linspace(0.01, 2.0, 200)
+    loose = select_diameter(flow_rate, SLOPE, max_yD=0.9)
+    tight = select_diameter(flow_rate, SLOPE, max_yD=0.5)
+    both = loose.feasible & tight.feasible
+    assert (tight.diameter[both] >= loose.diameter[both]).all()
+    assert (tight.diameter[both] > loose.diameter[both]).any()
+    assert (tight.yD[both] <= 0.5 + 1e-6).all() and (loose.yD[both] <= 0.9 + 1e-6).all()
+    # The next smaller size would exceed the limit
+    smaller = tight.index[both] - 1
+    has_smaller = smaller >= 0
+    required = batch_flow_rate(DIAMETERS[smaller[has_smaller]], 0.5, ROUGHNESS, SLOPE)
+    assert (flow_rate[both][has_smaller] > required).all()
+
+
+def test_velocity_limits():
+    flow_rate = batch_flow_rate(0.5, 0.75, ROUGHNESS, SLOPE)
+    unlimited = select_diameter(flow_rate, SLOPE)
+    limited = select_diameter(flow_rate, SLOPE, max_velocity=unlimited.velocity * 0.99)
+    assert limited.diameter > unlimited.diameter and limited.velocity <= unlimited.velocity * 0.99
+    assert not select_diameter(flow_rate, SLOPE, min_velocity=100.0).feasible
+
+
+def test_materials_and_shapes():
+    catalog = PipeCatalog([0.3, 0.2, 0.4], {"smooth": 0.009, "rough": 0.016})
+    np.testing.assert_array_equal(catalog.diameters, [0.2, 0.3, 0.4])
+    flow_rate = batch_flow_rate(0.3, 0.75, 0.009, SLOPE)
+    selection = select_diameter(np.full((2, 2), flow_rate), SLOPE, [["smooth", "rough"], ["smooth", "rough"]],
+                                catalog=catalog)
+    assert selection.diameter.shape == (2, 2)
+    np.testing.assert_array_equal(selection.diameter, [[0.3, 0.4], [0.3, 0.4]])
+    with pytest.raises(KeyError):
+        catalog.roughness("steel")
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from manning.cli import InputColumnsError, main, size_file
+
+PIPES = pd.DataFrame({"D": [1.0, 0.5], "yD": [0.5, 0.7], "slope": [0.0045, 0.01], "roughness": [0.013, 0.013],
+                      "flow_rate": [0.1, 0.2]})
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / "pipes.csv"
+    PIPES.to_csv(path, index=False)
+    return str(path)
+
+
+def test_missing_column_is_a_command_line_error(tmp_path, input_path, capsys):
+    output_path = tmp_path / "out.csv"
+    with pytest.raises(SystemExit) as exit_info:
+        main(["size", input_path, str(output_path), "--solve", "yD", "--quiet"])
+    assert exit_info.value.code == 2
+    assert "no column for diameter" in capsys.readouterr().err
+    assert not output_path.exists()
+
+
+def test_size_file_raises_before_writing(tmp_path, input_path):
+    with pytest.raises(InputColumnsError, match="diameter"):
+        size_file(input_path, str(tmp_path / "out.csv"), "yD")
+    assert not (tmp_path / "out.csv").exists()
+
+
+def test_column_mapping(tmp_path, input_path):
+    output_path = tmp_path / "out.csv"
+    assert main(["size", input_path, str(output_path), "--solve", "yD", "--columns", "diameter=D", "--quiet"]) == 0
+    results = pd.read_csv(output_path)
+    assert results.yD.iloc[0] == pytest.approx(0.169062792, rel=1e-8)
+
+
+def test_columns_not_needed_for_the_unknown_may_be_missing(tmp_path, input_path):
+    output_path = tmp_path / "out.csv"
+    PIPES.drop(columns=["flow_rate"]).rename(columns={"D": "diameter"}).to_csv(input_path, index=False)
+    rows, _ = size_file(input_path, str(output_path), "flow_rate")
+    assert rows == 2
@@ -0,0 +1,30 @@
+import math
+
+import pytest
+
+from manning.core import YD_MAX_FLOW, calculate_flow_rate, calculate_yD
+
+
+def test_calculate_yD_inverts_the_flow_rate():
+    flow_rate = calculate_flow_rate(0.8, 0.45, 0.013, 0.003)
+    assert math.isclose(calculate_yD(0.8, flow_rate, 0.013, 0.003), 0.45, abs_tol=1e-10)
+    assert calculate_yD(0.8, 0.0, 0.013, 0.003) == 0.0
+
+
+@pytest.mark.parametrize("flow_rate", [-0.1, math.nan])
+def test_calculate_yD_rejects_negative_flow(flow_rate):
+    with pytest.raises(ValueError, match="Flow rate must not be negative"):
+        calculate_yD(0.8, flow_rate, 0.013, 0.003)
+
+
+@pytest.mark.parametrize("diameter, roughness, slope", [(0.0, 0.013, 0.003), (-0.8, 0.013, 0.003),
+                                                        (0.8, 0.0, 0.003), (0.8, 0.013, 0.0)])
+def test_calculate_yD_rejects_invalid_pipes(diameter, roughness, slope):
+    with pytest.raises(ValueError, match="must be greater than 0"):
+        calculate_yD(diameter, 0.1, roughness, slope)
+
+
+def test_calculate_yD_over_capacity():
+    capacity = calculate_flow_rate(0.8, YD_MAX_FLOW, 0.013, 0.003)
+    with pytest.raises(ValueError, match="exceeds the pipe capacity"):
+        calculate_yD(0.8, 1.01 * capacity, 0.013, 0.003)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from scipy.optimize import fsolve
+
+from manning.batch import batch_diameter
+from manning.core import calculate_diameter, calculate_flow_rate
+
+
+# Function to calculate the diameter the way the apps did before the closed form: fsolve on Q(D) from D = 1
+def fsolve_diameter(yD, flow_rate, roughness, slope):
+    def equation(diameter):
+        return calculate_flow_rate(diameter[0], yD, roughness, slope) - flow_rate
+    return fsolve(equation, [1.0])[0]
+
+
+@pytest.fixture(scope="module")
+def cases():
+    rng = np.random.default_rng(2)
+    size = 200
+    return (rng.uniform(0.05, 1.0, size), 10 ** rng.uniform(-3, np.log10(3), size),
+            rng.uniform(0.009, 0.02, size), 10 ** rng.uniform(-4, -1, size))
+
+
+def test_calculate_diameter_matches_fsolve(cases):
+    for yD, flow_rate, roughness, slope in zip(*cases):
+        assert calculate_diameter(yD, flow_rate, roughness, slope) == pytest.approx(
+            fsolve_diameter(yD, flow_rate, roughness, slope), rel=1e-9)
+
+
+def test_batch_diameter_matches_fsolve(cases):
+    expected = [fsolve_diameter(*case) for case in zip(*cases)]
+    np.testing.assert_allclose(batch_diameter(*cases), expected, rtol=1e-9)
+
+
+def test_batch_diameter_matches_calculate_diameter(cases):
+    expected = [calculate_diameter(*case) for case in zip(*cases)]
+    np.testing.assert_allclose(batch_diameter(*cases), expected, rtol=1e-12)
+
+
+def test_diameter_reproduces_the_flow_rate():
+    diameter = calculate_diameter(0.75, 0.4, 0.013, 0.002)
+    assert calculate_flow_rate(diameter, 0.75, 0.013, 0.002) == pytest.approx(0.4, rel=1e-12)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from manning import instrument
+from manning.yd_solver import solve_yD_batch
+
+
+@pytest.fixture
+def enabled():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def solve(max_iterations):
+    diameter = np.linspace(0.5, 1.5, 50)
+    return solve_yD_batch(diameter, 0.2, 0.013, 0.004, max_iterations=max_iterations)
+
+
+def test_rows_converging_on_the_last_iteration_count_as_converged(enabled):
+    needed = int(solve(100).iterations.max())
+    instrument.reset()
+    solve(needed)
+    stats = instrument.snapshot()["convergence"]["solve_yD_batch"]
+    assert stats["solves"] == 50
+    assert stats["max_iterations"] == needed
+    assert stats["unconverged"] == 0
+
+
+def test_rows_stopped_by_max_iterations_are_unconverged(enabled):
+    iterations = solve(100).iterations
+    instrument.reset()
+    solve(int(iterations.max()) - 1)
+    stats = instrument.snapshot()["convergence"]["solve_yD_batch"]
+    assert stats["unconverged"] == int((iterations == iterations.max()).sum())
+
+
+def test_nothing_is_recorded_when_disabled():
+    instrument.disable()
+    instrument.reset()
+    solve(100)
+    assert instrument.snapshot()["convergence"] == {}
@@ -0,0 +1,42 @@
+import pytest
+
+from manning.catalog import PipeCatalog
+from manning.network import Network
+
+
+def build(**options):
+    network = Network(**options)
+    network.add_reach("a", "n1", "n3", slope=0.005, inflow=0.05)
+    network.add_reach("b", "n2", "n3", slope=0.004, inflow=0.03, roughness=0.011)
+    network.add_reach("c", "n3", "n4", slope=0.003, inflow=0.02)
+    return network
+
+
+def test_flows_accumulate_downstream():
+    results = build().solve()
+    assert results["c"]["flow_rate"] == pytest.approx(0.10)
+    assert results["c"]["yD"] == pytest.approx(0.75)
+
+
+def test_reaches_without_roughness_use_the_material():
+    network = build(material="pvc")
+    assert network.reaches["a"]["roughness"] == 0.010
+    assert network.reaches["b"]["roughness"] == 0.011
+
+
+def test_material_from_the_catalog_or_a_number():
+    catalog = PipeCatalog(materials={"steel": 0.012})
+    assert build(catalog=catalog, material="steel").reaches["c"]["roughness"] == 0.012
+    assert build(material=0.015).reaches["c"]["roughness"] == 0.015
+
+
+def test_unknown_material_raises():
+    with pytest.raises(KeyError):
+        Network(material="bamboo")
+
+
+def test_update_recomputes_downstream_reaches():
+    network = build()
+    network.solve()
+    network.update_reach("a", inflow=0.15)
+    assert network.solve()["c"]["flow_rate"] == pytest.approx(0.20)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from manning.catalog import PipeCatalog
+from manning.core import calculate_section, calculate_velocity, calculate_yD
+from manning.optimize import TrenchCost, optimize_design
+
+
+# Function to find the cheapest design of one segment by checking every catalog diameter and candidate slope
+def brute_force(flow_rate, length, ground_slope, min_velocity, slopes):
+    catalog, cost_model = PipeCatalog(), TrenchCost()
+    best = None
+    for diameter in catalog.diameters:
+        for slope in slopes:
+            upstream = 1.0 + diameter
+            downstream = upstream + (slope - ground_slope) * length
+            if downstream < 1.0 + diameter:
+                continue
+            try:
+                yD = calculate_yD(diameter, flow_rate, 0.013, slope)
+            except ValueError:
+                continue
+            if yD > 0.75 + 1e-9:
+                continue
+            area, _, _ = calculate_section(diameter, yD)
+            if calculate_velocity(flow_rate, area) < min_velocity:
+                continue
+            cost = cost_model(diameter, slope, length, upstream, downstream)
+            if best is None or cost < best[0]:
+                best = (cost, diameter, slope)
+    return best
+
+
+@pytest.mark.parametrize("flow_rate, length, ground_slope", [(0.05, 80.0, 0.0), (0.4, 120.0, 0.01),
+                                                             (1.2, 60.0, 0.003)])
+def test_matches_a_brute_force_search(flow_rate, length, ground_slope):
+    slopes = np.geomspace(0.0005, 0.05, 48)
+    design = optimize_design(flow_rate, length, ground_slope, min_velocity=0.6)
+    # The optimizer also tries the capacity and ground slopes, so it can only be cheaper than the grid search
+    cost, diameter, _ = brute_force(flow_rate, length, ground_slope, 0.6, np.append(slopes, ground_slope))
+    assert design.feasible
+    assert design.cost <= cost * (1 + 1e-9)
+    assert design.yD <= 0.75 + 1e-6
+    assert design.velocity >= 0.6
+
+
+def test_infeasible_segments_give_nan():
+    design = optimize_design([0.1, 500.0], 100.0)
+    assert list(design.feasible) == [True, False]
+    assert np.isnan(design.diameter[1]) and np.isnan(design.cost[1])
+
+
+def test_chunks_give_the_same_designs():
+    rng = np.random.default_rng(5)
+    flow_rate, length = rng.uniform(0.01, 1.0, 50), rng.uniform(20, 200, 50)
+    whole = optimize_design(flow_rate, length, chunk_size=1024)
+    chunked = optimize_design(flow_rate, length, chunk_size=7)
+    for name in whole._fields:
+        np.testing.assert_array_equal(getattr(whole, name), getattr(chunked, name))
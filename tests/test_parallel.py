@@ -0,0 +1,53 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from manning import parallel
+from manning.batch import solve
+from manning.parallel import OUTPUTS, parallel_solve
+
+
+@pytest.fixture
+def pipes():
+    # Over-capacity rows give NaN y/D, so the results hold NaN rows between valid ones
+    rng = np.random.default_rng(7)
+    shape = (50, 21)
+    return {"diameter": rng.uniform(0.2, 1.5, shape), "flow_rate": rng.uniform(0.0, 2.0, shape),
+            "roughness": rng.uniform(0.011, 0.015, shape), "slope": rng.uniform(0.0005, 0.01, shape)}
+
+
+def test_matches_the_batch_solver_row_for_row(pipes):
+    expected = solve("yD", **pipes)
+    assert np.isnan(expected["yD"]).any() and np.isfinite(expected["yD"]).any()
+
+    results = parallel_solve("yD", workers=2, chunk_size=97, **pipes)
+    assert set(results) == set(OUTPUTS)
+    for name in OUTPUTS:
+        assert results[name].shape == pipes["diameter"].shape
+        np.testing.assert_array_equal(results[name], expected[name], err_msg=name)
+
+
+def test_shared_memory_is_released_when_a_chunk_fails(pipes, monkeypatch):
+    created = []
+
+    class RecordingSharedMemory(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self.name)
+
+    monkeypatch.setattr(parallel.shared_memory, "SharedMemory", RecordingSharedMemory)
+    with pytest.raises(TypeError):
+        # A non-numeric specific weight fails in the workers, after the inputs are shared
+        parallel_solve("yD", workers=2, chunk_size=97, specific_weight="heavy", **pipes)
+
+    assert len(created) == 2
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_small_inputs_are_solved_in_process(pipes):
+    small = {name: values[0, :5] for name, values in pipes.items()}
+    results = parallel_solve("yD", workers=4, **small)
+    np.testing.assert_array_equal(results["yD"], solve("yD", **small)["yD"])
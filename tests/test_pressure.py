@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from manning.batch import solve
+from manning.core import YD_MAX_FLOW, calculate_flow_rate
+from manning.pressure import (pressure_diameter, pressure_flow_rate, pressure_friction_slope, reynolds_number,
+                              solve_surcharged, swamee_jain_friction_factor)
+
+DIAMETER = np.array([0.3, 0.6, 1.2])
+ROUGHNESS = np.array([0.011, 0.013, 0.015])
+SLOPE = np.array([0.01, 0.003, 0.0005])
+ROUGHNESS_HEIGHT = 1.5e-3
+
+
+# Function to calculate the Colebrook-White friction factor by fixed-point iteration
+def colebrook(diameter, reynolds, roughness_height):
+    friction_factor = np.full(np.shape(reynolds), 0.02)
+    for _ in range(100):
+        friction_factor = (-2 * np.log10(roughness_height / (3.7 * diameter)
+                                         + 2.51 / (reynolds * friction_factor ** 0.5))) ** -2
+    return friction_factor
+
+
+def full_flow(yD=1.0):
+    return np.array([calculate_flow_rate(d, yD, n, s) for d, n, s in zip(DIAMETER, ROUGHNESS, SLOPE)])
+
+
+def test_manning_friction_is_continuous_at_full_bore():
+    flow_rate = full_flow()
+    np.testing.assert_allclose(pressure_friction_slope(DIAMETER, flow_rate, ROUGHNESS), SLOPE, rtol=1e-12)
+    np.testing.assert_allclose(pressure_flow_rate(DIAMETER, ROUGHNESS, SLOPE), flow_rate, rtol=1e-12)
+    np.testing.assert_allclose(pressure_diameter(flow_rate, ROUGHNESS, SLOPE), DIAMETER, rtol=1e-12)
+
+
+# Swamee-Jain is within 3% of Colebrook over its range (1e-6 <= ε/D <= 1e-2, 5e3 <= Re <= 1e8), and within
+# 1.6% up to ε/D = 1e-3
+@pytest.mark.parametrize("relative_roughness, tolerance",
+                         [(1e-6, 0.016), (1e-4, 0.016), (1e-3, 0.016), (1e-2, 0.03)])
+def test_swamee_jain_matches_colebrook(relative_roughness, tolerance):
+    reynolds = np.geomspace(5e3, 1e8, 50)
+    expected = colebrook(1.0, reynolds, relative_roughness)
+    np.testing.assert_allclose(swamee_jain_friction_factor(1.0, reynolds, relative_roughness), expected,
+                               rtol=tolerance)
+
+
+def test_explicit_pressure_relations_invert_each_other():
+    flow_rate = full_flow()
+    friction_slope = pressure_friction_slope(DIAMETER, flow_rate, ROUGHNESS, ROUGHNESS_HEIGHT)
+    expected = colebrook(DIAMETER, reynolds_number(DIAMETER, flow_rate), ROUGHNESS_HEIGHT)
+    velocity = flow_rate / (np.pi * DIAMETER ** 2 / 4)
+    np.testing.assert_allclose(friction_slope, expected * velocity ** 2 / (2 * 9.81 * DIAMETER), rtol=0.02)
+    np.testing.assert_allclose(pressure_flow_rate(DIAMETER, ROUGHNESS, friction_slope, ROUGHNESS_HEIGHT), flow_rate,
+                               rtol=0.02)
+    np.testing.assert_allclose(pressure_diameter(flow_rate, ROUGHNESS, friction_slope, ROUGHNESS_HEIGHT), DIAMETER,
+                               rtol=0.03)
+
+
+@pytest.mark.parametrize("roughness_height", [None, ROUGHNESS_HEIGHT])
+def test_pipes_below_gravity_capacity_stay_in_gravity_flow(roughness_height):
+    for flow_rate in (0.99 * full_flow(), full_flow(), 0.999 * full_flow(YD_MAX_FLOW)):
+        solution = solve_surcharged(DIAMETER, flow_rate, ROUGHNESS, SLOPE, roughness_height)
+        assert not solution.surcharged.any()
+        assert (solution.yD < YD_MAX_FLOW).all()
+        np.testing.assert_array_equal(solution.friction_slope, SLOPE)
+
+
+@pytest.mark.parametrize("roughness_height", [None, ROUGHNESS_HEIGHT])
+def test_pipes_over_capacity_run_full(roughness_height):
+    flow_rate = 1.2 * full_flow(YD_MAX_FLOW)
+    solution = solve_surcharged(DIAMETER, flow_rate, ROUGHNESS, SLOPE, roughness_height)
+    assert solution.surcharged.all()
+    np.testing.assert_array_equal(solution.yD, 1.0)
+    expected = pressure_friction_slope(DIAMETER, flow_rate, ROUGHNESS, roughness_height)
+    np.testing.assert_allclose(solution.friction_slope, np.maximum(expected, SLOPE))
+    assert (solution.friction_slope > SLOPE).all()
+
+
+def test_batch_solve_adds_surcharge_columns_only_for_yD():
+    flow_rate = np.array([0.5, 2.0]) * full_flow()[1]
+    results = solve("yD", diameter=0.6, flow_rate=flow_rate, roughness=0.013, slope=0.003, surcharge=True)
+    np.testing.assert_array_equal(results["surcharged"], [False, True])
+    np.testing.assert_array_equal(results["yD"][1], 1.0)
+    np.testing.assert_allclose(results["shear_stress"], 9000 * results["hydraulic_radius"] * results["friction_slope"])
+
+    results = solve("flow_rate", diameter=0.6, yD=0.5, roughness=0.013, slope=0.003, surcharge=True)
+    assert "friction_slope" not in results and "surcharged" not in results
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from scipy.integrate import solve_ivp
+
+from manning.profile import CRITICAL_MARGIN, GRAVITY, _depth_gradient, critical_yD, water_surface_profile
+from manning.yd_solver import solve_yD_batch
+
+DIAMETER = 1.0
+ROUGHNESS = 0.013
+FLOW_RATE = 0.3
+LENGTH = 500.0
+STEPS = 100
+
+
+# Function to integrate one profile with a high-order solver at tight tolerances, on the same x grid
+def reference_profile(slope, boundary_yD, subcritical):
+    def gradient(x, yD):
+        return _depth_gradient(DIAMETER, yD, FLOW_RATE, ROUGHNESS, slope, GRAVITY) / DIAMETER
+
+    x = np.linspace(0.0, LENGTH, STEPS + 1)
+    if subcritical:
+        solution = solve_ivp(gradient, (LENGTH, 0.0), [boundary_yD], t_eval=x[::-1], method="DOP853",
+                             rtol=1e-12, atol=1e-13)
+        return solution.y[0][::-1]
+    solution = solve_ivp(gradient, (0.0, LENGTH), [boundary_yD], t_eval=x, method="DOP853", rtol=1e-12,
+                         atol=1e-13)
+    return solution.y[0]
+
+
+def critical():
+    return float(critical_yD(DIAMETER, FLOW_RATE))
+
+
+def normal(slope):
+    return float(solve_yD_batch(DIAMETER, FLOW_RATE, ROUGHNESS, slope).yD)
+
+
+def test_m2_profile_near_critical_depth():
+    boundary = 1.01 * critical()
+    profile = water_surface_profile(DIAMETER, 0.001, ROUGHNESS, FLOW_RATE, LENGTH, boundary, steps=STEPS)
+    assert profile.subcritical and not profile.limited
+    assert profile.yD.max() < normal(0.001)
+    assert np.abs(profile.yD - reference_profile(0.001, boundary, True)).max() < 1e-6
+
+
+def test_free_outfall_at_critical_depth_is_subcritical_on_a_mild_slope():
+    profile = water_surface_profile(DIAMETER, 0.001, ROUGHNESS, FLOW_RATE, LENGTH, critical(), steps=STEPS)
+    assert profile.subcritical and not profile.limited
+    start = critical() * (1 + CRITICAL_MARGIN)
+    assert profile.yD[-1] == pytest.approx(start)
+    assert np.abs(profile.yD - reference_profile(0.001, start, True)).max() < 1e-6
+    assert profile.yD[0] == pytest.approx(normal(0.001), abs=1e-3)
+
+
+def test_s2_profile_from_near_critical_depth():
+    profile = water_surface_profile(DIAMETER, 0.02, ROUGHNESS, FLOW_RATE, LENGTH, 0.3, steps=STEPS)
+    assert not profile.subcritical and not profile.limited
+    assert np.all(np.diff(profile.yD) <= 0)
+    assert profile.yD.min() >= normal(0.02) - 1e-6
+    assert np.abs(profile.yD - reference_profile(0.02, 0.3, False)).max() < 1e-6
+
+
+@pytest.mark.parametrize("slope, boundary", [(0.001, 0.8), (0.02, 0.1)])
+def test_smooth_profiles_match_the_reference(slope, boundary):
+    profile = water_surface_profile(DIAMETER, slope, ROUGHNESS, FLOW_RATE, LENGTH, boundary, steps=STEPS)
+    assert not profile.limited
+    assert np.abs(profile.yD - reference_profile(slope, boundary, boundary > critical())).max() < 1e-6
+
+
+def test_profile_running_into_critical_depth_is_limited():
+    profile = water_surface_profile(DIAMETER, 0.02, ROUGHNESS, FLOW_RATE, 2000.0, 0.5, steps=STEPS)
+    assert profile.subcritical and profile.limited
+    assert profile.yD[0] == pytest.approx(critical() * (1 + CRITICAL_MARGIN))
+
+
+def test_pipes_are_integrated_together():
+    boundaries = np.array([0.8, 1.01 * critical(), critical()])
+    profile = water_surface_profile(DIAMETER, 0.001, ROUGHNESS, FLOW_RATE, LENGTH, boundaries, steps=STEPS)
+    for index, boundary in enumerate(boundaries):
+        single = water_surface_profile(DIAMETER, 0.001, ROUGHNESS, FLOW_RATE, LENGTH, boundary, steps=STEPS)
+        np.testing.assert_allclose(profile.yD[:, index], single.yD, atol=1e-7)
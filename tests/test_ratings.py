@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from manning.core import YD_MAX_FLOW, calculate_flow_rate
+from manning.ratings import (RELATIVE_FLOW_TOLERANCE, YD_TOLERANCE, YD_TOLERANCE_LIMIT, RatingStore, rating_grid,
+                             write_rating_store)
+
+DIAMETER = np.array([0.15, 0.8, 2.5])
+SLOPE = np.array([0.02, 0.003, 0.0004])
+ROUGHNESS = np.array([0.011, 0.013, 0.015])
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("ratings") / "pipes.rc")
+    write_rating_store(path, DIAMETER, SLOPE, ROUGHNESS, ids=["a", "b", "c"], chunk_size=2)
+    return RatingStore(path)
+
+
+# Function to calculate the exact flow rates of every pipe at the given depths with the scalar core function
+def exact_flow(yD):
+    return np.array([[calculate_flow_rate(d, y, n, s) if y > 0 else 0.0 for y in yD]
+                     for d, s, n in zip(DIAMETER, SLOPE, ROUGHNESS)])
+
+
+def test_grid_is_increasing_and_contains_the_capacity_depth():
+    grid = rating_grid()
+    assert grid[0] == 0.0 and grid[-1] == 1.0
+    assert np.all(np.diff(grid.astype(np.float32)) > 0)
+    assert YD_MAX_FLOW in grid
+
+
+def test_flow_rate_within_tolerance_at_every_depth(store):
+    yD = np.linspace(1e-4, 1.0, 20001)
+    rows = np.repeat(np.arange(3), yD.size).reshape(3, -1)
+    flow_rate = store.flow_rate(rows, yD)
+    error = np.abs(flow_rate / exact_flow(yD) - 1)
+    assert error.max() < RELATIVE_FLOW_TOLERANCE
+
+
+def test_yD_within_tolerance(store):
+    yD = np.linspace(1e-3, 0.93, 10001)
+    rows = np.repeat(np.arange(3), yD.size).reshape(3, -1)
+    error = np.abs(store.yD(rows, exact_flow(yD)) - yD)
+    assert error[:, yD <= YD_TOLERANCE_LIMIT].max() < YD_TOLERANCE
+    assert error.max() < 5e-5
+
+
+def test_yD_near_capacity_and_above(store):
+    capacity = exact_flow([YD_MAX_FLOW])[:, 0]
+    np.testing.assert_allclose(store.yD(np.arange(3), capacity * (1 - 1e-6)), YD_MAX_FLOW, atol=5e-4)
+    assert np.isnan(store.yD(np.arange(3), capacity * 1.001)).all()
+    assert np.isnan(store.yD([0], [-1.0])).all()
+
+
+def test_rows_by_id(store):
+    np.testing.assert_array_equal(store.rows(["c", "a"]), [2, 0])
+    np.testing.assert_array_equal(store.flow_rate(store.rows(["b"]), [0.5]), store.flow_rate([1], [0.5]))
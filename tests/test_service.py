@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from manning.core import calculate_flow_rate
+from manning.service import CalculationService, LocalClient
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def _with_client(test):
+    service = CalculationService(workers=0, max_delay=0.001)
+    try:
+        return await test(LocalClient(service), service)
+    finally:
+        await service.close()
+
+
+def test_solve_matches_core():
+    async def test(client, _):
+        return await client.solve("flow_rate", diameter=1.0, yD=0.5, roughness=0.013, slope=0.0045)
+
+    result = run(_with_client(test))
+    assert result["flow_rate"] == pytest.approx(calculate_flow_rate(1.0, 0.5, 0.013, 0.0045))
+
+
+@pytest.mark.parametrize("value", [None, "abc", [1.0], True])
+def test_bad_request_does_not_stop_the_service(value):
+    async def test(client, service):
+        with pytest.raises(ValueError, match="Invalid value for diameter"):
+            await client.solve("flow_rate", diameter=value, yD=0.5, roughness=0.013, slope=0.0045)
+        result = await asyncio.wait_for(
+            client.solve("flow_rate", diameter=1.0, yD=0.5, roughness=0.013, slope=0.0045), timeout=5)
+        return result, await client.metrics()
+
+    result, metrics = run(_with_client(test))
+    assert result["flow_rate"] == pytest.approx(calculate_flow_rate(1.0, 0.5, 0.013, 0.0045))
+    assert metrics["requests"] == 2
+    assert metrics["errors"] == 1
+
+
+def test_batcher_restarts_a_stopped_task():
+    async def test(client, service):
+        await client.solve("yD", diameter=1.0, flow_rate=0.1, roughness=0.013, slope=0.0045)
+        service.batcher._task.cancel()
+        await asyncio.sleep(0)
+        return await asyncio.wait_for(
+            client.solve("yD", diameter=1.0, flow_rate=0.1, roughness=0.013, slope=0.0045), timeout=5)
+
+    assert run(_with_client(test))["yD"] == pytest.approx(0.16906279, rel=1e-6)
+
+
+def test_batch_of_requests_is_solved_together():
+    async def test(client, service):
+        rows = [{"diameter": 1.0, "flow_rate": 0.05 * (i + 1), "roughness": 0.013, "slope": 0.0045}
+                for i in range(20)]
+        results = await asyncio.gather(*(client.solve("yD", **row) for row in rows))
+        return results, await client.metrics()
+
+    results, metrics = run(_with_client(test))
+    yD = [result["yD"] for result in results]
+    assert yD == sorted(yD)
+    assert metrics["batches"] < 20
@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from manning.cli import estimate_file
+from manning.core import calculate_flow_rate
+from manning.streaming import (SensorRegistry, batch_readings, estimate_batch, estimate_flows, replay_file,
+                               write_flows)
+
+SENSORS = pd.DataFrame({"sensor_id": ["a", "b", "c"], "diameter": [0.5, 0.8, 1.2], "slope": [0.004, 0.002, 0.001],
+                        "roughness": [0.013, 0.012, 0.014]})
+
+
+@pytest.fixture
+def registry():
+    return SensorRegistry.from_frame(SENSORS)
+
+
+@pytest.fixture
+def readings():
+    rng = np.random.default_rng(3)
+    size = 1000
+    sensor_id = rng.choice(["a", "b", "c", "unknown"], size, p=[0.3, 0.3, 0.3, 0.1])
+    diameter = SENSORS.set_index("sensor_id").diameter.reindex(sensor_id).fillna(1.0).to_numpy()
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2026-01-01", periods=size, freq="100ms").astype(str),
+        "sensor_id": sensor_id,
+        "depth": diameter * rng.uniform(0.0, 1.1, size),
+    })
+
+
+# Function to calculate the expected flow of one reading with the scalar core function
+def expected_flow(sensor_id, depth):
+    if sensor_id not in set(SENSORS.sensor_id):
+        return np.nan
+    pipe = SENSORS.set_index("sensor_id").loc[sensor_id]
+    yD = min(depth / pipe.diameter, 1.0)
+    return calculate_flow_rate(pipe.diameter, yD, pipe.roughness, pipe.slope) if yD > 0 else 0.0
+
+
+def test_registry_lookup(registry):
+    diameter, slope, roughness, known = registry.lookup(["c", "x", "a"])
+    np.testing.assert_array_equal(known, [True, False, True])
+    np.testing.assert_array_equal(diameter[[0, 2]], [1.2, 0.5])
+    assert np.isnan(diameter[1]) and np.isnan(slope[1]) and np.isnan(roughness[1])
+
+
+def test_register_moves_a_sensor(registry):
+    registry.register("a", 0.6, 0.003, 0.011)
+    diameter, slope, roughness, _ = registry.lookup(["a"])
+    assert (diameter[0], slope[0], roughness[0]) == (0.6, 0.003, 0.011)
+    assert len(registry) == 3
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet"])
+def test_file_replay_matches_the_scalar_calculation(tmp_path, registry, readings, extension):
+    path = str(tmp_path / f"readings{extension}")
+    readings.to_csv(path, index=False) if extension == ".csv" else readings.to_parquet(path)
+
+    batches = list(replay_file(path, batch_size=128))
+    assert [len(batch.depth) for batch in batches] == [128] * 7 + [104]
+
+    flows = list(estimate_flows(batches, registry))
+    flow_rate = np.concatenate([batch.flow_rate for batch in flows])
+    expected = [expected_flow(sensor_id, depth) for sensor_id, depth in zip(readings.sensor_id, readings.depth)]
+    np.testing.assert_allclose(flow_rate, expected, rtol=1e-9)
+
+    surcharged = np.concatenate([batch.surcharged for batch in flows])
+    known = np.concatenate([batch.known for batch in flows])
+    diameter = SENSORS.set_index("sensor_id").diameter.reindex(readings.sensor_id).to_numpy()
+    np.testing.assert_array_equal(known, readings.sensor_id != "unknown")
+    np.testing.assert_array_equal(surcharged, known & (readings.depth.to_numpy() > diameter))
+
+
+def test_file_replay_with_renamed_columns(tmp_path, registry, readings):
+    path = str(tmp_path / "readings.csv")
+    readings.rename(columns={"sensor_id": "id", "depth": "level"}).to_csv(path, index=False)
+    batches = list(replay_file(path, batch_size=500, columns={"sensor_id": "id", "depth": "level"}))
+    np.testing.assert_allclose(np.concatenate([batch.depth for batch in batches]), readings.depth, rtol=1e-12)
+
+
+def test_file_replay_follows_the_timestamps(tmp_path, readings):
+    path = str(tmp_path / "readings.csv")
+    readings.head(21).to_csv(path, index=False)
+    start = time.monotonic()
+    list(replay_file(path, batch_size=10, speed=20))
+    # 2 s of readings replayed 20 times faster
+    assert 0.09 <= time.monotonic() - start < 1.0
+
+
+def test_live_feed_batches():
+    readings = [(index, "a", 0.1) for index in range(25)]
+    batches = list(batch_readings(iter(readings), batch_size=10))
+    assert [len(batch.depth) for batch in batches] == [10, 10, 5]
+    assert list(np.concatenate([batch.timestamp for batch in batches])) == list(range(25))
+
+
+def test_dry_and_unknown_readings(registry):
+    from manning.streaming import ReadingBatch
+    batch = estimate_batch(ReadingBatch(np.arange(3), np.array(["a", "zz", "b"]), np.array([0.0, 0.2, 0.9])),
+                           registry)
+    assert batch.flow_rate[0] == 0.0 and batch.velocity[0] == 0.0
+    assert np.isnan(batch.flow_rate[1]) and np.isnan(batch.velocity[1])
+    assert batch.yD[2] == 1.0 and batch.surcharged[2]
+
+
+def test_write_flows_and_cli(tmp_path, registry, readings):
+    sensors_path = str(tmp_path / "sensors.csv")
+    input_path = str(tmp_path / "readings.csv")
+    SENSORS.to_csv(sensors_path, index=False)
+    readings.to_csv(input_path, index=False)
+
+    rows = write_flows(estimate_flows(replay_file(input_path, batch_size=300), registry),
+                       str(tmp_path / "direct.parquet"))
+    reported = []
+    cli_rows, _ = estimate_file(sensors_path, input_path, str(tmp_path / "cli.parquet"), batch_size=300,
+                                progress=lambda rows, elapsed: reported.append(rows))
+    assert rows == cli_rows == len(readings)
+    assert reported == [300, 600, 900, 1000]
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "direct.parquet"),
+                                  pd.read_parquet(tmp_path / "cli.parquet"))
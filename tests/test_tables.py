@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pytest
+
+from manning import tables
+from manning.tables import build_section_table, get_section_table, lookup_yD
+from manning.yd_solver import solve_yD_batch
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    get_section_table.cache_clear()
+    yield
+    get_section_table.cache_clear()
+
+
+def test_lookup_matches_the_solver():
+    rng = np.random.default_rng(4)
+    diameter = rng.uniform(0.2, 2.0, 1000)
+    flow_rate = rng.uniform(0.001, 1.0, 1000)
+    expected = solve_yD_batch(diameter, flow_rate, 0.013, 0.004).yD
+    found = np.isfinite(expected)
+    np.testing.assert_allclose(lookup_yD(diameter, flow_rate, 0.013, 0.004)[found], expected[found], atol=1e-6)
+
+
+def test_cache_files_are_kept_per_exact_tolerance(tmp_path):
+    for tolerance in (1.5e-6, 2e-6):
+        get_section_table(tolerance, str(tmp_path))
+    names = sorted(os.listdir(tmp_path))
+    assert names == ["section_table_1.5e-06.npy", "section_table_2e-06.npy"]
+
+
+def test_cached_table_is_loaded(tmp_path):
+    built = get_section_table(1e-6, str(tmp_path))
+    get_section_table.cache_clear()
+    loaded = get_section_table(1e-6, str(tmp_path))
+    assert loaded is not built
+    np.testing.assert_array_equal(loaded.data, built.data)
+
+
+def test_unreachable_tolerance_raises(monkeypatch):
+    monkeypatch.setattr(tables, "MAX_POINTS", tables.MIN_POINTS)
+    with pytest.raises(ValueError, match="not reached"):
+        build_section_table(1e-7)
+
+
+def test_tolerance_below_the_achievable_accuracy_raises():
+    with pytest.raises(ValueError, match="below the achievable accuracy"):
+        build_section_table(1e-9)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from manning.batch import solve
+from manning.core import VARIABLES
+from manning.uncertainty import Distribution, StreamingStats, linearized_std, monte_carlo, sensitivities
+
+POINT = {"flow_rate": 0.25, "diameter": 0.8, "yD": 0.6, "slope": 0.003, "roughness": 0.013}
+
+
+# Function to get the inputs of a solve for unknown at POINT (the inputs are consistent: Q is the flow at y/D)
+def inputs(unknown):
+    point = dict(POINT, flow_rate=float(solve("flow_rate", **POINT)["flow_rate"]))
+    return {name: value for name, value in point.items() if name != unknown}
+
+
+@pytest.mark.parametrize("unknown", VARIABLES)
+def test_sensitivities_match_finite_differences(unknown):
+    base = inputs(unknown)
+    derivatives = sensitivities(unknown, **base)
+    assert set(derivatives) == set(base)
+    for name, value in base.items():
+        step = value * 1e-6
+        high = solve(unknown, **dict(base, **{name: value + step}))[unknown]
+        low = solve(unknown, **dict(base, **{name: value - step}))[unknown]
+        np.testing.assert_allclose(derivatives[name], (high - low) / (2 * step), rtol=1e-6, err_msg=name)
+
+
+@pytest.mark.parametrize("unknown", VARIABLES)
+def test_monte_carlo_agrees_with_linearized_propagation_for_small_errors(unknown):
+    base = inputs(unknown)
+    standard_deviations = {name: 0.005 * value for name, value in base.items()}
+    distributions = {name: Distribution("normal", mean=value, cv=0.005) for name, value in base.items()}
+    summary = monte_carlo(unknown, distributions, samples=200_000, chunk_size=50_000, seed=17)
+
+    expected = linearized_std(unknown, standard_deviations, **base)
+    assert summary.samples == 200_000 and summary.failed == 0
+    np.testing.assert_allclose(summary.std, expected, rtol=0.02)
+    np.testing.assert_allclose(summary.mean, solve(unknown, **base)[unknown], rtol=1e-3)
+    np.testing.assert_allclose(summary.percentiles[50], summary.mean, rtol=1e-3)
+
+
+def test_streaming_percentiles_match_numpy():
+    rng = np.random.default_rng(5)
+    values = rng.lognormal(0.0, 0.8, 300_000)
+    stats = StreamingStats()
+    for chunk in np.array_split(values, 7):
+        stats.update(chunk)
+    summary = stats.summary((1, 5, 50, 95, 99))
+
+    assert summary.samples == values.size and summary.failed == 0
+    np.testing.assert_allclose(summary.mean, values.mean(), rtol=1e-10)
+    np.testing.assert_allclose(summary.std, values.std(), rtol=1e-8)
+    for q, value in summary.percentiles.items():
+        # Resolved to the width of a logarithmic bin (6 decades in 4096 bins, about 0.34%)
+        np.testing.assert_allclose(value, np.percentile(values, q), rtol=4e-3, err_msg=f"p{q}")
+
+
+def test_streaming_stats_count_failures_and_clip_to_the_range():
+    stats = StreamingStats(decades=2)
+    stats.update([1.0, 2.0, np.nan, -1.0, 0.0, np.inf])
+    stats.update([1e6])
+    summary = stats.summary((0, 100))
+    assert (summary.samples, summary.failed) == (3, 4)
+    # Values beyond the histogram range report the range edge
+    assert summary.percentiles[100] == pytest.approx(10 ** (np.log10(1.5) + 1))
+
+
+def test_empty_stream():
+    summary = StreamingStats().summary()
+    assert summary.samples == 0 and np.isnan(summary.mean) and all(np.isnan(list(summary.percentiles.values())))
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from manning import instrument
+from manning.batch import section_factor
+from manning.core import YD_MAX_FLOW
+from manning.yd_solver import (SECTION_FACTOR_FULL, SECTION_FACTOR_MAX, YD_INVALID, YD_OVER_CAPACITY,
+                               YD_SINGLE_ROOT, YD_TWO_ROOTS, solve_yD, solve_yD_batch)
+
+DIAMETER, ROUGHNESS, SLOPE = 0.8, 0.013, 0.003
+SCALE = DIAMETER ** (8 / 3) * SLOPE ** 0.5 / ROUGHNESS
+
+# Flow rates covering every status, with the expected status
+FLOWS = np.array([0.0, 0.3 * SECTION_FACTOR_FULL * SCALE, 0.5 * (SECTION_FACTOR_FULL + SECTION_FACTOR_MAX) * SCALE,
+                  1.01 * SECTION_FACTOR_MAX * SCALE, -1.0, np.nan])
+STATUS = [YD_SINGLE_ROOT, YD_SINGLE_ROOT, YD_TWO_ROOTS, YD_OVER_CAPACITY, YD_INVALID, YD_INVALID]
+
+
+@pytest.fixture
+def enabled():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def test_batch_statuses_and_roots():
+    solution = solve_yD_batch(DIAMETER, FLOWS, ROUGHNESS, SLOPE)
+    np.testing.assert_array_equal(solution.status, STATUS)
+
+    assert solution.yD[0] < 1e-11
+    assert 0 < solution.yD[1] < YD_MAX_FLOW and np.isnan(solution.yD_upper[1])
+    assert solution.yD[2] < YD_MAX_FLOW < solution.yD_upper[2] < 1
+    np.testing.assert_allclose(section_factor(solution.yD[1:3]), FLOWS[1:3] / SCALE, rtol=1e-10)
+    np.testing.assert_allclose(section_factor(solution.yD_upper[2]), FLOWS[2] / SCALE, rtol=1e-10)
+    assert np.isnan(solution.yD[3:]).all() and np.isnan(solution.yD_upper[3:]).all()
+
+
+@pytest.mark.parametrize("diameter, roughness, slope", [(0.0, ROUGHNESS, SLOPE), (DIAMETER, -0.013, SLOPE),
+                                                        (DIAMETER, ROUGHNESS, 0.0), (np.inf, ROUGHNESS, SLOPE)])
+def test_invalid_pipes(diameter, roughness, slope):
+    assert solve_yD_batch(diameter, 0.1, roughness, slope).status == YD_INVALID
+    assert solve_yD(diameter, 0.1, roughness, slope).status == YD_INVALID
+
+
+def test_scalar_solver_matches_the_batch_solver():
+    batch = solve_yD_batch(DIAMETER, FLOWS, ROUGHNESS, SLOPE)
+    for index, flow_rate in enumerate(FLOWS):
+        scalar = solve_yD(DIAMETER, flow_rate, ROUGHNESS, SLOPE)
+        assert scalar.status == batch.status[index]
+        np.testing.assert_allclose([scalar.yD, scalar.yD_upper], [batch.yD[index], batch.yD_upper[index]],
+                                   atol=1e-10)
+
+
+def test_iteration_counts(enabled):
+    batch = solve_yD_batch(DIAMETER, FLOWS, ROUGHNESS, SLOPE)
+    # Nothing to iterate over capacity or for invalid input
+    np.testing.assert_array_equal(batch.iterations[3:], 0)
+    assert 0 < batch.iterations[1] <= 20
+
+    # Rows are solved independently, and two roots add the iterations of both searches
+    instrument.reset()
+    assert solve_yD_batch(DIAMETER, FLOWS[2], ROUGHNESS, SLOPE).iterations == batch.iterations[2]
+    convergence = instrument.snapshot()["convergence"]
+    lower = convergence["solve_yD_batch"]["max_iterations"]
+    upper = convergence["solve_yD_batch.upper"]["max_iterations"]
+    assert lower > 0 and upper > 0 and lower + upper == batch.iterations[2]
+
+    scalar = [solve_yD(DIAMETER, flow_rate, ROUGHNESS, SLOPE).iterations for flow_rate in FLOWS]
+    assert scalar[0] == 0 and scalar[3:] == [0, 0, 0]
+    assert 0 < scalar[1] <= 50 and scalar[2] > 0
+
+
+def test_max_iterations_limits_the_search():
+    solution = solve_yD_batch(DIAMETER, FLOWS[1], ROUGHNESS, SLOPE, max_iterations=2)
+    assert solution.iterations == 2
+    assert abs(section_factor(solution.yD) - FLOWS[1] / SCALE) > 1e-6
+
+
+def test_convergence_is_recorded(enabled):
+    solve_yD_batch(DIAMETER, FLOWS, ROUGHNESS, SLOPE)
+    solve_yD(DIAMETER, FLOWS[2], ROUGHNESS, SLOPE)
+    convergence = instrument.snapshot()["convergence"]
+    assert convergence["solve_yD_batch"]["solves"] == 3
+    assert convergence["solve_yD_batch.upper"]["solves"] == 1
+    assert convergence["solve_yD"]["solves"] == convergence["solve_yD.upper"]["solves"] == 1
+    assert all(stats["unconverged"] == 0 for stats in convergence.values())
+
+    instrument.reset()
+    solve_yD_batch(DIAMETER, FLOWS[1:3], ROUGHNESS, SLOPE, max_iterations=2)
+    convergence = instrument.snapshot()["convergence"]
+    assert convergence["solve_yD_batch"]["unconverged"] == 2
+    assert convergence["solve_yD_batch.upper"]["unconverged"] == 1